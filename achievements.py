@@ -0,0 +1,258 @@
+"""Incremental achievement rules over per-participant counters
+
+Each participant's punishments are folded into PunishmentCounters as they
+are recorded: a total, counts by punishment type and by pub, and the number
+of distinct types. Every rule declares the facts it reads ('completed',
+'total', 'type:<punishment>', 'pub:<pub>', ...), so after an event only the
+rules whose facts changed are evaluated, and the cost of a check does not
+grow with the punishment history.
+
+Rule predicates only use comparisons, sums and &, so the same predicate runs
+on one participant's facts or on whole columns. evaluate_all() uses that to
+re-check every participant at once, e.g. after an import.
+"""
+from collections import Counter
+from datetime import datetime
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from leaderboard import count_items
+from models import normalize_name, normalize_names
+
+EVERYTHING = None  # pass as `changed` to evaluate every rule
+PUB_FACTS = frozenset({'completed'})  # what changes when a pub is completed
+PUB_POINTS = 100  # points for each pub completed
+
+
+class PunishmentCounters:
+    """Running punishment counts for one participant"""
+
+    __slots__ = ('total', 'by_type', 'by_pub')
+
+    def __init__(self):
+        self.total = 0
+        self.by_type = Counter()
+        self.by_pub = Counter()
+
+    @property
+    def distinct(self):
+        return len(self.by_type)
+
+    def add(self, pub, punishment):
+        """Count one punishment, returning the names of the facts it changed"""
+        changed = {'total', f'type:{punishment}', f'pub:{pub}'}
+        if punishment not in self.by_type:
+            changed.add('distinct')
+        self.total += 1
+        self.by_type[punishment] += 1
+        self.by_pub[pub] += 1
+        return changed
+
+
+class Facts:
+    """One participant's facts, computed on demand for the rules being run"""
+
+    def __init__(self, participant, counters):
+        self.participant = participant
+        self.counters = counters or PunishmentCounters()
+
+    def __getitem__(self, fact):
+        if fact == 'completed':
+            return self.participant.completed_count
+        if fact == 'in_order':
+            return self.participant.in_order
+        if fact == 'hours':
+            return _hours_since(self.participant.start_time)
+        if fact == 'total':
+            return self.counters.total
+        if fact == 'distinct':
+            return self.counters.distinct
+        kind, _, key = fact.partition(':')
+        return (self.counters.by_type if kind == 'type' else self.counters.by_pub)[key]
+
+
+def _hours_since(start_time):
+    if start_time is None:
+        return float('inf')
+    return (datetime.now() - datetime.fromisoformat(start_time)).total_seconds() / 3600
+
+
+class Rule:
+    def __init__(self, facts, predicate):
+        self.facts = frozenset(facts)
+        self.predicate = predicate
+
+
+def build_rules(pub_names, punishments, achievements=None):
+    """Rule for each achievement id, for this event's pubs and punishments
+
+    Some rules take settings from their achievement definition: 'punishment'
+    (text the punishment must contain) and 'pub' (the pub to stay clean at).
+    """
+    last = len(pub_names)
+    settings = achievements or {}
+
+    def setting(ach_id, key, default):
+        return settings.get(ach_id, {}).get(key, default)
+
+    def received(ach_id, text, at_least):
+        text = setting(ach_id, 'punishment', text).casefold()
+        types = [f'type:{p}' for p in punishments if text in p.casefold()]
+        return Rule(types, lambda f: sum(f[t] for t in types) >= at_least)
+
+    def clean_at(ach_id, pub):
+        name = setting(ach_id, 'pub', pub_names[min(pub, last - 1)])
+        after = pub_names.index(name)
+        key = f'pub:{name}'
+        return Rule({'completed'}, lambda f: (f['completed'] > after) & (f[key] == 0))
+
+    every_type = [f'type:{p}' for p in punishments]
+    return {
+        'first_pub': Rule({'completed'}, lambda f: f['completed'] >= 1),
+        'halfway': Rule({'completed'}, lambda f: f['completed'] >= (last + 1) // 2),
+        'finisher': Rule({'completed'}, lambda f: f['completed'] == last),
+        'rule_breaker': Rule({'total'}, lambda f: f['total'] >= 3),
+        'dance_master': received('dance_master', 'Irish dance', 2),
+        'karaoke_king': received('karaoke_king', 'Christmas carol', 2),
+        'silent_warrior': clean_at('silent_warrior', 2),
+        'phone_free': clean_at('phone_free', 4),
+        'perfect_run': Rule({'completed'}, lambda f: (f['completed'] == last) & (f['total'] == 0)),
+        'punishment_collector': Rule({'distinct'},
+                                     lambda f: reduce(lambda a, b: a & b, (f[t] > 0 for t in every_type))),
+        'speed_demon': Rule({'completed'}, lambda f: (f['completed'] == last) & (f['hours'] <= 3)),
+        'golden_route': Rule({'completed'}, lambda f: (f['completed'] > 0) & f['in_order']),
+    }
+
+
+class AchievementEngine:
+    """Keeps punishment counters per participant and evaluates rules on them"""
+
+    def __init__(self, achievements, pub_names, punishments):
+        self.achievements = achievements
+        self.pub_names = tuple(pub_names)
+        self.punishments = tuple(punishments)
+        rules = build_rules(self.pub_names, self.punishments, achievements)
+        self.rules = {ach_id: rules[ach_id] for ach_id in achievements}
+        self._counters = {}  # normalized name -> PunishmentCounters
+
+    def counters(self, name):
+        return self._counters.get(normalize_name(name))
+
+    def rebuild(self, punishments_df):
+        """Recount everything from a full punishments frame"""
+        self._counters = {}
+        if punishments_df.empty:
+            return
+        keys = normalize_names(punishments_df['Name'])
+        for column, attr in (('Punishment', 'by_type'), ('Pub', 'by_pub')):
+            for (key, value), count in punishments_df.groupby([keys, column], observed=True).size().items():
+                getattr(self._counters.setdefault(key, PunishmentCounters()), attr)[value] = int(count)
+        for key, total in keys.value_counts().items():
+            self._counters[key].total = int(total)
+
+    def record(self, rows):
+        """Count new punishment rows, returning {normalized name: changed facts}"""
+        changed = {}
+        for row in rows[['Name', 'Pub', 'Punishment']].to_dict('records'):
+            key = normalize_name(row['Name'])
+            counters = self._counters.setdefault(key, PunishmentCounters())
+            changed.setdefault(key, set()).update(counters.add(row['Pub'], row['Punishment']))
+        return changed
+
+    def evaluate(self, participant, changed=EVERYTHING):
+        """Ids of achievements the participant has now earned but not yet been awarded
+
+        Only rules reading one of the `changed` facts are run.
+        """
+        facts = Facts(participant, self.counters(participant.name))
+        return [ach_id for i, (ach_id, rule) in enumerate(self.rules.items())
+                if not participant.has_achievement(i)
+                and (changed is EVERYTHING or rule.facts & changed)
+                and rule.predicate(facts)]
+
+    def facts_frame(self, participants_df, punishments_df):
+        """Every fact as a column, one row per participant"""
+        keys = normalize_names(participants_df['Name'])
+        completed = participants_df['CompletedPubs'].fillna('').astype(str)
+        prefixes = np.array([','.join(self.pub_names[:n]) for n in range(len(self.pub_names) + 1)], dtype=object)
+        count = count_items(participants_df['CompletedPubs'])
+        start = pd.to_datetime(participants_df['StartTime'], errors='coerce', format='ISO8601')
+        hours = ((pd.Timestamp.now() - start).dt.total_seconds() / 3600).fillna(np.inf)
+
+        columns = {
+            'completed': count,
+            'in_order': completed.to_numpy(dtype=object) == prefixes[np.clip(count, 0, len(self.pub_names))],
+            'hours': hours.to_numpy(),
+        }
+        names = normalize_names(punishments_df['Name'])
+        for prefix, column, values in (('type', 'Punishment', self.punishments), ('pub', 'Pub', self.pub_names)):
+            table = pd.crosstab(names, punishments_df[column]).reindex(index=keys, columns=list(values), fill_value=0)
+            for value in values:
+                columns[f'{prefix}:{value}'] = table[value].to_numpy()
+        columns['total'] = names.value_counts().reindex(keys, fill_value=0).to_numpy()
+        columns['distinct'] = sum((columns[f'type:{p}'] > 0).astype(np.int64) for p in self.punishments)
+        return pd.DataFrame(columns, index=participants_df.index)
+
+    def evaluate_all(self, participants_df, punishments_df):
+        """Boolean frame of which achievements every participant qualifies for"""
+        facts = self.facts_frame(participants_df, punishments_df)
+        return pd.DataFrame({ach_id: np.broadcast_to(rule.predicate(facts), len(facts))
+                             for ach_id, rule in self.rules.items()}, index=participants_df.index)
+
+    def award_all(self, participants_df, punishments_df):
+        """participants_df with every newly qualified achievement awarded"""
+        earned = self.evaluate_all(participants_df, punishments_df)
+        df = participants_df.copy()
+        achievements = df['Achievements'].fillna('').astype(object)
+        points = df['Points'].astype(np.int64)
+        for ach_id in self.rules:
+            held = achievements.str.contains(f'(?:^|,){ach_id}(?:,|$)', regex=True)
+            new = earned[ach_id] & ~held
+            achievements = achievements.mask(new, np.where(achievements == '', ach_id, achievements + ',' + ach_id))
+            points = points + new.astype(np.int64) * self.achievements[ach_id]['points']
+        df['Achievements'] = achievements
+        df['Points'] = points
+        return df
+
+    def _check_items(self, values, known, kind):
+        """Raise ValueError if a comma-joined value names something unknown"""
+        for value in values.unique():
+            for item in _split_items(value):
+                if item not in known:
+                    raise ValueError(f"Unknown {kind} {item!r}")
+
+    def rescore(self, participants_df, punishments_df):
+        """participants_df with CurrentPub, Points and Achievements worked out again
+
+        Where CompletedPubs is empty the participant is taken to have done
+        the first CurrentPub pubs of the route. CurrentPub then follows the
+        last completed pub, achievements held are kept and newly earned ones
+        awarded, and Points are PUB_POINTS per pub plus every achievement's
+        points. Unknown pubs or achievement ids raise ValueError.
+        """
+        df = participants_df.reset_index(drop=True)
+        last = len(self.pub_names)
+        prefixes = np.array([','.join(self.pub_names[:n]) for n in range(last + 1)], dtype=object)
+        current = pd.to_numeric(df['CurrentPub'], errors='coerce').fillna(0).astype(np.int64).clip(0, last)
+        completed = df['CompletedPubs'].fillna('').astype(str)
+        completed = completed.mask(completed == '', prefixes[current.to_numpy()])
+        achievements = df['Achievements'].fillna('').astype(str)
+        self._check_items(completed, self.pub_names, "pub")
+        self._check_items(achievements, self.achievements, "achievement")
+
+        pub_index = {name: i for i, name in enumerate(self.pub_names)}
+        held_points = {value: sum(self.achievements[a]['points'] for a in _split_items(value))
+                       for value in achievements.unique()}
+        df = df.assign(
+            CurrentPub=completed.str.rsplit(',', n=1).str[-1].map(pub_index).add(1).fillna(0).astype(np.int64),
+            CompletedPubs=completed,
+            Points=PUB_POINTS * count_items(completed) + achievements.map(held_points).to_numpy(dtype=np.int64),
+            Achievements=achievements,
+        )
+        return self.award_all(df, punishments_df)
+
+
+def _split_items(value):
+    return value.split(',') if value else []
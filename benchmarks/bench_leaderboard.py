@@ -0,0 +1,72 @@
+"""Leaderboard table build time: row-by-row loop vs vectorized pipeline
+
+    python benchmarks/bench_leaderboard.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from leaderboard import build_leaderboard  # noqa: E402
+from synthetic import event, synthetic_participants  # noqa: E402
+
+
+def legacy_leaderboard(participants_df, pub_names):
+    """The original iterrows() implementation, kept as the baseline"""
+    display_data = []
+    for _, row in participants_df.iterrows():
+        completed_pubs = [] if pd.isna(row['CompletedPubs']) else row['CompletedPubs'].split(',')
+        if completed_pubs == ['']:
+            completed_pubs = []
+        achievements = [] if pd.isna(row['Achievements']) else row['Achievements'].split(',')
+        if achievements == ['']:
+            achievements = []
+        current_pub = int(row['CurrentPub'])
+        current_pub_name = pub_names[current_pub] if current_pub < len(pub_names) else 'Finished!'
+        display_data.append({
+            'Name': row['Name'],
+            'Pubs Completed': len(completed_pubs),
+            'Current Location': current_pub_name,
+            'Points': int(row['Points']),
+            'Achievements': len(achievements)
+        })
+    df = pd.DataFrame(display_data)
+    return df.sort_values(['Points', 'Pubs Completed'], ascending=[False, False])
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    crawl = event()
+    pub_names = list(crawl.pub_names)
+    print(f"{'participants':>12} {'legacy ms':>11} {'vectorized ms':>14} {'speedup':>8}")
+    for n in args.sizes:
+        df = synthetic_participants(n, pub_names, list(crawl.achievements))
+        expected = legacy_leaderboard(df, pub_names)
+        actual = build_leaderboard(df, pub_names)
+        pd.testing.assert_frame_equal(expected.reset_index(drop=True), actual.reset_index(drop=True),
+                                      check_dtype=False)
+        legacy = best_of(lambda: legacy_leaderboard(df, pub_names), args.repeat if n <= 10000 else 1)
+        vectorized = best_of(lambda: build_leaderboard(df, pub_names), args.repeat)
+        print(f"{n:>12} {legacy * 1000:>11.1f} {vectorized * 1000:>14.1f} {legacy / vectorized:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
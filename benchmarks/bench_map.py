@@ -0,0 +1,114 @@
+"""Map tab cost: rebuilding the folium map per rerun vs cached base + status layer
+
+Times one st_folium() call as made by show_map() and measures the component
+payload it sends. The base map payload is only re-sent when it changes, so
+the table also shows whether it stays byte-identical between reruns.
+
+    python benchmarks/bench_map.py [--reruns 20]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import folium
+import streamlit_folium
+from streamlit_folium import st_folium
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Participant  # noqa: E402
+from route_map import RouteMap  # noqa: E402
+
+PUBS_DATA = {
+    'name': [f"Pub {i + 1}" for i in range(12)],
+    'latitude': [54.589539 + i * 0.001 for i in range(12)],
+    'longitude': [-5.934469 + i * 0.001 for i in range(12)],
+    'rules': [f"Rule number {i + 1} for this pub" for i in range(12)],
+}
+
+# st_folium returns the component's arguments here instead of rendering them
+captured = {}
+
+
+def capture(**kwargs):
+    captured.clear()
+    captured.update(kwargs)
+    return kwargs.get('default')
+
+
+def payload(keys):
+    return json.dumps({k: captured[k] for k in keys}, default=str)
+
+
+def legacy_map(participant):
+    """The original show_map() build, kept as the baseline"""
+    m = folium.Map(location=[54.595733, -5.930294], zoom_start=15, tiles="CartoDB positron")
+    for i, (name, lat, lon) in enumerate(zip(PUBS_DATA['name'], PUBS_DATA['latitude'], PUBS_DATA['longitude'])):
+        if participant.has_completed(i):
+            color, icon = 'green', 'check'
+        elif i == participant.current_pub:
+            color, icon = 'orange', 'beer'
+        else:
+            color, icon = 'red', 'info'
+        popup_text = f"""
+            <div style='width:200px'>
+                <h4>{i+1}. {name}</h4>
+                <b>Rule:</b> {PUBS_DATA['rules'][i]}<br>
+                <b>Status:</b> {'✅ Completed' if participant.has_completed(i) else
+                              '🎯 Current' if i == participant.current_pub else
+                              '⏳ Pending'}
+            </div>
+        """
+        folium.Marker([lat, lon], popup=folium.Popup(popup_text, max_width=300), tooltip=f"{i+1}. {name}",
+                      icon=folium.Icon(color=color, icon=icon, prefix='fa')).add_to(m)
+        if i > 0:
+            folium.PolyLine(locations=[[PUBS_DATA['latitude'][i-1], PUBS_DATA['longitude'][i-1]], [lat, lon]],
+                            weight=3, color='#FF4B4B', opacity=0.8, dash_array='10').add_to(m)
+    return m
+
+
+def run_legacy(participant):
+    st_folium(legacy_map(participant), height=400, width=700)
+
+
+def run_cached(route_map, participant):
+    st_folium(route_map.base_map(), render=False, returned_objects=[], key="route_map", height=400, width=700,
+              feature_group_to_add=route_map.status_layer(participant.completed, participant.current_pub))
+
+
+def measure(fn, reruns):
+    """Best time per call, plus the base and layer payloads of the last two calls"""
+    times, scripts = [], []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+        scripts.append(payload(['script', 'html', 'header', 'css_links', 'js_links']))
+    layer = captured.get('feature_group') or ''
+    return min(times), len(scripts[-1].encode()), len(layer.encode()), scripts[-1] == scripts[-2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reruns', type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    streamlit_folium._component_func = capture
+
+    participant = Participant("Bench", current_pub=5, route=range(5))
+    route_map = RouteMap(PUBS_DATA)
+    rows = [
+        ('rebuild per rerun', measure(lambda: run_legacy(participant), args.reruns)),
+        ('cached base + layer', measure(lambda: run_cached(route_map, participant), args.reruns)),
+    ]
+
+    print(f"{'approach':<20} {'ms/rerun':>9} {'base bytes':>11} {'layer bytes':>12} {'base reused':>12}")
+    for label, (seconds, base_bytes, layer_bytes, same) in rows:
+        print(f"{label:<20} {seconds * 1000:>9.1f} {base_bytes:>11} {layer_bytes:>12} {str(same):>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Cold start: how long a fresh server process takes to draw the first page
+
+Each run starts a new interpreter, imports Streamlit (as the server would
+have done already), then runs pubcrawl.py once through AppTest with the
+memory backend and collects the app's startup report. The eager column
+times the imports the app used to make before drawing anything (PyGithub,
+folium and streamlit_folium); the old module-level get_repo() request came
+on top of that and is not measured here.
+
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, logging, sys, time
+sys.path.insert(0, ROOT)
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+report = {}
+
+class Collect(logging.Handler):
+    def emit(self, record):
+        if record.msg.startswith("Startup:"):
+            report[record.args[0]] = record.args[1]
+
+logger = logging.getLogger("pubcrawl")
+logger.addHandler(Collect())
+logger.setLevel(logging.INFO)
+
+at = AppTest.from_file(ROOT + "/pubcrawl.py", default_timeout=60)
+at.secrets["Pubcrawl"] = {"GITHUB_TOKEN": "x", "STORAGE_BACKEND": "memory", "WRITE_BEHIND": False}
+at.run()
+report["eager modules loaded"] = sorted(m for m in ("github", "folium", "streamlit_folium") if m in sys.modules)
+
+start = time.perf_counter()
+import github, folium, streamlit_folium
+report["eager imports"] = time.perf_counter() - start
+print(json.dumps(report))
+"""
+
+
+def run_once():
+    out = subprocess.run([sys.executable, "-c", CHILD.replace("ROOT", repr(ROOT))], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    reports = [run_once() for _ in range(args.runs)]
+    stages = ["imports", "first paint", "eager imports"]
+    results = {stage: statistics.median(r[stage] for r in reports) for stage in stages}
+    results["eager modules loaded"] = reports[0]["eager modules loaded"]
+
+    print(f"{'stage':<16}{'median ms':>12}")
+    for stage in stages:
+        print(f"{stage:<16}{results[stage] * 1000:>12.1f}")
+    print(f"eager modules loaded before first paint: {', '.join(results['eager modules loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
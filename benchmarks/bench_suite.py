@@ -0,0 +1,205 @@
+"""Benchmark suite: the app's data paths over synthetic crawls of growing size
+
+Times what the app does behind each of its helpers, against a FakeRepo
+standing in for the GitHub repository (pubcrawl.py itself can't be imported
+outside `streamlit run`):
+
+    load_data (cold)        first SharedState.read(): fetch, parse, index, count punishments
+    load_data (warm)        SharedState.read() served from memory
+    save_data               SharedState.save() of both tables, one commit
+    csv_parse               pd.read_csv() of both tables, as every cold load does
+    columnar_load           schema.load_columnar() of both tables from an .npz snapshot
+    check_achievements      new_achievements() for one participant after a punishment
+    check_achievements_all  AchievementEngine.evaluate_all() over every participant
+    leaderboard_table       build_leaderboard() as shown by show_leaderboard()
+    team_update             one participant's check-in applied to the team standings
+    team_table              TeamBoard.table() as shown by show_leaderboard()
+    map_build               RouteMap() for the event, once per process
+    map_rerun               base_map() + status_layer() as drawn by show_map()
+
+Both tables get `rows` rows. Results are written as JSON; pass an earlier
+file as --baseline to print the ratio against it and exit non-zero if any
+operation got slower than --tolerance.
+
+    python benchmarks/bench_suite.py [--sizes 100 1000 10000 100000 1000000] [--output results.json]
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from achievements import PUB_FACTS, AchievementEngine  # noqa: E402
+from fake_repo import FakeRepo  # noqa: E402
+from leaderboard import build_leaderboard  # noqa: E402
+from models import normalize_name  # noqa: E402
+from route_map import RouteMap  # noqa: E402
+from routes import RoutePlanner  # noqa: E402
+from schema import load_columnar, save_columnar, typed_crawl  # noqa: E402
+from state import SharedState  # noqa: E402
+from storage import PARTICIPANTS_FILE, PUNISHMENTS_FILE, GitHubStorage, InstrumentedRepo  # noqa: E402
+from synthetic import event, synthetic_crawl  # noqa: E402
+
+SIZES = [100, 1000, 10000, 100000, 1000000]
+
+
+def best_of(fn, repeat, setup=None, number=1):
+    """Fastest of repeat timings of fn(setup()), setup not timed, per call
+
+    number calls are timed together, for operations too quick to time alone.
+    """
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(arg) if setup else fn()
+        times.append(time.perf_counter() - start)
+    return min(times) / number
+
+
+def repeats(rows, repeat):
+    """Fewer repeats for the big sizes, which take seconds per call"""
+    return repeat if rows <= 10000 else max(1, repeat // 3) if rows <= 100000 else 1
+
+
+def new_state(files, crawl):
+    engine = AchievementEngine(crawl.achievements, crawl.pub_names, crawl.punishments)
+    # Wrapped as connect_github() wraps the real repository
+    repo = InstrumentedRepo(FakeRepo(files))
+    return SharedState(GitHubStorage(repo, "main"), codec=crawl.codec, engine=engine)
+
+
+def bench_size(rows, crawl, repeat):
+    participants_df, punishments_df = synthetic_crawl(rows, rows, crawl)
+    files = {PARTICIPANTS_FILE: participants_df.to_csv(index=False),
+             PUNISHMENTS_FILE: punishments_df.to_csv(index=False)}
+    n = repeats(rows, repeat)
+    results = {}
+
+    results['load_data (cold)'] = best_of(lambda state: state.read(), n, lambda: new_state(files, crawl))
+    state = new_state(files, crawl)
+    state.read()
+    results['load_data (warm)'] = best_of(state.read, repeat, number=10)
+    loaded = state.read()
+    results['save_data'] = best_of(lambda _: state.save(*loaded), n, state.read)
+
+    def parse():
+        return [pd.read_csv(io.StringIO(files[path])) for path in (PARTICIPANTS_FILE, PUNISHMENTS_FILE)]
+
+    results['csv_parse'] = best_of(parse, n)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "crawl.npz")
+        save_columnar(path, *typed_crawl(participants_df, punishments_df))
+        results['columnar_load'] = best_of(lambda: load_columnar(path), n)
+
+    name = participants_df['Name'].iat[0]
+    punishment = pd.DataFrame([{'Time': '2024-11-23T23:59:59', 'Name': name, 'Pub': crawl.pub_names[0],
+                                'Punishment': crawl.punishments[0]}])
+    state.read()
+    changed = state.append_punishments(punishment).get(normalize_name(name)) or PUB_FACTS
+    participant = state.participant(name)
+    results['check_achievements'] = best_of(lambda: state.new_achievements(participant, changed), repeat,
+                                            number=1000)
+    participants_now, punishments_now = state.read()
+    results['check_achievements_all'] = best_of(
+        lambda: state.engine.evaluate_all(participants_now, punishments_now), n)
+
+    results['leaderboard_table'] = best_of(lambda: build_leaderboard(participants_df, crawl.pub_names), n)
+    row = participants_df.iloc[0]
+    results['team_update'] = best_of(
+        lambda: state.teams.update(row['Name'], row['Team'], row['Points'] + 100, 1), repeat, number=1000)
+    results['team_table'] = best_of(state.teams.table, repeat, number=100)
+    return results
+
+
+def bench_map(crawl, repeat):
+    route_map = RouteMap(crawl.pubs)
+    planner = RoutePlanner(crawl.latitudes, crawl.longitudes)
+    participant = crawl.codec.new("Bench", "2024-11-23T12:00:00")
+    for i in range(crawl.pub_count // 2):
+        participant.complete_pub(i)
+
+    def rerun():
+        route_map.base_map()
+        route_map.status_layer(participant.completed, participant.current_pub, planner.reroute(participant).path)
+
+    return {'map_build': best_of(lambda: RouteMap(crawl.pubs), repeat), 'map_rerun': best_of(rerun, repeat)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Print each operation's time against the baseline, returning the regressions"""
+    before = {(r['operation'], r['rows']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    print(f"\n{'operation':<24} {'rows':>8} {'vs baseline':>12}")
+    for r in results:
+        old = before.get((r['operation'], r['rows']))
+        if not old:
+            continue
+        ratio = r['seconds'] / old
+        flag = ' <-- slower' if ratio > tolerance else ''
+        print(f"{r['operation']:<24} {str(r['rows']):>8} {ratio:>11.2f}x{flag}")
+        if flag:
+            regressions.append(r)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--event', default='belfast')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help="earlier --output file to compare against")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    crawl = event(args.event)
+    results = []
+    print(f"{'operation':<24} {'rows':>8} {'ms':>10}")
+    for rows in args.sizes:
+        for operation, seconds in bench_size(rows, crawl, args.repeat).items():
+            results.append({'operation': operation, 'rows': rows, 'seconds': seconds})
+            print(f"{operation:<24} {rows:>8} {seconds * 1000:>10.3f}")
+    for operation, seconds in bench_map(crawl, args.repeat).items():
+        results.append({'operation': operation, 'rows': None, 'seconds': seconds})
+        print(f"{operation:<24} {'-':>8} {seconds * 1000:>10.3f}")
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'event': args.event,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            if compare(results, json.load(f), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Synthetic crawl data in the participants.csv / punishments.csv schema
+
+Rows are generated column by column with numpy, so a million of them take
+a second or two. Names, pubs, punishments and achievement ids come from an
+event definition (belfast by default), so the data loads and scores like
+the real thing.
+
+    python benchmarks/synthetic.py OUT_DIR --participants 1000 --punishments 10000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from events import load_events  # noqa: E402
+from storage import PARTICIPANTS_FILE, PUNISHMENTS_FILE  # noqa: E402
+
+DEFAULT_EVENT = 'belfast'
+START_TIME = pd.Timestamp('2024-11-23T12:00:00')
+TEAMS = 8
+
+
+def event(event_id=DEFAULT_EVENT):
+    return load_events()[event_id]
+
+
+def _timestamps(seconds, fmt):
+    """START_TIME + seconds formatted with fmt, formatting each distinct second once"""
+    unique, inverse = np.unique(seconds, return_inverse=True)
+    formatted = (START_TIME + pd.to_timedelta(unique, unit='s')).strftime(fmt)
+    return np.asarray(formatted, dtype=object)[inverse]
+
+
+def participant_names(n):
+    return [f"Participant {i}" for i in range(n)]
+
+
+def synthetic_participants(n, pub_names, achievement_ids, seed=0, teams=TEAMS):
+    """n participants at random points of the crawl, in route order, spread over teams (0 for none)"""
+    rng = np.random.default_rng(seed)
+    done = rng.integers(0, len(pub_names) + 1, n)
+    completed = np.array([','.join(pub_names[:k]) for k in range(len(pub_names) + 1)], dtype=object)
+
+    # Each achievement held with probability 1/4, joined once per combination
+    masks = (rng.random((n, len(achievement_ids))) < 0.25) @ (1 << np.arange(len(achievement_ids)))
+    combos = np.unique(masks)
+    joined = {mask: ','.join(a for i, a in enumerate(achievement_ids) if mask >> i & 1) for mask in combos}
+
+    team_names = np.array([f"Team {k + 1}" for k in range(teams)] or [''], dtype=object)
+
+    return pd.DataFrame({
+        'Name': participant_names(n),
+        'CurrentPub': done,
+        'CompletedPubs': completed[done],
+        'Points': done * 100 + rng.integers(0, 21, n) * 50,
+        'Achievements': [joined[mask] for mask in masks],
+        'StartTime': _timestamps(rng.integers(0, 3600, n), '%Y-%m-%dT%H:%M:%S'),
+        'Team': team_names[rng.integers(0, len(team_names), n)],
+    })
+
+
+def synthetic_punishments(n, names, pub_names, punishments, seed=1):
+    """n punishment events spread over the afternoon, oldest first"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Time': _timestamps(np.sort(rng.integers(0, 12 * 3600, n)), '%Y-%m-%dT%H:%M:%S'),
+        'Name': np.asarray(names, dtype=object)[rng.integers(0, len(names), n)],
+        'Pub': np.asarray(pub_names, dtype=object)[rng.integers(0, len(pub_names), n)],
+        'Punishment': np.asarray(punishments, dtype=object)[rng.integers(0, len(punishments), n)],
+    })
+
+
+def synthetic_crawl(participants, punishments, crawl=None, seed=0):
+    """(participants_df, punishments_df) for an event, punished by its own participants"""
+    crawl = crawl or event()
+    participants_df = synthetic_participants(participants, crawl.pub_names, list(crawl.achievements), seed)
+    punishments_df = synthetic_punishments(punishments, participants_df['Name'], crawl.pub_names,
+                                           crawl.punishments, seed + 1)
+    return participants_df, punishments_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--participants', type=int, default=1000)
+    parser.add_argument('--punishments', type=int, default=10000)
+    parser.add_argument('--event', default=DEFAULT_EVENT)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    participants_df, punishments_df = synthetic_crawl(args.participants, args.punishments, event(args.event),
+                                                      args.seed)
+    os.makedirs(args.out_dir, exist_ok=True)
+    participants_df.to_csv(os.path.join(args.out_dir, PARTICIPANTS_FILE), index=False)
+    punishments_df.to_csv(os.path.join(args.out_dir, PUNISHMENTS_FILE), index=False)
+
+
+if __name__ == '__main__':
+    main()
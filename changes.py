@@ -0,0 +1,82 @@
+"""Data version feed, so pages only redraw when the data has changed
+
+ChangeFeed holds a number that goes up every time the shared data changes.
+Reading it with current() is free, so a page can check it every few
+seconds and only fetch and redraw when it has moved. wait() blocks until
+the next change, for anything that would rather be told than poll.
+
+Changes made by this process publish straight away. Watcher covers changes
+made elsewhere (another server process sharing the SQLite file, an edit on
+GitHub): one thread per process checks the storage backend's version and
+publishes when it moves, however many pages are watching. It only checks
+while something has read the feed recently, so an idle server makes no
+requests.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WATCH_INTERVAL = 5  # seconds between checks of the storage backend
+IDLE_AFTER = 60     # stop checking when nobody has read the feed for this long
+
+
+class ChangeFeed:
+    """Monotonically increasing data version with change notification"""
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self.version = 0
+        self.read_at = 0.0  # when a page last asked for the version, as time.monotonic()
+
+    def current(self):
+        """The version, noting that someone is watching"""
+        self.read_at = time.monotonic()
+        return self.version
+
+    def publish(self):
+        """Record a change and wake anyone waiting, returning the new version"""
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+            return self.version
+
+    def wait(self, since, timeout=None):
+        """Block until the version passes since (or timeout), returning the version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version > since, timeout)
+            return self.current()
+
+    def watched(self, within):
+        return time.monotonic() - self.read_at < within
+
+
+class Watcher:
+    """Background thread calling check() every interval while the feed is watched
+
+    check() should compare the backend's version with the last one seen and
+    publish to the feed if it moved (see SharedState.sync).
+    """
+
+    def __init__(self, feed, check, interval=WATCH_INTERVAL, idle_after=IDLE_AFTER):
+        self.feed = feed
+        self.check = check
+        self.interval = interval
+        self.idle_after = idle_after
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="change-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.feed.watched(self.idle_after):
+                continue
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Checking for outside changes failed")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
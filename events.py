@@ -0,0 +1,111 @@
+"""Crawl definitions loaded from events/*.json
+
+Each file describes one crawl: its pubs (in route order, with coordinates and
+house rules), the wheel's punishments and the achievements on offer. The
+file name without .json is the event id, used in the ?event= query parameter.
+An optional "teams" list lets participants pick a team when they sign up.
+
+Files are validated and compiled once into read-only Event records that also
+carry the event's ParticipantCodec, so nothing is re-parsed per rerun.
+
+Every event keeps its data apart: on GitHub in its own branch, locally (the
+SQLite database and the write-behind journal) under its own data_dir.
+"""
+import json
+import os
+from collections import namedtuple
+from types import MappingProxyType
+
+from achievements import build_rules
+from models import ParticipantCodec
+
+EVENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "events")
+
+
+class Event(namedtuple('Event', ['id', 'title', 'branch', 'data_dir', 'pub_names', 'latitudes', 'longitudes',
+                                 'rules', 'punishments', 'achievements', 'achievement_categories', 'teams',
+                                 'codec'])):
+    """One crawl, immutable once loaded"""
+
+    __slots__ = ()
+
+    @property
+    def pub_count(self):
+        return len(self.pub_names)
+
+    @property
+    def pubs(self):
+        """Pub columns keyed like the original PUBS_DATA dict"""
+        return MappingProxyType({'name': self.pub_names, 'latitude': self.latitudes,
+                                 'longitude': self.longitudes, 'rules': self.rules})
+
+    def data_path(self, path):
+        """Where this event keeps a local data file, creating its directory
+
+        The event's data_dir is inserted before the file name, so
+        /var/pubcrawl.db becomes /var/data/<id>/pubcrawl.db.
+        """
+        if not self.data_dir:
+            return path
+        directory = os.path.join(os.path.dirname(path), self.data_dir)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, os.path.basename(path))
+
+
+def _freeze(achievements):
+    return MappingProxyType({ach_id: MappingProxyType(dict(ach)) for ach_id, ach in achievements.items()})
+
+
+def compile_event(event_id, config):
+    """Event from a parsed config dict, raising ValueError if it is inconsistent"""
+    try:
+        pubs = config['pubs']
+        punishments = tuple(config['punishments'])
+        achievements = _freeze(config['achievements'])
+        pub_names = tuple(pub['name'] for pub in pubs)
+        latitudes = tuple(float(pub['latitude']) for pub in pubs)
+        longitudes = tuple(float(pub['longitude']) for pub in pubs)
+        rules = tuple(pub.get('rule', '') for pub in pubs)
+        teams = tuple(str(team) for team in config.get('teams', ()))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Event {event_id!r} is missing {e}") from None
+    if not pub_names:
+        raise ValueError(f"Event {event_id!r} has no pubs")
+    if len(set(pub_names)) != len(pub_names):
+        raise ValueError(f"Event {event_id!r} lists a pub twice")
+    if len(set(teams)) != len(teams) or '' in teams:
+        raise ValueError(f"Event {event_id!r} has a blank or repeated team")
+    for ach in achievements.values():
+        if 'pub' in ach and ach['pub'] not in pub_names:
+            raise ValueError(f"Event {event_id!r}: achievement refers to unknown pub {ach['pub']!r}")
+    unknown = set(achievements) - set(build_rules(pub_names, punishments, achievements))
+    if unknown:
+        raise ValueError(f"Event {event_id!r} has achievements without rules: {', '.join(sorted(unknown))}")
+
+    categories = config.get('achievement_categories') or {"Achievements": list(achievements)}
+    return Event(
+        id=event_id,
+        title=config.get('title', event_id),
+        branch=config.get('branch', f"events/{event_id}"),
+        data_dir=config.get('data_dir', os.path.join("data", event_id)),
+        pub_names=pub_names,
+        latitudes=latitudes,
+        longitudes=longitudes,
+        rules=rules,
+        punishments=punishments,
+        achievements=achievements,
+        achievement_categories=MappingProxyType({name: tuple(ids) for name, ids in categories.items()}),
+        teams=teams,
+        codec=ParticipantCodec(pub_names, achievements),
+    )
+
+
+def load_events(directory=EVENTS_DIR):
+    """{event id: Event} for every .json file in directory"""
+    events = {}
+    for filename in sorted(os.listdir(directory)):
+        event_id, ext = os.path.splitext(filename)
+        if ext == '.json':
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                events[event_id] = compile_event(event_id, json.load(f))
+    return MappingProxyType(events)
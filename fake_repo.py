@@ -0,0 +1,251 @@
+"""In-memory stand-in for a PyGithub Repository
+
+Implements just the parts of the API that GitHubStorage uses, with the same
+error behaviour for stale shas and non fast-forward ref updates, and the
+same type checks on the trees and commits passed to create_git_tree() and
+create_git_commit(), so storage code can be exercised and benchmarked
+without a network or a token. Like PyGithub's objects, the git objects have
+a _requester, so storage.InstrumentedRepo wraps them as it would the real
+ones.
+
+    repo = FakeRepo({"participants.csv": open("participants.csv").read()})
+    storage = GitHubStorage(repo, "main")
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from github import GithubException
+
+from storage import blob_sha
+
+
+def _tree_sha(files):
+    digest = hashlib.sha1()
+    for path in sorted(files):
+        digest.update(f"{path}\0{blob_sha(files[path])}\n".encode())
+    return digest.hexdigest()
+
+
+class FakeContentFile:
+    def __init__(self, path, text):
+        self.path = path
+        self.decoded_content = text.encode()
+        self.sha = blob_sha(text)
+        self.size = len(self.decoded_content)
+
+
+class FakeGitTree:
+    _requester = None
+
+    def __init__(self, sha, tree=()):
+        self.sha = sha
+        self.tree = list(tree)
+
+
+class FakeGitCommit:
+    _requester = None
+
+    def __init__(self, sha, tree_sha, parents, message):
+        self.sha = sha
+        self.tree = FakeGitTree(tree_sha)
+        self.parents = parents
+        self.message = message
+
+
+class FakeGitRef:
+    _requester = None
+
+    def __init__(self, repo, ref):
+        self._repo = repo
+        self.ref = f"refs/{ref}"
+        self._branch = ref.split("/", 1)[1]
+        self.object = SimpleNamespace(sha=repo._heads[self._branch])
+
+    def edit(self, sha, force=False):
+        self._repo._call("ref.edit")
+        with self._repo._lock:
+            current = self._repo._heads[self._branch]
+            if not force and current not in self._repo._commits[sha].parents:
+                raise GithubException(422, {"message": "Update is not a fast forward"}, {})
+            self._repo._heads[self._branch] = sha
+            self.object = SimpleNamespace(sha=sha)
+
+    def update(self):
+        """Conditional re-read: False, like a 304, if the branch hasn't moved"""
+        self._repo._call("ref.update")
+        with self._repo._lock:
+            if self._branch not in self._repo._heads:
+                raise GithubException(404, {"message": "Not Found"}, {})
+            sha = self._repo._heads[self._branch]
+        if sha == self.object.sha:
+            self._repo.not_modified += 1
+            return False
+        self.object = SimpleNamespace(sha=sha)
+        return True
+
+
+class FakeRepo:
+    """A git repository held in memory
+
+    calls counts API requests by method name and not_modified the conditional
+    requests answered 304. latency, in seconds, is slept on every call to
+    approximate a round trip.
+    """
+
+    def __init__(self, files=None, branch="main", latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._blobs = {}
+        self._trees = {}
+        self._commits = {}
+        self._heads = {}
+        tree_sha = self._store_tree(dict(files or {}))
+        self._heads[branch] = self._store_commit(tree_sha, [], "Initial commit")
+
+    def _call(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _store_tree(self, files):
+        sha = _tree_sha(files)
+        self._trees[sha] = files
+        return sha
+
+    def _store_commit(self, tree_sha, parents, message):
+        sha = hashlib.sha1(f"{tree_sha}{parents}{message}{len(self._commits)}".encode()).hexdigest()
+        self._commits[sha] = FakeGitCommit(sha, tree_sha, list(parents), message)
+        return sha
+
+    def _files(self, ref):
+        """Files at a branch name or commit sha"""
+        sha = self._heads.get(ref, ref)
+        if sha not in self._commits:
+            raise GithubException(404, {"message": f"No commit found for the ref {ref}"}, {})
+        return self._trees[self._commits[sha].tree.sha]
+
+    def _advance(self, branch, files, message):
+        tree_sha = self._store_tree(files)
+        parent = self._heads[branch]
+        sha = self._store_commit(tree_sha, [parent], message)
+        self._heads[branch] = sha
+        return SimpleNamespace(sha=sha, parents=[SimpleNamespace(sha=parent)])
+
+    def files(self, branch="main"):
+        """Current {path: text} on a branch, for assertions"""
+        with self._lock:
+            return dict(self._files(branch))
+
+    def commit_count(self, branch="main"):
+        count, sha = 0, self._heads[branch]
+        while sha:
+            count += 1
+            parents = self._commits[sha].parents
+            sha = parents[0] if parents else None
+        return count
+
+    # Contents API
+
+    def get_contents(self, path, ref="main"):
+        self._call("get_contents")
+        with self._lock:
+            files = self._files(ref)
+            if path not in files:
+                raise GithubException(404, {"message": "Not Found"}, {})
+            return FakeContentFile(path, files[path])
+
+    def create_file(self, path, message, content, branch="main"):
+        self._call("create_file")
+        with self._lock:
+            files = dict(self._files(branch))
+            if path in files:
+                raise GithubException(422, {"message": '"sha" wasn\'t supplied.'}, {})
+            files[path] = content
+            commit = self._advance(branch, files, message)
+        return {"content": FakeContentFile(path, content), "commit": commit}
+
+    def update_file(self, path, message, content, sha, branch="main"):
+        self._call("update_file")
+        with self._lock:
+            files = dict(self._files(branch))
+            if path not in files:
+                raise GithubException(404, {"message": "Not Found"}, {})
+            if blob_sha(files[path]) != sha:
+                raise GithubException(409, {"message": f"{path} does not match {sha}"}, {})
+            files[path] = content
+            commit = self._advance(branch, files, message)
+        return {"content": FakeContentFile(path, content), "commit": commit}
+
+    def get_branch(self, branch):
+        self._call("get_branch")
+        with self._lock:
+            return SimpleNamespace(name=branch, commit=SimpleNamespace(sha=self._heads[branch]))
+
+    # Git Data API
+
+    def get_git_ref(self, ref):
+        self._call("get_git_ref")
+        with self._lock:
+            if ref.split("/", 1)[1] not in self._heads:
+                raise GithubException(404, {"message": "Not Found"}, {})
+            return FakeGitRef(self, ref)
+
+    def create_git_ref(self, ref, sha):
+        self._call("create_git_ref")
+        with self._lock:
+            ref = ref[len("refs/"):]
+            branch = ref.split("/", 1)[1]
+            if branch in self._heads:
+                raise GithubException(422, {"message": "Reference already exists"}, {})
+            self._heads[branch] = sha
+            return FakeGitRef(self, ref)
+
+    def get_git_commit(self, sha):
+        self._call("get_git_commit")
+        return self._commits[sha]
+
+    def get_git_tree(self, sha):
+        """Tree of a commit or tree sha, listing each file's blob sha"""
+        self._call("get_git_tree")
+        with self._lock:
+            tree_sha = self._commits[sha].tree.sha if sha in self._commits else sha
+            if tree_sha not in self._trees:
+                raise GithubException(404, {"message": "Not Found"}, {})
+            elements = [SimpleNamespace(path=path, type='blob', sha=blob_sha(text), size=len(text.encode()))
+                        for path, text in sorted(self._trees[tree_sha].items())]
+        return FakeGitTree(tree_sha, elements)
+
+    def create_git_blob(self, content, encoding):
+        self._call("create_git_blob")
+        with self._lock:
+            sha = blob_sha(content)
+            self._blobs[sha] = content
+            return SimpleNamespace(sha=sha)
+
+    def create_git_tree(self, tree, base_tree=None):
+        assert base_tree is None or isinstance(base_tree, FakeGitTree), base_tree
+        self._call("create_git_tree")
+        with self._lock:
+            files = dict(self._trees[base_tree.sha]) if base_tree is not None else {}
+            for element in tree:
+                identity = element._identity
+                if "content" in identity:
+                    files[identity["path"]] = identity["content"]
+                elif identity.get("sha") is None:
+                    files.pop(identity["path"], None)
+                else:
+                    files[identity["path"]] = self._blobs[identity["sha"]]
+            return FakeGitTree(self._store_tree(files))
+
+    def create_git_commit(self, message, tree, parents):
+        assert isinstance(tree, FakeGitTree), tree
+        assert all(isinstance(parent, FakeGitCommit) for parent in parents), parents
+        self._call("create_git_commit")
+        with self._lock:
+            sha = self._store_commit(tree.sha, [parent.sha for parent in parents], message)
+            return self._commits[sha]
@@ -0,0 +1,37 @@
+// Turns the pre-rendered wheel to the angles the server sends.
+// Speaks the Streamlit component postMessage protocol directly, so there is
+// no build step or npm package.
+(function () {
+  function send(type, data) {
+    window.parent.postMessage(Object.assign({isStreamlitMessage: true, type: type}, data), "*");
+  }
+
+  const wheel = document.getElementById("wheel");
+  const turns = Number(wheel.dataset.turns);
+  const seconds = Number(wheel.dataset.seconds);
+  let shownSpin = null;   // id of the spin the wheel is showing
+  let rotation = 0;
+
+  function turnTo(spin, animate) {
+    // Always turn forwards, finishing at spin.angle (mod 360)
+    const base = rotation - (rotation % 360);
+    rotation = base + (animate ? turns * 360 : 0) + spin.angle;
+    wheel.style.transition = animate ? `transform ${seconds}s cubic-bezier(0.17, 0.67, 0.12, 0.99)` : "none";
+    wheel.style.transform = `rotate(${rotation}deg)`;
+    if (animate) {
+      setTimeout(() => send("streamlit:setComponentValue", {value: spin.id, dataType: "json"}), seconds * 1000);
+    }
+  }
+
+  window.addEventListener("message", (event) => {
+    if (event.data.type !== "streamlit:render") return;
+    const args = event.data.args;
+    if (args.spin && args.spin.id !== shownSpin) {
+      shownSpin = args.spin.id;
+      turnTo(args.spin, !args.landed);
+    }
+  });
+
+  send("streamlit:componentReady", {apiVersion: 1});
+  send("streamlit:setFrameHeight", {height: 400});
+})();
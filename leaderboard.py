@@ -0,0 +1,30 @@
+"""Leaderboard table built with vectorized pandas/NumPy operations"""
+import numpy as np
+import pandas as pd
+
+LEADERBOARD_COLUMNS = ['Name', 'Pubs Completed', 'Current Location', 'Points', 'Achievements']
+
+
+def count_items(series):
+    """Number of entries in each comma-joined string, 0 for empty or missing"""
+    values = series.fillna('').astype(str)
+    return np.where(values == '', 0, values.str.count(',') + 1)
+
+
+def build_leaderboard(participants_df, pub_names):
+    """Leaderboard rows sorted by points, then pubs completed"""
+    if participants_df.empty:
+        return pd.DataFrame(columns=LEADERBOARD_COLUMNS)
+
+    # One lookup slot per pub plus a final one for everyone who has finished
+    locations = np.array(list(pub_names) + ['Finished!'], dtype=object)
+    current_pub = participants_df['CurrentPub'].to_numpy(dtype=np.int64)
+
+    df = pd.DataFrame({
+        'Name': participants_df['Name'].to_numpy(),
+        'Pubs Completed': count_items(participants_df['CompletedPubs']),
+        'Current Location': locations[np.clip(current_pub, 0, len(pub_names))],
+        'Points': participants_df['Points'].to_numpy(dtype=np.int64),
+        'Achievements': count_items(participants_df['Achievements']),
+    })
+    return df.sort_values(['Points', 'Pubs Completed'], ascending=[False, False], kind='stable')
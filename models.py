@@ -0,0 +1,173 @@
+"""Parsed participant records
+
+participants.csv stores completed pubs and achievements as comma-joined
+strings. ParticipantCodec parses each row once into a Participant, where
+completed pubs and achievements are bitmasks over the event's pub list and
+achievement ids, so counts, membership and golden-route checks are O(1).
+
+The conversion is lossless: visit and award order are kept alongside the
+masks, and to_row() reproduces the original CSV values.
+
+NameIndex maps normalized names to row positions so a participant is found
+in O(1) however they capitalise or space their name.
+"""
+import pandas as pd
+
+from storage import PARTICIPANT_COLUMNS, with_columns
+
+
+def normalize_name(name):
+    """Lookup key for a name: whitespace collapsed and case folded"""
+    return ' '.join(str(name).split()).casefold()
+
+
+def normalize_names(names):
+    """normalize_name() over a Series of names"""
+    return names.astype(str).str.split().str.join(' ').str.casefold()
+
+
+class NameIndex:
+    """Hash index from normalized participant name to row position
+
+    When several stored names normalize to the same key the first row wins,
+    so everyone typing a variant of a name lands on the original sign-up.
+    """
+
+    def __init__(self, names=()):
+        self._positions = {}
+        for position, name in enumerate(names):
+            self._positions.setdefault(normalize_name(name), position)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, name):
+        return normalize_name(name) in self._positions
+
+    def __setitem__(self, name, position):
+        self._positions[normalize_name(name)] = position
+
+    def get(self, name, default=None):
+        return self._positions.get(normalize_name(name), default)
+
+
+def _split(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)) or value == '':
+        return []
+    return str(value).split(',')
+
+
+class Participant:
+    """One participant, with pubs and achievements held as bitmasks"""
+
+    __slots__ = ('name', 'current_pub', 'points', 'start_time', 'team',
+                 'route', 'completed', 'in_order', 'awarded', 'achievements')
+
+    def __init__(self, name, current_pub=0, points=0, start_time=None, route=(), awarded=(), team=''):
+        self.name = name
+        self.team = team  # '' when not in a team
+        self.current_pub = current_pub
+        self.points = points
+        self.start_time = start_time
+        self.route = tuple(route)      # pub indices in the order they were completed
+        self.awarded = tuple(awarded)  # achievement indices in the order they were won
+        self.completed = 0
+        for i in self.route:
+            self.completed |= 1 << i
+        self.achievements = 0
+        for i in self.awarded:
+            self.achievements |= 1 << i
+        self.in_order = self.route == tuple(range(len(self.route)))
+
+    def __repr__(self):
+        return (f"Participant({self.name!r}, current_pub={self.current_pub}, points={self.points}, "
+                f"completed={self.completed:#b}, achievements={self.achievements:#b})")
+
+    def copy(self):
+        clone = Participant.__new__(Participant)
+        for slot in Participant.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        return clone
+
+    @property
+    def completed_count(self):
+        return self.completed.bit_count()
+
+    @property
+    def achievement_count(self):
+        return self.achievements.bit_count()
+
+    def has_completed(self, pub_index):
+        return bool(self.completed >> pub_index & 1)
+
+    def has_achievement(self, achievement_index):
+        return bool(self.achievements >> achievement_index & 1)
+
+    def complete_pub(self, pub_index):
+        """Mark a pub complete and move on to the next one"""
+        if not self.has_completed(pub_index):
+            self.in_order = self.in_order and pub_index == len(self.route)
+            self.route += (pub_index,)
+            self.completed |= 1 << pub_index
+        self.current_pub = pub_index + 1
+
+    def award(self, achievement_index, points):
+        """Grant an achievement, returning False if it was already held"""
+        if self.has_achievement(achievement_index):
+            return False
+        self.awarded += (achievement_index,)
+        self.achievements |= 1 << achievement_index
+        self.points += points
+        return True
+
+
+class ParticipantCodec:
+    """Converts between participants.csv rows and Participant records"""
+
+    def __init__(self, pub_names, achievement_ids):
+        self.pub_names = tuple(pub_names)
+        self.achievement_ids = tuple(achievement_ids)
+        self.pub_index = {name: i for i, name in enumerate(self.pub_names)}
+        self.achievement_index = {ach_id: i for i, ach_id in enumerate(self.achievement_ids)}
+
+    def _lookup(self, index, values, kind):
+        try:
+            return [index[value] for value in values]
+        except KeyError as e:
+            raise ValueError(f"Unknown {kind} {e.args[0]!r}") from None
+
+    def new(self, name, start_time, team=''):
+        return Participant(name, start_time=start_time, team=team)
+
+    def parse(self, row):
+        """Participant from a participants.csv row (any mapping)"""
+        start_time = row['StartTime']
+        team = row.get('Team')
+        return Participant(
+            row['Name'],
+            current_pub=int(row['CurrentPub']),
+            points=int(row['Points']),
+            start_time=None if pd.isna(start_time) else start_time,
+            route=self._lookup(self.pub_index, _split(row['CompletedPubs']), "pub"),
+            awarded=self._lookup(self.achievement_index, _split(row['Achievements']), "achievement"),
+            team='' if team is None or pd.isna(team) else str(team),
+        )
+
+    def parse_frame(self, participants_df):
+        """Participant for every row of a participants frame, in row order"""
+        rows = with_columns(participants_df, PARTICIPANT_COLUMNS)[PARTICIPANT_COLUMNS]
+        return [self.parse(row) for row in rows.to_dict('records')]
+
+    def to_row(self, participant):
+        return {
+            'Name': participant.name,
+            'CurrentPub': participant.current_pub,
+            'CompletedPubs': ','.join(self.pub_names[i] for i in participant.route),
+            'Points': participant.points,
+            'Achievements': ','.join(self.achievement_ids[i] for i in participant.awarded),
+            'StartTime': participant.start_time,
+            'Team': participant.team,
+        }
+
+    def to_frame(self, participants):
+        return pd.DataFrame([self.to_row(p) for p in participants], columns=PARTICIPANT_COLUMNS)
@@ -1,714 +1,376 @@
+import time
+STARTED = time.perf_counter()  # start of this script run, for the startup report
+
+import hashlib
+import logging
+import os
 import streamlit as st
 import pandas as pd
-import folium
-from streamlit_folium import st_folium
-import random
-import time
 from datetime import datetime
-from github import Github
-from github import GithubException
-import io
-import streamlit.components.v1 as components
+from achievements import PUB_FACTS, PUB_POINTS, AchievementEngine
+from changes import Watcher
+from leaderboard import build_leaderboard
+from events import load_events
+from models import normalize_name
+from recent import RecentPunishments
+from routes import RoutePlanner
+from state import SharedState, Snapshot
+import telemetry
+from storage import (PUNISHMENT_COLUMNS, REPO_NAME, GitHubStorage, MemoryStorage, SQLiteStorage, connect_github,
+                     empty_participants, empty_punishments)
+from teams import TEAM_COLUMNS
+from wheel import Wheel
+from writer import WriteBehind
+
+# folium, streamlit_folium and PyGithub are imported when first needed, so the
+# page can draw before they have loaded
+
+logger = logging.getLogger("pubcrawl")  # the script runs as __main__
+
+@st.cache_resource
+def get_startup_report():
+    """{stage: seconds after its script run started}, first time each stage is reached in this process"""
+    return {}
+
+def report_startup(stage):
+    """Add stage to the startup report and log it, the first time it is reached"""
+    report = get_startup_report()
+    if stage not in report:
+        report[stage] = time.perf_counter() - STARTED
+        logger.info("Startup: %s after %.3fs", stage, report[stage])
+
+report_startup("imports")
+
+# Events: one crawl per events/<id>.json, picked with ?event=<id>
+DEFAULT_EVENT = st.secrets["Pubcrawl"].get("EVENT", "belfast")
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "pubcrawl.css")
+
+@st.cache_resource
+def get_events():
+    """Compiled event definitions, loaded once per process"""
+    return load_events()
+
+EVENT = get_events().get(st.query_params.get("event", DEFAULT_EVENT))
 
 # Page config
-st.set_page_config(page_title="Belfast 12 Pubs of Christmas", page_icon="🍺", layout="wide")
-
-# Custom CSS with simplified wheel
-st.markdown("""
-    <style>
-    /* Base styles */
-    .stProgress .st-bo { background-color: #ff4b4b; }
-    .stProgress .st-bp { background-color: #28a745; }
-    .pub-timer { font-size: 24px; font-weight: bold; color: #ff4b4b; }
-    .achievement {
-        padding: 10px;
-        margin: 5px;
-        border-radius: 5px;
-        background: linear-gradient(45deg, #4CAF50, #45a049);
-        color: white;
-        margin-bottom: 10px;
-    }
-    .locked-achievement {
-        padding: 10px;
-        margin: 5px;
-        border-radius: 5px;
-        background: #f0f2f6;
-        opacity: 0.7;
-        margin-bottom: 10px;
-    }
-
-    /* Simple Prize Wheel Styles */
-    .wheel-container {
-        width: 300px;
-        height: 300px;
-        margin: 50px auto;
-        position: relative;
-    }
-
-    .wheel {
-        width: 100%;
-        height: 100%;
-        border-radius: 50%;
-        position: relative;
-        border: 10px solid gold;
-        box-shadow: 0 0 0 10px #333;
-        transition: transform 4s cubic-bezier(0.17, 0.67, 0.12, 0.99);
-    }
-
-    .wheel-section {
-        position: absolute;
-        width: 50%;
-        height: 50%;
-        background: var(--color);
-        transform-origin: 100% 100%;
-        clip-path: polygon(100% 50%, 100% 100%, 0 100%, 0 50%);
-    }
-
-    .wheel.spinning {
-        animation: spin 4s cubic-bezier(0.17, 0.67, 0.12, 0.99);
-    }
-
-    @keyframes spin {
-        0% { transform: rotate(0deg); }
-        100% { transform: rotate(3600deg); }
-    }
-
-    .wheel-pointer {
-        position: absolute;
-        top: -20px;
-        left: 50%;
-        transform: translateX(-50%);
-        width: 20px;
-        height: 40px;
-        background: red;
-        clip-path: polygon(50% 100%, 0 0, 100% 0);
-        z-index: 2;
-    }
-
-    .wheel-center {
-        position: absolute;
-        width: 40px;
-        height: 40px;
-        background: gold;
-        border: 5px solid #333;
-        border-radius: 50%;
-        top: 50%;
-        left: 50%;
-        transform: translate(-50%, -50%);
-        z-index: 1;
-    }
-    </style>
-""", unsafe_allow_html=True)
+st.set_page_config(page_title=EVENT.title if EVENT else "Pub Crawl", page_icon="🍺", layout="wide")
+
+if EVENT is None:
+    st.error(f"Unknown event. Try one of: {', '.join(get_events())}")
+    st.stop()
+
+# Custom CSS, from static/pubcrawl.css (the wheel styles itself, see frontend/wheel)
+@st.cache_resource
+def get_stylesheet():
+    """Link to the stylesheet, or the stylesheet itself if static files aren't served"""
+    with open(STYLESHEET_PATH, encoding='utf-8') as f:
+        css = f.read()
+    if st.get_option("server.enableStaticServing"):
+        # Static files are revalidated by ETag; the version only changes the URL when the file does
+        version = hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+        return f'<link rel="stylesheet" href="app/static/pubcrawl.css?v={version}">'
+    return f"<style>{css}</style>"
+
+st.markdown(get_stylesheet(), unsafe_allow_html=True)
 
 # GitHub configuration
 GITHUB_TOKEN = st.secrets["Pubcrawl"]["GITHUB_TOKEN"]
-REPO_NAME = "kirkpatrick8/pubcrawl"
-BRANCH_NAME = "main"
-
-# Initialize GitHub client
-g = Github(GITHUB_TOKEN)
-repo = g.get_repo(REPO_NAME)
-
-# Constants
-PUBS_DATA = {
-    'name': [
-        "Downstairs Lavery's", "The Points", "Sweet Afton", "Kelly's Cellars",
-        "Whites Tavern", "The Deer's Head", "The John Hewitt", "Duke of York",
-        "The Harp Bar", "The Dirty Onion", "Thirsty Goat", "Ulster Sports Club"
-    ],
-    'latitude': [
-        54.589539, 54.591556, 54.595067, 54.599553, 54.600033, 54.601439,
-        54.601928, 54.601803, 54.602000, 54.601556, 54.601308, 54.600733
-    ],
-    'longitude': [
-        -5.934469, -5.933333, -5.932894, -5.932236, -5.928497, -5.930294,
-        -5.928617, -5.927442, -5.927058, -5.926673, -5.926417, -5.925219
-    ],
-    'rules': [
-        "Christmas attire Required and speak to someone new", "Last Names Only", "No Swearing Challenge",
-        "Power Hour (Down Drink in 2-3 Gulps)", "No Phones & Drink with Left Hand Only",
-        "Must Speak in Different Accents", "Different Drink Type Required",
-        "Must Bow Before Taking a Drink", "Double Parked",
-        "The Arm Pub (Drink from Someone Else's Arm)",
-        "Photo Challenge (get a photo with a stranger)", "Buddy System - Final Challenge"
-    ]
-}
-
-PUNISHMENTS = [
-    "Buy Mark a Drink", "Irish dance for 30 seconds", "Touch your Toes",
-    "Down your drink", "Shot for you or a friend", "Sing a Christmas carol",
-    "Switch drinks with someone", "No Punishment", 
-    "Wear your jumper inside out", "Give someone your drink",
-    "Talk in an accent for 10 mins", "Tell a fake back story to a random person"
-]
-
-# Achievement definitions
-ACHIEVEMENTS = {
-    'first_pub': {'name': 'First Timer', 'desc': 'Complete your first pub', 'points': 100},
-    'halfway': {'name': 'Halfway Hero', 'desc': 'Complete 6 pubs', 'points': 250},
-    'finisher': {'name': 'Challenge Champion', 'desc': 'Complete all 12 pubs', 'points': 1000},
-    'rule_breaker': {'name': 'Rule Breaker', 'desc': 'Get punished 3 times', 'points': 50},
-    'dance_master': {'name': 'Dance Master', 'desc': 'Get the Irish dance punishment twice', 'points': 150},
-    'karaoke_king': {'name': 'Karaoke King/Queen', 'desc': 'Sing two Christmas carols as punishment', 'points': 150},
-    'silent_warrior': {'name': 'Silent Warrior', 'desc': 'Complete No Swearing Challenge without punishment', 'points': 200},
-    'phone_free': {'name': 'Phone Free Zone', 'desc': 'Complete No Phones rule without checking phone', 'points': 200},
-    'perfect_run': {'name': 'Perfect Run', 'desc': 'Complete all pubs with no punishments', 'points': 500},
-    'punishment_collector': {'name': 'Punishment Collector', 'desc': 'Receive every type of punishment', 'points': 400},
-    'speed_demon': {'name': 'Speed Demon', 'desc': 'Complete route in under 3 hours', 'points': 400},
-    'golden_route': {'name': 'Golden Route', 'desc': 'Visit pubs in perfect order without skipping', 'points': 50}
-}
-# Data management functions
-@st.cache_data(ttl=10)  # Cache for 10 seconds
-def load_data():
-    """Load data from GitHub"""
+
+# Storage configuration: "github" (default), "sqlite" or "memory"
+STORAGE_BACKEND = st.secrets["Pubcrawl"].get("STORAGE_BACKEND", "github")
+SQLITE_PATH = st.secrets["Pubcrawl"].get("SQLITE_PATH", "pubcrawl.db")
+
+# Queue writes and flush them in the background, journalled to JOURNAL_PATH
+WRITE_BEHIND = st.secrets["Pubcrawl"].get("WRITE_BEHIND", True)
+JOURNAL_PATH = st.secrets["Pubcrawl"].get("JOURNAL_PATH", "pubcrawl.journal.jsonl")
+
+# How often the leaderboard checks for new data, and the server checks storage for outside changes
+LIVE_SECONDS = st.secrets["Pubcrawl"].get("LIVE_SECONDS", 5)
+RECENT_SHOWN = 5  # punishments listed under the leaderboard
+
+# Show how many data reads each rerun makes in the sidebar (always logged if it isn't one)
+SHOW_READ_COUNT = st.secrets["Pubcrawl"].get("SHOW_READ_COUNT", False)
+
+# Telemetry: JSONL log of timings and errors (off unless set), and the key that
+# shows the telemetry panel to whoever opens the app with ?admin=<key>
+TELEMETRY_LOG = st.secrets["Pubcrawl"].get("TELEMETRY_LOG")
+ADMIN_KEY = st.secrets["Pubcrawl"].get("ADMIN_KEY")
+
+# Fix the wheel's random sequence, e.g. for testing
+WHEEL_SEED = st.secrets["Pubcrawl"].get("WHEEL_SEED")
+
+@st.cache_resource
+def start_telemetry_log():
+    """Open the telemetry log once per process"""
+    telemetry.metrics.log_to(TELEMETRY_LOG)
+
+start_telemetry_log()
+
+def report_error(message, operation, e):
+    """Show an error in the sidebar, counting and logging it for the telemetry panel"""
+    st.sidebar.error(f"{message}: {e}")
+    telemetry.event("error", operation=operation, error=repr(e))
+    logger.warning("%s failed", operation, exc_info=e)
+
+# Data management functions, with one set of resources per event
+@st.cache_resource
+def get_repo():
+    """GitHub repository, connected on first use rather than at import"""
+    return connect_github(GITHUB_TOKEN, REPO_NAME)
+
+@st.cache_resource
+def get_storage(event_id):
+    """Create the configured storage backend once per process and event"""
+    event = get_events()[event_id]
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteStorage(event.data_path(SQLITE_PATH))
+    if STORAGE_BACKEND == "memory":
+        return MemoryStorage()
+    return GitHubStorage(get_repo(), event.branch)
+
+@st.cache_resource
+def get_route_map(event_id):
+    """Static route map built once per process and event"""
+    from route_map import RouteMap
+    return RouteMap(get_events()[event_id].pubs)
+
+@st.cache_resource
+def get_route_planner(event_id):
+    """Walking distances between the event's pubs, with cached route plans"""
+    event = get_events()[event_id]
+    return RoutePlanner(event.latitudes, event.longitudes)
+
+@st.cache_resource
+def get_wheel(event_id):
+    """Wheel for the event's punishments, built once, seeded with WHEEL_SEED if set"""
+    return Wheel(get_events()[event_id].punishments, WHEEL_SEED)
+
+@st.cache_resource
+def get_state(event_id):
+    """Shared in-memory copy of an event's data, one per process for all sessions"""
+    event = get_events()[event_id]
+    storage = get_storage(event_id)
+    writer = WriteBehind(storage, event.data_path(JOURNAL_PATH)) if WRITE_BEHIND else None
+    engine = AchievementEngine(event.achievements, event.pub_names, event.punishments)
+    return SharedState(storage, writer, codec=event.codec, engine=engine)
+
+@st.cache_resource
+def get_watcher(event_id):
+    """Thread publishing outside changes to the event's data, while anyone is watching"""
+    state = get_state(event_id)
+    return Watcher(state.feed, state.sync, LIVE_SECONDS)
+
+@telemetry.timed("load_data")
+def load_snapshot(name):
+    """The one read of a rerun: both tables plus the participant's record"""
     try:
-        participants_file = "participants.csv"
-        punishments_file = "punishments.csv"
-        
-        try:
-            content = repo.get_contents(participants_file, ref=BRANCH_NAME)
-            participants_df = pd.read_csv(io.StringIO(content.decoded_content.decode()))
-        except:
-            participants_df = pd.DataFrame(columns=['Name', 'CurrentPub', 'CompletedPubs', 'Points', 'Achievements', 'StartTime'])
-        
-        try:
-            content = repo.get_contents(punishments_file, ref=BRANCH_NAME)
-            punishments_df = pd.read_csv(io.StringIO(content.decoded_content.decode()))
-        except:
-            punishments_df = pd.DataFrame(columns=['Time', 'Name', 'Pub', 'Punishment'])
-        
-        return participants_df, punishments_df
+        return get_state(EVENT.id).snapshot(name)
     except Exception as e:
-        st.sidebar.error(f"Error loading data: {e}")
-        return pd.DataFrame(columns=['Name', 'CurrentPub', 'CompletedPubs', 'Points', 'Achievements', 'StartTime']), \
-               pd.DataFrame(columns=['Time', 'Name', 'Pub', 'Punishment'])
+        report_error("Error loading data", "load_data", e)
+        return Snapshot(0, empty_participants(), empty_punishments(), None, RecentPunishments(),
+                        pd.DataFrame(columns=TEAM_COLUMNS))
 
-def save_data(participants_df, punishments_df):
-    """Save data to GitHub"""
+@telemetry.timed("load_participant")
+def get_participant(name):
+    """Parsed record for a participant, or None if they haven't signed up"""
     try:
-        # Save participants
-        try:
-            contents = repo.get_contents("participants.csv", ref=BRANCH_NAME)
-            repo.update_file(
-                "participants.csv",
-                f"Update participants - {datetime.now()}",
-                participants_df.to_csv(index=False),
-                contents.sha,
-                branch=BRANCH_NAME
-            )
-        except:
-            repo.create_file(
-                "participants.csv",
-                f"Create participants file - {datetime.now()}",
-                participants_df.to_csv(index=False),
-                branch=BRANCH_NAME
-            )
-        
-        # Save punishments
-        try:
-            contents = repo.get_contents("punishments.csv", ref=BRANCH_NAME)
-            repo.update_file(
-                "punishments.csv",
-                f"Update punishments - {datetime.now()}",
-                punishments_df.to_csv(index=False),
-                contents.sha,
-                branch=BRANCH_NAME
-            )
-        except:
-            repo.create_file(
-                "punishments.csv",
-                f"Create punishments file - {datetime.now()}",
-                punishments_df.to_csv(index=False),
-                branch=BRANCH_NAME
-            )
+        return get_state(EVENT.id).participant(name)
+    except Exception as e:
+        report_error("Error loading data", "load_participant", e)
+        return None
+
+@telemetry.timed("save_participant")
+def save_participant(participant):
+    """Write a single participant record through the shared state"""
+    try:
+        get_state(EVENT.id).upsert_participants(EVENT.codec.to_frame([participant]))
+    except Exception as e:
+        report_error("Error saving data", "save_participant", e)
+
+@telemetry.timed("record_punishment")
+def record_punishment(punishment_df):
+    """Append new punishment events, returning the facts they changed per participant"""
+    try:
+        return get_state(EVENT.id).append_punishments(punishment_df)
     except Exception as e:
-        st.sidebar.error(f"Error saving data: {e}")
+        report_error("Error saving data", "record_punishment", e)
+        return {}
 
 def auto_refresh():
     """Helper function for refreshing the app"""
-    st.cache_data.clear()
-    time.sleep(0.1)
     st.rerun()
 
-def check_achievements(name, participants_df, punishments_df=None):
-    """Check and award achievements"""
-    participant = participants_df[participants_df['Name'] == name].iloc[0]
-    achievements = [] if pd.isna(participant['Achievements']) else participant['Achievements'].split(',')
-    if achievements == ['']:
-        achievements = []
-    
-    completed_pubs = [] if pd.isna(participant['CompletedPubs']) else participant['CompletedPubs'].split(',')
-    if completed_pubs == ['']:
-        completed_pubs = []
-    
-    completed_count = len(completed_pubs)
-    points_added = 0
-    
-    def award_achievement(ach_id):
-        nonlocal points_added
-        if ach_id not in achievements:
-            achievements.append(ach_id)
-            points_added += ACHIEVEMENTS[ach_id]['points']
-            st.balloons()
-            st.success(f"🏆 Achievement Unlocked: {ACHIEVEMENTS[ach_id]['name']}!")
-    
-    # Check basic achievements
-    if completed_count >= 1:
-        award_achievement('first_pub')
-    if completed_count >= 6:
-        award_achievement('halfway')
-    if completed_count == 12:
-        award_achievement('finisher')
-    
-    # Check special achievements
-    if punishments_df is not None:
-        user_punishments = punishments_df[punishments_df['Name'] == name]
-        
-        # Rule breaker achievement
-        if len(user_punishments) >= 3:
-            award_achievement('rule_breaker')
-        
-        # Dance Master achievement
-        dance_count = len(user_punishments[user_punishments['Punishment'].str.contains('Irish dance', case=False)])
-        if dance_count >= 2:
-            award_achievement('dance_master')
-        
-        # Karaoke King/Queen achievement
-        carol_count = len(user_punishments[user_punishments['Punishment'].str.contains('Christmas carol', case=False)])
-        if carol_count >= 2:
-            award_achievement('karaoke_king')
-        
-        # Silent Warrior & Phone Free achievements
-        if completed_count > 2:
-            no_swearing_punishments = user_punishments[user_punishments['Pub'] == PUBS_DATA['name'][2]]
-            if len(no_swearing_punishments) == 0:
-                award_achievement('silent_warrior')
-        
-        if completed_count > 4:
-            no_phone_punishments = user_punishments[user_punishments['Pub'] == PUBS_DATA['name'][4]]
-            if len(no_phone_punishments) == 0:
-                award_achievement('phone_free')
-        
-        # Perfect Run achievement
-        if completed_count == 12 and len(user_punishments) == 0:
-            award_achievement('perfect_run')
-        
-        # Punishment Collector achievement
-        if len(set(user_punishments['Punishment'])) == len(PUNISHMENTS):
-            award_achievement('punishment_collector')
-    
-    # Speed Demon achievement
-    if completed_count == 12 and not pd.isna(participant['StartTime']):
-        start_time = datetime.fromisoformat(participant['StartTime'])
-        end_time = datetime.now()
-        total_hours = (end_time - start_time).total_seconds() / 3600
-        if total_hours <= 3:
-            award_achievement('speed_demon')
-    
-    # Golden Route achievement
-    if completed_count > 0:
-        expected_order = PUBS_DATA['name'][:completed_count]
-        if completed_pubs == expected_order:
-            award_achievement('golden_route')
+@telemetry.timed("check_achievements")
+def check_achievements(participant, changed=PUB_FACTS):
+    """Award achievements whose rules read any of the changed facts"""
+    try:
+        earned = get_state(EVENT.id).new_achievements(participant, changed)
+    except Exception as e:
+        report_error("Error checking achievements", "check_achievements", e)
+        return participant
     
-    # Update achievements and points
-    participants_df.loc[participants_df['Name'] == name, 'Achievements'] = ','.join(achievements) if achievements else ''
-    if points_added > 0:
-        participants_df.loc[participants_df['Name'] == name, 'Points'] += points_added
+    for ach_id in earned:
+        participant.award(EVENT.codec.achievement_index[ach_id], EVENT.achievements[ach_id]['points'])
+        st.balloons()
+        st.success(f"🏆 Achievement Unlocked: {EVENT.achievements[ach_id]['name']}!")
     
-    return participants_df
+    return participant
 
 def name_entry_modal():
     """Display name entry modal"""
-    if 'current_participant' not in st.session_state:
+    # Names are per event, so start again when the session switches events
+    if st.session_state.get('event') != EVENT.id:
+        st.session_state.event = EVENT.id
         st.session_state.current_participant = None
         
     if st.session_state.current_participant is None:
         with st.container():
-            st.markdown("### Welcome to the Belfast 12 Pubs of Christmas! 🎄")
+            st.markdown(f"### Welcome to the {EVENT.title}! 🎄")
+            team = ''
+            if EVENT.teams:
+                team = st.selectbox("Team", ('',) + EVENT.teams, format_func=lambda t: t or "No team")
             name = st.text_input("Enter your name to begin:")
             if name:
-                st.session_state.current_participant = name
-                
-                # Initialize participant data if needed
-                participants_df, punishments_df = load_data()
-                if name not in participants_df['Name'].values:
-                    new_participant = pd.DataFrame([{
-                        'Name': name,
-                        'CurrentPub': 0,
-                        'CompletedPubs': '',
-                        'Points': 0,
-                        'Achievements': '',
-                        'StartTime': datetime.now().isoformat()
-                    }])
-                    participants_df = pd.concat([participants_df, new_participant], ignore_index=True)
-                    save_data(participants_df, punishments_df)
+                # Initialize participant data if needed; "mark kirkie " finds "Mark Kirkie"
+                participant = get_participant(name)
+                if participant is None:
+                    participant = EVENT.codec.new(name.strip(), datetime.now().isoformat(), team)
+                    save_participant(participant)
+                st.session_state.current_participant = participant.name
                 
                 auto_refresh()
-def show_map():
+@telemetry.timed("tab.map")
+def show_map(snapshot):
     """Display interactive map"""
+    from streamlit_folium import st_folium
     st.header("🗺️ Pub Route Map")
     
     try:
-        participants_df, _ = load_data()
-        participant = participants_df[participants_df['Name'] == st.session_state.current_participant].iloc[0]
-        completed_pubs = [] if pd.isna(participant['CompletedPubs']) else participant['CompletedPubs'].split(',')
-        if completed_pubs == ['']:
-            completed_pubs = []
-        
-        m = folium.Map(
-            location=[54.595733, -5.930294],
-            zoom_start=15,
-            tiles="CartoDB positron"
-        )
-        
-        for i, (name, lat, lon) in enumerate(zip(
-            PUBS_DATA['name'],
-            PUBS_DATA['latitude'],
-            PUBS_DATA['longitude']
-        )):
-            # Determine marker style
-            if name in completed_pubs:
-                color = 'green'
-                icon = 'check'
-            elif i == int(participant['CurrentPub']):
-                color = 'orange'
-                icon = 'beer'
-            else:
-                color = 'red'
-                icon = 'info'
-            
-            # Create popup content
-            popup_text = f"""
-                <div style='width:200px'>
-                    <h4>{i+1}. {name}</h4>
-                    <b>Rule:</b> {PUBS_DATA['rules'][i]}<br>
-                    <b>Status:</b> {'✅ Completed' if name in completed_pubs else 
-                                  '🎯 Current' if i == int(participant['CurrentPub']) else 
-                                  '⏳ Pending'}
-                </div>
-            """
-            
-            # Add marker
-            folium.Marker(
-                [lat, lon],
-                popup=folium.Popup(popup_text, max_width=300),
-                tooltip=f"{i+1}. {name}",
-                icon=folium.Icon(color=color, icon=icon, prefix='fa')
-            ).add_to(m)
-            
-            # Connect pubs with line
-            if i > 0:
-                folium.PolyLine(
-                    locations=[
-                        [PUBS_DATA['latitude'][i-1], PUBS_DATA['longitude'][i-1]],
-                        [lat, lon]
-                    ],
-                    weight=3,
-                    color='#FF4B4B',
-                    opacity=0.8,
-                    dash_array='10'
-                ).add_to(m)
-        
-        # Display map with fixed dimensions
-        st_folium(m, height=400, width=700)
+        participant = snapshot.participant
+        route_map = get_route_map(EVENT.id)
+        
+        # Shared base map with this participant's progress layered on top. The copy is
+        # unrendered, so st_folium's extra whole-figure render pass is skipped, and
+        # returned_objects=[] stops panning and zooming from rerunning the app.
+        route = get_route_planner(EVENT.id).reroute(participant)
+        st_folium(route_map.base_map(), render=False, returned_objects=[], key="route_map", height=400, width=700,
+                  feature_group_to_add=route_map.status_layer(participant.completed, participant.current_pub,
+                                                              route.path))
+        if route.stops:
+            st.caption(f"Green line: shortest walk round the {len(route.stops)} pubs you have left "
+                       f"({route.distance / 1000:.1f} km)")
         
     except Exception as e:
         st.error("Error displaying map. Please refresh the page.")
+        telemetry.event("error", operation="show_map", error=repr(e))
 
-def show_punishment_wheel():
-    """Display smoothly spinning wheel with synchronized punishment selection"""
+@telemetry.timed("tab.wheel")
+def show_punishment_wheel(snapshot):
+    """Spin the wheel: the punishment is picked and saved at once, the browser animates to it"""
     st.header("😈 Rule Breaker's Wheel")
     
-    wheel_html = """
-    <div class="wheel-container">
-        <div class="wheel-pointer"></div>
-        <div id="wheel" class="wheel">
-            <div class="wheel-section" data-punishment="Buy Mark a Drink" style="--color: #FF4B4B; transform: rotate(0deg);">
-                <span class="wheel-text">Buy Drink</span>
-            </div>
-            <div class="wheel-section" data-punishment="Irish dance for 30 seconds" style="--color: #4CAF50; transform: rotate(30deg);">
-                <span class="wheel-text">Dance</span>
-            </div>
-            <div class="wheel-section" data-punishment="Tell an embarrassing story" style="--color: #2196F3; transform: rotate(60deg);">
-                <span class="wheel-text">Story</span>
-            </div>
-            <div class="wheel-section" data-punishment="Down your drink" style="--color: #FFC107; transform: rotate(90deg);">
-                <span class="wheel-text">Down It</span>
-            </div>
-            <div class="wheel-section" data-punishment="Add a shot to your next drink" style="--color: #9C27B0; transform: rotate(120deg);">
-                <span class="wheel-text">Add Shot</span>
-            </div>
-            <div class="wheel-section" data-punishment="Sing a Christmas carol" style="--color: #FF9800; transform: rotate(150deg);">
-                <span class="wheel-text">Carol</span>
-            </div>
-            <div class="wheel-section" data-punishment="Switch drinks with someone" style="--color: #E91E63; transform: rotate(180deg);">
-                <span class="wheel-text">Switch</span>
-            </div>
-            <div class="wheel-section" data-punishment="No phone for next 2 pubs" style="--color: #00BCD4; transform: rotate(210deg);">
-                <span class="wheel-text">No Phone</span>
-            </div>
-            <div class="wheel-section" data-punishment="Wear your jumper inside out" style="--color: #8BC34A; transform: rotate(240deg);">
-                <span class="wheel-text">Jumper</span>
-            </div>
-            <div class="wheel-section" data-punishment="Give someone your drink" style="--color: #FF5722; transform: rotate(270deg);">
-                <span class="wheel-text">Give Drink</span>
-            </div>
-            <div class="wheel-section" data-punishment="Talk in an accent for 10 mins" style="--color: #3F51B5; transform: rotate(300deg);">
-                <span class="wheel-text">Accent</span>
-            </div>
-            <div class="wheel-section" data-punishment="Do 10 jumping jacks" style="--color: #009688; transform: rotate(330deg);">
-                <span class="wheel-text">Jumps</span>
-            </div>
-            <div class="wheel-center"></div>
-        </div>
-    </div>
-
-    <style>
-    .wheel-container {
-        width: 300px;
-        height: 300px;
-        margin: 50px auto;
-        position: relative;
-        perspective: 1000px;
-    }
-
-    .wheel {
-        width: 100%;
-        height: 100%;
-        border-radius: 50%;
-        position: relative;
-        border: 10px solid gold;
-        box-shadow: 0 0 0 10px #333;
-        transform: rotate(0deg);
-        transition: transform 4s cubic-bezier(0.17, 0.67, 0.12, 0.99);
-        transform-style: preserve-3d;
-    }
-
-    .wheel-section {
-        position: absolute;
-        width: 50%;
-        height: 50%;
-        background: var(--color);
-        transform-origin: 100% 100%;
-        clip-path: polygon(100% 50%, 100% 100%, 0 100%, 0 50%);
-        display: flex;
-        align-items: center;
-        justify-content: center;
-    }
-
-    .wheel-text {
-        position: absolute;
-        left: 30%;
-        top: 30%;
-        transform: rotate(-60deg);
-        color: white;
-        font-size: 12px;
-        font-weight: bold;
-        text-shadow: 1px 1px 2px black;
-        white-space: nowrap;
-    }
-
-    .wheel-pointer {
-        position: absolute;
-        top: -20px;
-        left: 50%;
-        transform: translateX(-50%);
-        width: 20px;
-        height: 40px;
-        background: red;
-        clip-path: polygon(50% 100%, 0 0, 100% 0);
-        z-index: 2;
-    }
-
-    .wheel-center {
-        position: absolute;
-        width: 40px;
-        height: 40px;
-        background: gold;
-        border: 5px solid #333;
-        border-radius: 50%;
-        top: 50%;
-        left: 50%;
-        transform: translate(-50%, -50%);
-        z-index: 1;
-    }
-
-    .wheel.spinning {
-        animation: spin 4s cubic-bezier(0.17, 0.67, 0.12, 0.99);
-    }
-
-    @keyframes blur {
-        0% { filter: blur(0); }
-        50% { filter: blur(2px); }
-        100% { filter: blur(0); }
-    }
-    </style>
-
-    <script>
-    let isSpinning = false;
-    let selectedPunishment = '';
-
-    function spinWheel() {
-        if (isSpinning) return;
-        
-        const wheel = document.getElementById('wheel');
-        isSpinning = true;
-
-        // Calculate random final position (30-degree increments for 12 sections)
-        const sectionAngle = 30;
-        const randomSection = Math.floor(Math.random() * 12);
-        const finalAngle = randomSection * sectionAngle;
-        
-        // Add multiple full rotations plus the final position
-        const rotations = 5;
-        const totalDegrees = (rotations * 360) + finalAngle;
-        
-        // Apply smooth spinning animation
-        wheel.style.transition = 'transform 4s cubic-bezier(0.17, 0.67, 0.12, 0.99)';
-        wheel.style.transform = `rotate(${totalDegrees}deg)`;
-
-        // Get the selected punishment
-        setTimeout(() => {
-            const sections = document.querySelectorAll('.wheel-section');
-            const selectedSection = sections[11 - randomSection];
-            selectedPunishment = selectedSection.dataset.punishment;
-            
-            // Store the selected punishment in a hidden input
-            const punishmentInput = document.createElement('input');
-            punishmentInput.type = 'hidden';
-            punishmentInput.id = 'selectedPunishment';
-            punishmentInput.value = selectedPunishment;
-            document.body.appendChild(punishmentInput);
-            
-            isSpinning = false;
-        }, 4000);
-    }
-    </script>
-    """
-
     if st.button("Spin the Wheel", type="primary", key="spin_button"):
-        # Show spinning wheel and initiate spin
-        components.html(wheel_html + "<script>spinWheel()</script>", height=400)
-        
-        # Wait for animation
-        with st.spinner("Spinning..."):
-            time.sleep(4)  # Match the animation duration
-        
-        # Get punishment and save to database
-        participants_df, punishments_df = load_data()
-        participant = participants_df[participants_df['Name'] == st.session_state.current_participant].iloc[0]
-        current_pub = PUBS_DATA['name'][int(participant['CurrentPub'])]
-        
-        # Select punishment based on wheel position
-        punishment = random.choice(PUNISHMENTS)  # Fallback in case of issues
+        participant = snapshot.participant
+        current_pub = EVENT.pub_names[min(participant.current_pub, EVENT.pub_count - 1)]
+        spin = get_wheel(EVENT.id).spin()
         
         new_punishment = pd.DataFrame([{
-            'Time': datetime.now().strftime('%H:%M:%S'),
-            'Name': st.session_state.current_participant,
+            'Time': datetime.now().isoformat(timespec='seconds'),
+            'Name': participant.name,
             'Pub': current_pub,
-            'Punishment': punishment
+            'Punishment': spin.punishment
         }])
         
-        punishments_df = pd.concat([punishments_df, new_punishment], ignore_index=True)
-        save_data(participants_df, punishments_df)
+        changed = record_punishment(new_punishment).get(normalize_name(participant.name))
+        if changed:
+            awarded = participant.achievements
+            participant = check_achievements(participant, changed)
+            if participant.achievements != awarded:
+                save_participant(participant)
         
-        st.snow()
-        st.success(f"Your punishment is: {punishment}")
-    else:
-        # Show static wheel
-        components.html(wheel_html, height=400)
-
-def show_progress(name):
+        st.session_state.spin = spin
+    
+    # The wheel reports the spin back once it stops, which reruns the script
+    spin = st.session_state.get('spin')
+    landed = st.session_state.get('spin_landed')
+    stopped = get_wheel(EVENT.id).render(spin, landed=spin is not None and landed == spin.id, key="wheel")
+    if spin is not None and stopped == spin.id:
+        if landed != spin.id:
+            st.session_state.spin_landed = spin.id
+            st.snow()
+        st.success(f"Your punishment is: {spin.punishment}")
+
+@telemetry.timed("tab.progress")
+def show_progress(name, snapshot):
     """Show progress for current participant"""
-    participants_df, _ = load_data()
+    participant = snapshot.participant
     
     # Check if participant exists, if not create new entry
-    if len(participants_df[participants_df['Name'] == name]) == 0:
-        new_participant = pd.DataFrame([{
-            'Name': name,
-            'CurrentPub': 0,
-            'CompletedPubs': '',
-            'Points': 0,
-            'Achievements': '',
-            'StartTime': datetime.now().isoformat()
-        }])
-        participants_df = pd.concat([participants_df, new_participant], ignore_index=True)
-        save_data(participants_df, load_data()[1])
-    
-    participant = participants_df[participants_df['Name'] == name].iloc[0]
+    if participant is None:
+        participant = EVENT.codec.new(name, datetime.now().isoformat())
+        save_participant(participant)
     
     st.header(f"Progress Tracker for {name}")
+    if participant.team:
+        st.caption(f"👥 Team {participant.team}")
     
     # Progress calculations
-    completed_pubs = [] if pd.isna(participant['CompletedPubs']) else participant['CompletedPubs'].split(',')
-    if completed_pubs == ['']:
-        completed_pubs = []
-    
-    progress = len(completed_pubs)
-    current_pub = int(participant['CurrentPub'])
+    progress = participant.completed_count
+    current_pub = participant.current_pub
     
     # Display progress
-    st.progress(progress/12)
+    st.progress(progress/EVENT.pub_count)
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Pubs Completed", f"{progress}/12")
+        st.metric("Pubs Completed", f"{progress}/{EVENT.pub_count}")
     with col2:
-        st.metric("Pubs Remaining", f"{12-progress}")
+        route = get_route_planner(EVENT.id).reroute(participant)
+        st.metric("Pubs Remaining", f"{EVENT.pub_count-progress}",
+                  help=f"{route.distance / 1000:.1f} km walk on the suggested route" if route.stops else None)
     with col3:
-        st.metric("Points", int(participant['Points']))
+        st.metric("Points", participant.points)
     
     # Current pub information
-    if current_pub < 12:
-        current_pub_name = PUBS_DATA['name'][current_pub]
-        current_rule = PUBS_DATA['rules'][current_pub]
+    if current_pub < EVENT.pub_count:
+        current_pub_name = EVENT.pub_names[current_pub]
+        current_rule = EVENT.rules[current_pub]
         
         st.subheader(f"Current Pub: {current_pub_name}")
         st.info(f"Rule: {current_rule}")
+        if route.stops:
+            st.caption("Suggested route: " + " → ".join(EVENT.pub_names[i] for i in route.stops))
         
         if st.button("Mark Current Pub as Complete", type="primary"):
-            # Update completed pubs
-            completed_pubs.append(current_pub_name)
-            participant_idx = participants_df[participants_df['Name'] == name].index[0]
-            
             # Update participant data
-            participants_df.loc[participant_idx, 'CompletedPubs'] = ','.join(completed_pubs)
-            participants_df.loc[participant_idx, 'CurrentPub'] = current_pub + 1
-            participants_df.loc[participant_idx, 'Points'] += 100
+            participant.complete_pub(current_pub)
+            participant.points += PUB_POINTS
             
             # Check achievements
-            participants_df = check_achievements(name, participants_df)
+            participant = check_achievements(participant)
             
             # Save and refresh
-            save_data(participants_df, load_data()[1])
+            save_participant(participant)
             auto_refresh()
     else:
-        st.success("🎉 Congratulations! You've completed the Belfast 12 Pubs of Christmas! 🎉")
+        st.success(f"🎉 Congratulations! You've completed the {EVENT.title}! 🎉")
 
-def show_achievements(name):
+@telemetry.timed("tab.achievements")
+def show_achievements(snapshot):
     """Display achievements"""
-    participants_df = load_data()[0]
-    participant = participants_df[participants_df['Name'] == name].iloc[0]
-    earned_achievements = [] if pd.isna(participant['Achievements']) else participant['Achievements'].split(',')
-    if earned_achievements == ['']:
-        earned_achievements = []
+    participant = snapshot.participant
+    earned_achievements = [ach_id for ach_id, i in EVENT.codec.achievement_index.items()
+                           if participant.has_achievement(i)]
     
     st.subheader("🏆 Your Achievements")
     
-    categories = {
-        "Progress": ['first_pub', 'halfway', 'finisher', 'rule_breaker'],
-        "Challenges": ['dance_master', 'karaoke_king', 'silent_warrior', 'phone_free'],
-        "Legendary": ['perfect_run', 'punishment_collector', 'speed_demon', 'golden_route']
-    }
-    
-    for category, achievement_ids in categories.items():
+    for category, achievement_ids in EVENT.achievement_categories.items():
         st.markdown(f"### {category}")
         
         # Show earned achievements
         earned_in_category = [ach for ach in achievement_ids if ach in earned_achievements]
         for ach_id in earned_in_category:
-            ach = ACHIEVEMENTS[ach_id]
+            ach = EVENT.achievements[ach_id]
             st.markdown(f"""
                 <div class="achievement">
                     <h3>{ach['name']} ✨</h3>
@@ -720,7 +382,7 @@ def show_achievements(name):
         # Show locked achievements
         locked_in_category = [ach for ach in achievement_ids if ach not in earned_achievements]
         for ach_id in locked_in_category:
-            ach = ACHIEVEMENTS[ach_id]
+            ach = EVENT.achievements[ach_id]
             st.markdown(f"""
                 <div class="locked-achievement">
                     <h3>🔒 {ach['name']}</h3>
@@ -729,77 +391,134 @@ def show_achievements(name):
                 </div>
             """, unsafe_allow_html=True)
 
-def show_leaderboard():
+@telemetry.timed("tab.leaderboard")
+def show_leaderboard(snapshot):
     """Display leaderboard"""
     st.header("🏆 Leaderboard")
     
-    participants_df, punishments_df = load_data()
+    # Filled by live_leaderboard, which only redraws them when the data changes
+    board, teams, recent = st.empty(), st.empty(), st.empty()
+    live_leaderboard(board, teams, recent, snapshot, {})
+
+@st.fragment(run_every=LIVE_SECONDS)
+@telemetry.timed("tab.leaderboard.live")
+def live_leaderboard(board, teams, recent, snapshot, shown):
+    """Draw the leaderboard, team standings and recent punishments, then keep them up to date
     
-    if not participants_df.empty:
-        # Prepare leaderboard data
-        display_data = []
-        for _, row in participants_df.iterrows():
-            completed_pubs = [] if pd.isna(row['CompletedPubs']) else row['CompletedPubs'].split(',')
-            if completed_pubs == ['']:
-                completed_pubs = []
-            
-            achievements = [] if pd.isna(row['Achievements']) else row['Achievements'].split(',')
-            if achievements == ['']:
-                achievements = []
-            
-            current_pub = int(row['CurrentPub'])
-            current_pub_name = PUBS_DATA['name'][current_pub] if current_pub < 12 else 'Finished!'
-            
-            display_data.append({
-                'Name': row['Name'],
-                'Pubs Completed': len(completed_pubs),
-                'Current Location': current_pub_name,
-                'Points': int(row['Points']),
-                'Achievements': len(achievements)
-            })
-        
-        df = pd.DataFrame(display_data)
-        df = df.sort_values(['Points', 'Pubs Completed'], ascending=[False, False])
-        st.dataframe(df, use_container_width=True)
+    Runs with the page, then on its own every LIVE_SECONDS. Those runs only
+    look at the data version and re-read and redraw when it has moved. The
+    placeholders are outside the fragment, so they keep their contents when
+    it draws nothing. shown lasts until the next full page run.
+    """
+    version = get_state(EVENT.id).feed.current()
+    if shown:
+        if shown['version'] == version:
+            return
+        snapshot = load_snapshot(None)
+    shown['version'] = snapshot.version
     
-    if not punishments_df.empty:
-        st.subheader("😈 Recent Punishments")
-        recent = punishments_df.tail(5).sort_values('Time', ascending=False)
-        st.dataframe(recent, use_container_width=True)
-
+    participants_df = snapshot.participants
+    
+    with board.container():
+        if not participants_df.empty:
+            df = build_leaderboard(participants_df, EVENT.pub_names)
+            st.dataframe(df, use_container_width=True)
+    
+    with teams.container():
+        if not snapshot.teams.empty:
+            st.subheader("👥 Teams")
+            st.dataframe(snapshot.teams, use_container_width=True, hide_index=True,
+                         column_config={'Average Points': st.column_config.NumberColumn(format="%.1f")})
+    
+    with recent.container():
+        if len(snapshot.recent):
+            st.subheader("😈 Recent Punishments")
+            recent_df = pd.DataFrame(snapshot.recent.last(RECENT_SHOWN), columns=PUNISHMENT_COLUMNS)
+            st.dataframe(recent_df, use_container_width=True, hide_index=True,
+                         column_config={'Time': st.column_config.DatetimeColumn(format="ddd HH:mm:ss")})
+
+def show_admin_panel():
+    """Telemetry for this server process, in the sidebar"""
+    data = telemetry.metrics.snapshot()
+    with st.sidebar.expander("📈 Telemetry"):
+        gauges = data['gauges']
+        if 'github.rate_limit_remaining' in gauges:
+            reset = datetime.fromtimestamp(gauges['github.rate_limit_reset']).strftime('%H:%M:%S')
+            st.metric("GitHub requests left",
+                      f"{gauges['github.rate_limit_remaining']}/{gauges['github.rate_limit_limit']}",
+                      help=f"Resets at {reset}")
+        
+        if data['spans']:
+            spans = pd.DataFrame.from_dict(data['spans'], orient='index')
+            spans['mean ms'] = spans['total'] / spans['count'] * 1000
+            spans['max ms'] = spans['max'] * 1000
+            st.dataframe(spans[['count', 'errors', 'mean ms', 'max ms']].sort_values('mean ms', ascending=False)
+                         .round(1), use_container_width=True)
+        
+        if data['counters']:
+            st.dataframe(pd.Series(data['counters'], name='count').sort_index(), use_container_width=True)
+        
+        st.download_button("Prometheus metrics", telemetry.metrics.prometheus(), file_name="pubcrawl.prom",
+                           mime="text/plain", on_click="ignore")
+
+@telemetry.timed("rerun")
 def main():
-    st.title("🎄 Belfast 12 Pubs of Christmas 🍺")
+    st.title(f"🎄 {EVENT.title} 🍺")
+    report_startup("first paint")
     
     name_entry_modal()
     
     if st.session_state.current_participant:
+        state = get_state(EVENT.id)
+        state.take_read_count()
+        get_watcher(EVENT.id)
+        
         # Add refresh button in sidebar
         if st.sidebar.button("Refresh Data"):
+            state.expire()
             auto_refresh()
         
-        # Main navigation
+        # Main navigation. Only the open tab runs; switching tabs reruns the script.
         tabs = st.tabs([
             "👥 Leaderboard",
             "📊 My Progress",
             "🗺️ Map",
             "🎯 Punishment Wheel",
             "🏆 Achievements"
-        ])
+        ], key="tab", on_change="rerun")
+        
+        # Every view renders from this one read
+        snapshot = load_snapshot(st.session_state.current_participant)
+        report_startup("first data")
         
         with tabs[0]:
-            show_leaderboard()
+            if tabs[0].open:
+                show_leaderboard(snapshot)
         
         with tabs[1]:
-            show_progress(st.session_state.current_participant)
+            if tabs[1].open:
+                show_progress(st.session_state.current_participant, snapshot)
         
         with tabs[2]:
-            show_map()
+            if tabs[2].open:
+                show_map(snapshot)
         
         with tabs[3]:
-            show_punishment_wheel()
+            if tabs[3].open:
+                show_punishment_wheel(snapshot)
         
         with tabs[4]:
-            show_achievements(st.session_state.current_participant)
+            if tabs[4].open:
+                show_achievements(snapshot)
+        
+        reads = state.take_read_count()
+        if reads != 1:
+            logger.warning("Rerun made %d data reads, expected 1", reads)
+        if SHOW_READ_COUNT:
+            st.sidebar.caption(f"Data reads this rerun: {reads} (data version {snapshot.version})")
+    
+    if ADMIN_KEY and st.query_params.get("admin") == ADMIN_KEY:
+        show_admin_panel()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,203 @@
+"""Command-line import, export and replay of an event's data
+
+Works on the same storage the app uses, configured from the [Pubcrawl]
+section of .streamlit/secrets.toml (EVENT, STORAGE_BACKEND, SQLITE_PATH,
+GITHUB_TOKEN), which the options below override:
+
+    python pubcrawl_cli.py import --participants group.csv --punishments events.jsonl
+    python pubcrawl_cli.py export backup/           (CSV files; or backup.npz, backup.parquet)
+    python pubcrawl_cli.py replay --dry-run
+
+import reads CSV or JSONL. Participants are matched to existing ones by
+name the way the app matches them, and columns a file leaves out keep
+their stored values. Punishments already stored are not added twice.
+
+import and replay both rework CurrentPub, Points and Achievements for every
+participant in one vectorized pass (AchievementEngine.rescore) and write
+the result with a single storage save, one commit on GitHub. A running
+app picks the change up when it next checks the storage version.
+"""
+import argparse
+import os
+import sys
+import tomllib
+from datetime import datetime
+
+import pandas as pd
+
+from achievements import AchievementEngine
+from events import load_events
+from models import NameIndex, normalize_names
+from schema import save_columnar, typed_crawl
+from storage import (PARTICIPANT_COLUMNS, PARTICIPANTS_FILE, PUNISHMENT_COLUMNS, PUNISHMENTS_FILE, REPO_NAME,
+                     GitHubStorage, SQLiteStorage, connect_github, empty_punishments, merge_punishments,
+                     upsert_rows)
+
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".streamlit", "secrets.toml")
+
+
+def read_secrets(path=SECRETS_PATH):
+    """The [Pubcrawl] secrets the app runs with, or {} without a secrets file"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'rb') as f:
+        return tomllib.load(f).get("Pubcrawl", {})
+
+
+def open_storage(event, backend, sqlite_path, token):
+    """The event's storage backend, as get_storage() in pubcrawl.py opens it"""
+    if backend == "sqlite":
+        return SQLiteStorage(event.data_path(sqlite_path))
+    if backend == "github":
+        if not token:
+            raise SystemExit("GitHub storage needs GITHUB_TOKEN in the secrets or the environment")
+        return GitHubStorage(connect_github(token, REPO_NAME), event.branch)
+    raise SystemExit(f"Unknown storage backend {backend!r}")
+
+
+def read_rows(path, columns):
+    """Rows of a .csv or .jsonl file, keeping only the given columns it has
+
+    Lists in JSONL (completed pubs, achievements) are comma-joined as in
+    participants.csv.
+    """
+    if path.endswith('.jsonl'):
+        df = pd.read_json(path, lines=True, dtype=False)
+        for column in df.columns:
+            df[column] = df[column].map(lambda v: ','.join(map(str, v)) if isinstance(v, list) else v)
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    if 'Name' not in df.columns:
+        raise SystemExit(f"{path} has no Name column")
+    return df[[column for column in columns if column in df.columns]]
+
+
+def _complete_participants(rows, participants_df, index):
+    """One row per participant with every column, blanks taken from the stored row or a default
+
+    Rows for the same person are combined, the later ones filling in or
+    overriding the earlier, under the name first given.
+    """
+    defaults = {'CurrentPub': 0, 'CompletedPubs': '', 'Points': 0, 'Achievements': '',
+                'StartTime': datetime.now().isoformat(), 'Team': ''}
+    keys = normalize_names(rows['Name'])
+    names = rows['Name'].groupby(keys, sort=False).first()
+    rows = rows.replace('', None).groupby(keys, sort=False).last().assign(Name=names).reset_index(drop=True)
+    positions = [index.get(name) for name in rows['Name']]
+    stored = participants_df.reset_index(drop=True).reindex([-1 if p is None else p for p in positions])
+    for column, default in defaults.items():
+        given = rows[column] if column in rows.columns else pd.Series(None, index=rows.index, dtype=object)
+        rows[column] = given.fillna(stored[column].reset_index(drop=True)).fillna(default).to_numpy()
+    # Files are read as text; the stored counts are int64
+    for column in ('CurrentPub', 'Points'):
+        values = pd.to_numeric(rows[column], errors='coerce')
+        if values.isna().any():
+            raise SystemExit(f"{column} must be a whole number, not {rows[column][values.isna()].iat[0]!r}")
+        rows[column] = values.astype('int64')
+    return rows[PARTICIPANT_COLUMNS]
+
+
+def import_rows(participants_df, punishments_df, new_participants, new_punishments, event):
+    """(participants_df, punishments_df) with the new rows merged in and everyone rescored"""
+    participants_df = participants_df.reset_index(drop=True).copy()
+    index = NameIndex(participants_df['Name'])
+    if new_participants is not None and not new_participants.empty:
+        rows = _complete_participants(new_participants, participants_df, index)
+        participants_df = upsert_rows(participants_df, rows, index)
+    if new_punishments is not None and not new_punishments.empty:
+        missing = [column for column in PUNISHMENT_COLUMNS if column not in new_punishments.columns]
+        if missing:
+            raise SystemExit(f"Punishments need {', '.join(missing)} columns")
+        for column, known in (('Pub', event.pub_names), ('Punishment', event.punishments)):
+            unknown = set(new_punishments[column]) - set(known)
+            if unknown:
+                raise SystemExit(f"Unknown {column.lower()} {sorted(unknown)[0]!r}")
+        names = participants_df['Name']
+        stored = [name if index.get(name) is None else names.iat[index.get(name)] for name in new_punishments['Name']]
+        rows = new_punishments.assign(Name=stored)[PUNISHMENT_COLUMNS]
+        punishments_df = merge_punishments(empty_punishments(), rows, punishments_df)
+    return participants_df, punishments_df
+
+
+def _comparable(participants_df):
+    df = participants_df[PARTICIPANT_COLUMNS].reset_index(drop=True)
+    df = df.astype(object).where(df.notna(), '')
+    for column in ('CurrentPub', 'Points'):
+        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(int)
+    return df.astype(str)
+
+
+def summarize(before, after):
+    """What a write would change, as a line of text
+
+    Rows keep their positions through import_rows() and rescore(), with new
+    participants appended, so rows are compared position by position.
+    """
+    (old_participants, old_punishments), (new_participants, new_punishments) = before, after
+    old, new = _comparable(old_participants), _comparable(new_participants)
+    updated = int((new.iloc[:len(old)] != old).any(axis=1).sum())
+    return (f"{len(new) - len(old)} participants added, {updated} updated, "
+            f"{len(new_punishments) - len(old_punishments)} punishments added")
+
+
+def export(participants_df, punishments_df, out):
+    """Write a snapshot: .npz or .parquet (see schema.py), otherwise a directory of CSV files"""
+    if out.endswith(('.npz', '.parquet')):
+        save_columnar(out, *typed_crawl(participants_df, punishments_df))
+        return
+    os.makedirs(out, exist_ok=True)
+    participants_df.to_csv(os.path.join(out, PARTICIPANTS_FILE), index=False)
+    punishments_df.to_csv(os.path.join(out, PUNISHMENTS_FILE), index=False)
+
+
+def main(argv=None):
+    secrets = read_secrets()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--event', default=secrets.get("EVENT", "belfast"))
+    parser.add_argument('--backend', default=secrets.get("STORAGE_BACKEND", "github"), choices=['github', 'sqlite'])
+    parser.add_argument('--sqlite-path', default=secrets.get("SQLITE_PATH", "pubcrawl.db"))
+    commands = parser.add_subparsers(dest='command', required=True)
+    load = commands.add_parser('import', help="add or update participants and punishments from CSV or JSONL")
+    load.add_argument('--participants', help="participants file")
+    load.add_argument('--punishments', help="punishments file")
+    load.add_argument('--dry-run', action='store_true', help="report what would change without writing")
+    dump = commands.add_parser('export', help="write the stored data to a snapshot")
+    dump.add_argument('out', help="directory for CSV files, or a .npz / .parquet path")
+    replay = commands.add_parser('replay', help="rescore every participant from the stored data and write it back")
+    replay.add_argument('--dry-run', action='store_true', help="report what would change without writing")
+    args = parser.parse_args(argv)
+
+    event = load_events().get(args.event)
+    if event is None:
+        raise SystemExit(f"Unknown event {args.event!r}")
+    storage = open_storage(event, args.backend, args.sqlite_path,
+                           secrets.get("GITHUB_TOKEN") or os.environ.get("GITHUB_TOKEN"))
+    participants_df, punishments_df = storage.load()
+
+    if args.command == 'export':
+        export(participants_df, punishments_df, args.out)
+        print(f"Exported {len(participants_df)} participants and {len(punishments_df)} punishments to {args.out}")
+        return
+
+    if args.command == 'import':
+        if not args.participants and not args.punishments:
+            parser.error("import needs --participants and/or --punishments")
+        new_participants = read_rows(args.participants, PARTICIPANT_COLUMNS) if args.participants else None
+        new_punishments = read_rows(args.punishments, PUNISHMENT_COLUMNS) if args.punishments else None
+        updated = import_rows(participants_df, punishments_df, new_participants, new_punishments, event)
+    else:
+        updated = participants_df, punishments_df
+    engine = AchievementEngine(event.achievements, event.pub_names, event.punishments)
+    try:
+        updated = engine.rescore(*updated), updated[1]
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    print(summarize((participants_df, punishments_df), updated))
+    if not args.dry_run:
+        storage.save(*updated)
+        print("Saved")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
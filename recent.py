@@ -0,0 +1,109 @@
+"""The latest punishments, in time order, for the Recent Punishments feed
+
+RecentPunishments keeps the newest `capacity` events in a ring buffer
+(a bounded deque): a new event is pushed on the end and the oldest one
+falls off, so memory and every query are bounded by the capacity rather
+than by the length of the history. Events are kept sorted by time, and
+queries binary-search on it:
+
+    recent.last(5)                      newest first
+    recent.since(start)                 oldest first
+    recent.per_pub(start, end)          {pub: count} in [start, end)
+
+SharedState fills one from the tail of the punishment history on each load
+and pushes appended punishments into it. Snapshots carry a copy.
+"""
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque, namedtuple
+from itertools import islice
+
+import pandas as pd
+
+from schema import punishment_times
+
+RECENT_CAPACITY = 500
+
+PunishmentEvent = namedtuple('PunishmentEvent', ['time', 'name', 'pub', 'punishment'])
+
+
+class _Times:
+    """Sequence view of an event deque's times, for bisect"""
+
+    __slots__ = ('events',)
+
+    def __init__(self, events):
+        self.events = events
+
+    def __len__(self):
+        return len(self.events)
+
+    def __getitem__(self, i):
+        return self.events[i].time
+
+
+class RecentPunishments:
+    """Bounded, time-ordered buffer of the newest punishment events"""
+
+    def __init__(self, capacity=RECENT_CAPACITY):
+        self.capacity = capacity
+        self._events = deque(maxlen=capacity)
+
+    @classmethod
+    def from_frame(cls, punishments_df, day=None, capacity=RECENT_CAPACITY):
+        """Buffer over the last capacity rows of a punishment history
+
+        Only the tail is parsed; day places bare HH:MM:SS times (see
+        schema.punishment_times).
+        """
+        recent = cls(capacity)
+        recent.push_frame(punishments_df.tail(capacity), day)
+        return recent
+
+    def __len__(self):
+        return len(self._events)
+
+    def __iter__(self):
+        return iter(self._events)
+
+    def copy(self):
+        clone = RecentPunishments(self.capacity)
+        clone._events.extend(self._events)
+        return clone
+
+    def push(self, event):
+        """Add an event, keeping time order; one older than a full buffer is dropped"""
+        events = self._events
+        if not events or event.time >= events[-1].time:
+            events.append(event)
+            return
+        position = bisect_right(_Times(events), event.time)
+        if len(events) == self.capacity:
+            if position == 0:
+                return
+            events.popleft()
+            position -= 1
+        events.insert(position, event)
+
+    def push_frame(self, rows, day=None):
+        """Push every row of a punishment frame"""
+        times = punishment_times(rows['Time'], day)
+        for time, name, pub, punishment in zip(times, rows['Name'], rows['Pub'], rows['Punishment']):
+            if not pd.isna(time):
+                self.push(PunishmentEvent(time.to_pydatetime(), name, pub, punishment))
+
+    def last(self, n):
+        """The n newest events, newest first"""
+        return list(islice(reversed(self._events), n))
+
+    def since(self, start):
+        """Events at or after start, oldest first"""
+        return list(islice(self._events, bisect_left(_Times(self._events), start), None))
+
+    def between(self, start, end):
+        """Events in [start, end), oldest first"""
+        times = _Times(self._events)
+        return list(islice(self._events, bisect_left(times, start), bisect_left(times, end)))
+
+    def per_pub(self, start, end):
+        """{pub: punishments} over [start, end)"""
+        return Counter(event.pub for event in self.between(start, end))
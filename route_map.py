@@ -0,0 +1,123 @@
+"""Route map split into a shared static layer and a per-participant status layer
+
+The base map (tiles, route polylines, pub markers and their popups) is the
+same for everyone, so it is built once per process. Each participant only
+adds a small GeoJSON layer colouring every pub completed, current or
+pending, plus their suggested route for the pubs left; st_folium ships that as a feature group, so the browser keeps the
+base map and just swaps the layer when progress changes.
+
+Rendering a folium element changes it (scripts and styles are appended to
+its parents), so the cached maps and layers are templates: every rerun
+renders a copy. Copies keep the template's element ids, which makes the
+generated JavaScript byte-identical from one rerun to the next.
+"""
+import copy
+
+import folium
+
+MAP_CENTER = [54.595733, -5.930294]
+
+# status -> (colour, label)
+STATUS_STYLES = {
+    'completed': ('green', '✅ Completed'),
+    'current': ('orange', '🎯 Current'),
+    'pending': ('red', '⏳ Pending'),
+}
+
+
+def pub_statuses(completed, current_pub, pub_count):
+    """Status of each pub for a completed-pubs bitmask and current pub index"""
+    return ['completed' if completed >> i & 1 else 'current' if i == current_pub else 'pending'
+            for i in range(pub_count)]
+
+
+class RouteMap:
+    """Cached base map and per-progress status layers for one set of pubs"""
+
+    def __init__(self, pubs_data, max_layers=256):
+        self.pubs_data = pubs_data
+        self.max_layers = max_layers
+        self._base = self._build_base()
+        self._layers = {}  # (completed, current_pub, path) -> status layer template
+
+    def _pubs(self):
+        return enumerate(zip(self.pubs_data['name'], self.pubs_data['latitude'],
+                             self.pubs_data['longitude'], self.pubs_data['rules']))
+
+    def _build_base(self):
+        m = folium.Map(location=MAP_CENTER, zoom_start=15, tiles="CartoDB positron")
+        previous = None
+        for i, (name, lat, lon, rule) in self._pubs():
+            popup_text = f"""
+                <div style='width:200px'>
+                    <h4>{i+1}. {name}</h4>
+                    <b>Rule:</b> {rule}
+                </div>
+            """
+            folium.Marker(
+                [lat, lon],
+                popup=folium.Popup(popup_text, max_width=300),
+                tooltip=f"{i+1}. {name}",
+                icon=folium.Icon(color='cadetblue', icon='beer', prefix='fa')
+            ).add_to(m)
+
+            # Connect pubs with line
+            if previous is not None:
+                folium.PolyLine(
+                    locations=[previous, [lat, lon]],
+                    weight=3,
+                    color='#FF4B4B',
+                    opacity=0.8,
+                    dash_array='10'
+                ).add_to(m)
+            previous = [lat, lon]
+        return m
+
+    def status_geojson(self, completed, current_pub):
+        """GeoJSON points carrying each pub's status for this participant"""
+        statuses = pub_statuses(completed, current_pub, len(self.pubs_data['name']))
+        return {
+            'type': 'FeatureCollection',
+            'features': [{
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                'properties': {'pub': f"{i+1}. {name}", 'status': STATUS_STYLES[statuses[i]][1],
+                               'color': STATUS_STYLES[statuses[i]][0]},
+            } for i, (name, lat, lon, _) in self._pubs()],
+        }
+
+    def base_map(self):
+        """A fresh copy of the static map, ready to render"""
+        return copy.deepcopy(self._base)
+
+    def status_layer(self, completed, current_pub, path=()):
+        """A fresh copy of the feature group colouring each pub by status
+
+        path is an optional suggested route (pub indices) drawn over the map.
+        """
+        key = (completed, current_pub, tuple(path))
+        layer = self._layers.get(key)
+        if layer is None:
+            layer = folium.FeatureGroup(name="Progress")
+            folium.GeoJson(
+                self.status_geojson(completed, current_pub),
+                marker=folium.CircleMarker(radius=18, weight=2),
+                style_function=lambda feature: {
+                    'color': feature['properties']['color'],
+                    'fillColor': feature['properties']['color'],
+                    'fillOpacity': 0.35,
+                },
+                tooltip=folium.GeoJsonTooltip(fields=['pub', 'status'], labels=False),
+            ).add_to(layer)
+            if len(path) > 1:
+                folium.PolyLine(
+                    locations=[[self.pubs_data['latitude'][i], self.pubs_data['longitude'][i]] for i in path],
+                    weight=4,
+                    color='#2E7D32',
+                    opacity=0.8,
+                    tooltip="Suggested route"
+                ).add_to(layer)
+            if len(self._layers) >= self.max_layers:
+                self._layers.pop(next(iter(self._layers)))
+            self._layers[key] = layer
+        return copy.deepcopy(layer)
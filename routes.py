@@ -0,0 +1,164 @@
+"""Walking route planning over venue coordinates
+
+Distances come from a haversine matrix computed once with NumPy. Visiting
+orders are open paths from a fixed start, found with nearest neighbour and
+then improved with 2-opt (reverse a stretch) and Or-opt (move a run of up to
+three stops) until neither helps. Each improvement pass is vectorised over
+the candidate positions, so a few hundred venues plan in well under a second.
+
+Plans are cached by venue set and start, so every participant with the same
+pubs left and the same current pub shares one computation.
+"""
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+import telemetry
+
+EARTH_RADIUS_M = 6371008.8
+EPSILON = 1e-9  # ignore improvements smaller than float noise
+MAX_SEGMENT = 3  # longest run of stops Or-opt tries to move
+
+
+class Route(namedtuple('Route', ['start', 'stops', 'distance'])):
+    """Venue indices in visiting order and the metres walked from start"""
+
+    __slots__ = ()
+
+    @property
+    def path(self):
+        """Every point walked through, including the start"""
+        if not self.stops or self.stops[0] == self.start:
+            return self.stops
+        return (self.start,) + self.stops
+
+
+def haversine_matrix(latitudes, longitudes):
+    """Great-circle distance in metres between every pair of points"""
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def path_length(path, dist):
+    path = np.asarray(path)
+    return float(dist[path[:-1], path[1:]].sum()) if len(path) > 1 else 0.0
+
+
+def nearest_neighbor(nodes, dist):
+    """Greedy path visiting nodes, starting at nodes[0]"""
+    path = [nodes[0]]
+    left = np.asarray(nodes[1:])
+    while len(left):
+        nearest = int(np.argmin(dist[path[-1], left]))
+        path.append(int(left[nearest]))
+        left = np.delete(left, nearest)
+    return path
+
+
+def _two_opt(path, dist):
+    """Reverse stretches of path while that shortens it; path[-1] is a free end"""
+    n = len(path) - 1
+    improved = False
+    for i in range(1, n - 1):
+        a, b = path[i - 1], path[i]
+        c, d = path[i + 1:n], path[i + 2:n + 1]
+        delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+        j = int(np.argmin(delta))
+        if delta[j] < -EPSILON:
+            path[i:i + j + 2] = path[i:i + j + 2][::-1].copy()
+            improved = True
+    return improved
+
+
+def _or_opt(path, dist):
+    """Move runs of up to MAX_SEGMENT stops to where they are cheapest"""
+    improved = False
+    for k in range(1, MAX_SEGMENT + 1):
+        i = 1
+        while i + k < len(path):
+            first, last = path[i], path[i + k - 1]
+            prev, nxt = path[i - 1], path[i + k]
+            gain = dist[prev, first] + dist[last, nxt] - dist[prev, nxt]
+            rest = np.concatenate([path[:i], path[i + k:]])
+            x, y = rest[:-1], rest[1:]
+            cost = dist[x, first] + dist[last, y] - dist[x, y]
+            q = int(np.argmin(cost))
+            if cost[q] < gain - EPSILON:
+                path[:] = np.concatenate([rest[:q + 1], path[i:i + k], rest[q + 1:]])
+                improved = True
+            else:
+                i += 1
+    return improved
+
+
+def solve(nodes, dist):
+    """Short open path through nodes starting at nodes[0]"""
+    if len(nodes) < 3:
+        return list(nodes)
+    # A zero-distance sentinel after the last stop lets both passes move the end
+    size = len(dist)
+    padded = np.zeros((size + 1, size + 1))
+    padded[:size, :size] = dist
+    path = np.array(nearest_neighbor(list(nodes), dist) + [size])
+    while _two_opt(path, padded) | _or_opt(path, padded):
+        pass
+    return [int(node) for node in path[:-1]]
+
+
+class RoutePlanner:
+    """Plans and caches walking routes between a fixed list of venues"""
+
+    def __init__(self, latitudes, longitudes, max_cached=1024):
+        self.dist = haversine_matrix(latitudes, longitudes)
+        self.max_cached = max_cached
+        self._cache = OrderedDict()  # (frozenset(venues), start) -> Route
+
+    def plan(self, venues=None, start=None):
+        """Route through venues (default all), setting off from start
+
+        The start defaults to the first venue. If it isn't one of the venues
+        it is only where the walk begins, and is left out of the stops.
+        """
+        venues = range(len(self.dist)) if venues is None else venues
+        key = (frozenset(venues), start)
+        route = self._cache.get(key)
+        telemetry.count("routes.cache_hits" if route is not None else "routes.cache_misses")
+        if route is None:
+            route = self._solve(sorted(key[0]), start)
+            self._cache[key] = route
+            if len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return route
+
+    def _solve(self, venues, start):
+        if not venues:
+            return Route(start, (), 0.0)
+        if start is None:
+            start = venues[0]
+        nodes = [start] + [v for v in venues if v != start]
+        path = solve(nodes, self.dist)
+        stops = path if start in venues else path[1:]
+        return Route(start, tuple(stops), path_length(path, self.dist))
+
+    def reroute(self, participant):
+        """Shortest way round the pubs a participant still has to visit
+
+        The route starts at their current pub, the one they can mark complete
+        next. Once that is done (or past the last pub) it sets off from the
+        last pub they completed.
+        """
+        remaining = [i for i in range(len(self.dist)) if not participant.has_completed(i)]
+        current = participant.current_pub
+        if current < len(self.dist) and not participant.has_completed(current):
+            return self.plan(remaining, current)
+        if participant.route:
+            return self.plan(remaining, participant.route[-1])
+        return self.plan(remaining, min(current, len(self.dist) - 1))
+
+    def length(self, stops):
+        """Metres walked visiting stops in the given order"""
+        return path_length(list(stops), self.dist)
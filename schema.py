@@ -0,0 +1,250 @@
+"""Typed columns for the crawl tables, and a columnar snapshot format
+
+The CSV files hold everything as text, and pandas guesses the type of every
+column each time it parses them. typed_participants() and
+typed_punishments() give the tables an explicit schema instead:
+
+    Name, Pub, Punishment         category (each distinct string stored once)
+    CurrentPub, Points            int64
+    StartTime, Time               datetime64[ns]
+    CompletedPubs, Achievements   str, comma-joined as in the CSV
+    Team                          str, '' for no team
+
+Punishment times are full ISO timestamps. Older files wrote a bare
+HH:MM:SS; those are placed on the crawl's day, taken from the earliest
+participant start time. A file mixing the two comes back with every time
+in full. text_participants() and
+text_punishments() turn typed tables back into the CSV's text, so a round
+trip reproduces the original files.
+
+save_columnar() writes both typed tables to one NumPy .npz file, or to a
+.parquet directory when pyarrow is installed, and load_columnar() reads
+them back. Text is stored as each distinct string once plus an integer
+code per row, and times as int64 nanoseconds, so a load reads arrays rather
+than parsing text:
+
+    python schema.py to-columnar DATA_DIR crawl.npz
+    python schema.py to-csv crawl.npz DATA_DIR
+
+Snapshots are for export and offline analysis only. Storage.load() and the
+app still read the CSV files (or SQLite) and never a snapshot; they are
+written by the commands above and `pubcrawl_cli.py export`, and read back
+by to-csv and the benchmarks.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from storage import (PARTICIPANT_COLUMNS, PARTICIPANTS_FILE, PUNISHMENT_COLUMNS, PUNISHMENTS_FILE,
+                     empty_participants, empty_punishments, with_columns)
+
+CATEGORY_COLUMNS = ('Name', 'Pub', 'Punishment')
+TIME_OF_DAY = '%H:%M:%S'  # how punishment times were written before they had a date
+TIME_OF_DAY_PATTERN = r'\d{1,2}:\d{2}:\d{2}'
+MIDNIGHT_ROLLOVER = pd.Timedelta(hours=12)
+
+
+def categorize(punishments_df):
+    """punishments_df with its Name, Pub and Punishment columns as categoricals
+
+    Times are left as they are, so the frame stays interchangeable with one
+    read from CSV.
+    """
+    return punishments_df.astype({column: 'category' for column in CATEGORY_COLUMNS})
+
+
+def _format_unique(times, fmt=None):
+    """Text for each timestamp, formatting each distinct value once ('' for NaT)"""
+    unique, inverse = np.unique(times.to_numpy(dtype='datetime64[ns]'), return_inverse=True)
+    stamps = pd.DatetimeIndex(unique)
+    text = [
+        '' if pd.isna(ts) else ts.strftime(fmt) if fmt else ts.isoformat()
+        for ts in stamps
+    ]
+    return np.asarray(text, dtype=object)[inverse.reshape(-1)]
+
+
+def typed_participants(participants_df):
+    """participants_df converted to the schema"""
+    df = with_columns(participants_df, PARTICIPANT_COLUMNS)
+    return pd.DataFrame({
+        'Name': df['Name'].astype(str).astype('category'),
+        'CurrentPub': pd.to_numeric(df['CurrentPub'], errors='coerce').fillna(0).astype(np.int64),
+        'CompletedPubs': df['CompletedPubs'].fillna('').astype(str),
+        'Points': pd.to_numeric(df['Points'], errors='coerce').fillna(0).astype(np.int64),
+        'Achievements': df['Achievements'].fillna('').astype(str),
+        'StartTime': pd.to_datetime(df['StartTime'], errors='coerce', format='ISO8601').astype('datetime64[ns]'),
+        'Team': df['Team'].fillna('').astype(str),
+    })
+
+
+def punishment_times(times, day=None):
+    """Punishment Time values as datetime64, NaT where unreadable
+
+    Times are full ISO timestamps, or a bare HH:MM:SS in files written
+    before they carried a date. Those are placed on day (default
+    1970-01-01). Rows are stored in the order they were recorded, so when
+    the clock goes back by more than MIDNIGHT_ROLLOVER from one bare time
+    to the next it has passed midnight, and a jump forward by as much is a
+    late row from the day before.
+    """
+    times = pd.Series(times, dtype=object).fillna('').astype(str).reset_index(drop=True)
+    bare = times.str.fullmatch(TIME_OF_DAY_PATTERN).to_numpy(dtype=bool)
+    parsed = pd.to_datetime(times.where(~bare, None), errors='coerce', format='ISO8601')
+    if bare.any():
+        seconds = pd.to_timedelta(times[bare]).to_numpy()
+        step = np.diff(seconds)
+        limit = MIDNIGHT_ROLLOVER.to_timedelta64()
+        rolled = np.concatenate([[0], np.cumsum((step < -limit).astype(int) - (step > limit))])
+        day = pd.Timestamp(0) if day is None else pd.Timestamp(day).normalize()
+        parsed = parsed.astype('datetime64[ns]')
+        parsed[bare] = day + pd.to_timedelta(rolled, unit='D') + seconds
+    return parsed.astype('datetime64[ns]')
+
+
+def typed_punishments(punishments_df, day=None):
+    """punishments_df converted to the schema, bare times put on day (see punishment_times)
+
+    attrs['time_of_day'] records that every time was bare, so
+    text_punishments() writes them back the same way.
+    """
+    df = punishments_df[PUNISHMENT_COLUMNS]
+    typed = pd.DataFrame({'Time': punishment_times(df['Time'], day).to_numpy()})
+    for column in CATEGORY_COLUMNS:
+        typed[column] = pd.Categorical(df[column])
+    typed.attrs['time_of_day'] = bool(len(df)) and bool(
+        df['Time'].fillna('').astype(str).str.fullmatch(TIME_OF_DAY_PATTERN).all())
+    return typed
+
+
+def text_participants(participants_df):
+    """Typed participants back in the CSV's text form"""
+    return participants_df.assign(Name=participants_df['Name'].astype(object),
+                                  StartTime=_format_unique(participants_df['StartTime']))[PARTICIPANT_COLUMNS]
+
+
+def text_punishments(punishments_df):
+    """Typed punishments back in the CSV's text form"""
+    fmt = TIME_OF_DAY if punishments_df.attrs.get('time_of_day', True) else None
+    text = pd.DataFrame({'Time': _format_unique(punishments_df['Time'], fmt)})
+    for column in CATEGORY_COLUMNS:
+        text[column] = punishments_df[column].astype(object)
+    return text
+
+
+def crawl_day(participants_df):
+    """Midnight on the day the first participant started, or None"""
+    start = pd.to_datetime(participants_df['StartTime'], errors='coerce', format='ISO8601').min()
+    return None if pd.isna(start) else start.normalize()
+
+
+def typed_crawl(participants_df, punishments_df):
+    """Both tables converted, bare punishment times placed on the crawl's day"""
+    return typed_participants(participants_df), typed_punishments(punishments_df, crawl_day(participants_df))
+
+
+# Columnar snapshots
+
+def _to_arrays(prefix, df):
+    arrays = {}
+    for column in df.columns:
+        values = df[column]
+        key = f"{prefix}/{column}"
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[key + "/codes"] = values.cat.codes.to_numpy()
+            arrays[key + "/categories"] = values.cat.categories.to_numpy(dtype=str)
+        elif values.dtype.kind == 'M':
+            arrays[key + "/ns"] = values.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        elif values.dtype.kind in 'iu':
+            arrays[key] = values.to_numpy()
+        else:
+            # Text is factorized too, since names and joined pub lists repeat
+            codes, uniques = pd.factorize(values.fillna(''))
+            arrays[key + "/codes"] = codes
+            arrays[key + "/values"] = np.asarray(uniques, dtype=str)
+    return arrays
+
+
+def _from_arrays(arrays, prefix, columns):
+    data = {}
+    for column in columns:
+        key = f"{prefix}/{column}"
+        if key + "/categories" in arrays:
+            categories = arrays[key + "/categories"].astype(object)
+            data[column] = pd.Categorical.from_codes(arrays[key + "/codes"], categories)
+        elif key + "/ns" in arrays:
+            data[column] = arrays[key + "/ns"].view('datetime64[ns]')
+        elif key + "/values" in arrays:
+            data[column] = arrays[key + "/values"].astype(object).take(arrays[key + "/codes"])
+        elif key in arrays:
+            data[column] = arrays[key]
+        else:
+            data[column] = ''  # a column added since the snapshot was written
+    return pd.DataFrame(data, columns=columns)
+
+
+def save_columnar(path, participants_df, punishments_df):
+    """Write typed tables to path: a .npz file, or a .parquet directory (needs pyarrow)"""
+    if path.endswith('.parquet'):
+        os.makedirs(path, exist_ok=True)
+        participants_df.to_parquet(os.path.join(path, "participants.parquet"), index=False)
+        punishments_df.to_parquet(os.path.join(path, "punishments.parquet"), index=False)
+        return
+    meta = {'time_of_day': punishments_df.attrs.get('time_of_day', True)}
+    with open(path, 'wb') as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), **_to_arrays("participants", participants_df),
+                 **_to_arrays("punishments", punishments_df))
+
+
+def load_columnar(path):
+    """(participants_df, punishments_df) from a file written by save_columnar()"""
+    if path.endswith('.parquet'):
+        participants_df = pd.read_parquet(os.path.join(path, "participants.parquet"))
+        punishments_df = pd.read_parquet(os.path.join(path, "punishments.parquet"))
+        return participants_df, punishments_df
+    with np.load(path, allow_pickle=False) as arrays:
+        participants_df = _from_arrays(arrays, "participants", PARTICIPANT_COLUMNS)
+        punishments_df = _from_arrays(arrays, "punishments", PUNISHMENT_COLUMNS)
+        punishments_df.attrs.update(json.loads(str(arrays['meta'])))
+    return participants_df, punishments_df
+
+
+def csv_to_columnar(data_dir, path):
+    """Convert participants.csv and punishments.csv in data_dir to a columnar snapshot"""
+    tables = []
+    for name, empty in ((PARTICIPANTS_FILE, empty_participants), (PUNISHMENTS_FILE, empty_punishments)):
+        csv_path = os.path.join(data_dir, name)
+        tables.append(pd.read_csv(csv_path) if os.path.exists(csv_path) else empty())
+    save_columnar(path, *typed_crawl(*tables))
+
+
+def columnar_to_csv(path, data_dir):
+    """Write a columnar snapshot back out as participants.csv and punishments.csv"""
+    participants_df, punishments_df = load_columnar(path)
+    os.makedirs(data_dir, exist_ok=True)
+    text_participants(participants_df).to_csv(os.path.join(data_dir, PARTICIPANTS_FILE), index=False)
+    text_punishments(punishments_df).to_csv(os.path.join(data_dir, PUNISHMENTS_FILE), index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    to_columnar = commands.add_parser('to-columnar', help="CSV files in DATA_DIR to a .npz or .parquet snapshot")
+    to_columnar.add_argument('data_dir')
+    to_columnar.add_argument('snapshot')
+    to_csv = commands.add_parser('to-csv', help="a snapshot back to CSV files in DATA_DIR")
+    to_csv.add_argument('snapshot')
+    to_csv.add_argument('data_dir')
+    args = parser.parse_args()
+
+    if args.command == 'to-columnar':
+        csv_to_columnar(args.data_dir, args.snapshot)
+    else:
+        columnar_to_csv(args.snapshot, args.data_dir)
+
+
+if __name__ == '__main__':
+    main()
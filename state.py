@@ -0,0 +1,228 @@
+"""Process-wide shared copy of the crawl data
+
+One SharedState is created per server process (see get_state() in
+pubcrawl.py) and shared by every session. Reads are served from memory;
+writes go through to the storage backend and are applied to the shared copy
+in place, so nobody has to re-download after a click.
+
+The backend is only re-read when its version() shows that something outside
+this process changed the data, and that check is rate limited to once every
+poll_interval seconds.
+
+With a WriteBehind writer, writes are queued instead of written inline and
+anything still queued is laid over the data whenever it is re-read.
+
+Participants are looked up through a NameIndex, so a name typed with
+different case or spacing finds the existing row. Given a ParticipantCodec,
+rows are also parsed into Participant records once per load or write rather
+than on every rerun.
+
+Punishments are held with categorical Name, Pub and Punishment columns
+(see schema.categorize), so a long history stores each string once. The
+newest are also kept in a RecentPunishments buffer, so the feed of recent
+punishments never touches the full history.
+
+Team standings are kept in a TeamBoard: counted once per load, then updated
+per participant as rows are upserted and punishments appended, so the team
+table never regroups the participants.
+
+Given an AchievementEngine, punishment counters are rebuilt on each load and
+advanced as punishments are appended, so achievement checks never rescan the
+punishment history.
+
+The version lives in a ChangeFeed: every change to the shared copy publishes
+to it, and sync() (run by a changes.Watcher) picks up outside changes.
+
+A page rerun takes one snapshot() and renders from it. Reads are counted
+per thread (each rerun runs on its own script thread), so a rerun can check
+how many it made with take_read_count().
+"""
+import threading
+import time
+from collections import namedtuple
+
+import telemetry
+from changes import ChangeFeed
+from models import NameIndex
+from recent import RecentPunishments
+from schema import categorize, crawl_day
+from storage import append_rows, upsert_rows
+from teams import TeamBoard
+
+POLL_INTERVAL = 5  # seconds between remote change checks
+
+# One consistent view of the data. participants is a private copy;
+# punishments is shared and must not be modified (appends replace the frame
+# rather than changing it). participant is the named participant's record, or None.
+# recent is a private copy of the RecentPunishments buffer; teams is the team table.
+Snapshot = namedtuple('Snapshot', ['version', 'participants', 'punishments', 'participant', 'recent', 'teams'])
+
+
+class SharedState:
+    """Write-through, versioned in-memory store over a storage backend"""
+
+    def __init__(self, storage, writer=None, codec=None, engine=None, poll_interval=POLL_INTERVAL, feed=None):
+        self.storage = storage
+        self.writer = writer
+        self.codec = codec
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.feed = feed or ChangeFeed()  # published on every change to the shared copy
+        self._lock = threading.RLock()
+        self._participants = None
+        self._punishments = None
+        self._index = NameIndex()
+        self._records = []  # parsed Participant per row of _participants
+        self._recent = RecentPunishments()
+        self._day = None    # crawl day, for punishment times stored without a date
+        self.teams = TeamBoard()
+        self._checked_at = 0.0
+        self._reads = threading.local()
+
+    @property
+    def version(self):
+        return self.feed.version
+
+    def _count_read(self):
+        self._reads.count = getattr(self._reads, 'count', 0) + 1
+
+    def take_read_count(self):
+        """Reads made by the calling thread since it last asked, resetting the count"""
+        count = getattr(self._reads, 'count', 0)
+        self._reads.count = 0
+        return count
+
+    def _remote_changed(self):
+        if self.storage.synced_version is None:
+            return True
+        now = time.monotonic()
+        if now - self._checked_at < self.poll_interval:
+            return False
+        self._checked_at = now
+        return self.storage.version() != self.storage.synced_version
+
+    def _reload(self):
+        with telemetry.span("state.reload"):
+            self._load()
+
+    def _load(self):
+        self._participants, self._punishments = self.storage.load()
+        if self.writer is not None:
+            self._participants, self._punishments = self.writer.overlay(self._participants, self._punishments)
+        self._punishments = categorize(self._punishments)
+        self._day = crawl_day(self._participants)
+        self._recent = RecentPunishments.from_frame(self._punishments, self._day)
+        self._index = NameIndex(self._participants['Name'])
+        self.teams.rebuild(self._participants, self._punishments)
+        if self.codec is not None:
+            self._records = self.codec.parse_frame(self._participants)
+        if self.engine is not None:
+            self.engine.rebuild(self._punishments)
+        self._checked_at = time.monotonic()
+        self.feed.publish()
+
+    def _ensure_fresh(self):
+        if self._participants is None or self._remote_changed():
+            telemetry.count("state.cache_misses")
+            self._reload()
+        else:
+            telemetry.count("state.cache_hits")
+
+    def read(self):
+        """Return copies of (participants_df, punishments_df)"""
+        with self._lock:
+            self._count_read()
+            self._ensure_fresh()
+            return self._participants.copy(), self._punishments.copy()
+
+    def snapshot(self, name=None):
+        """Snapshot of the data, with name's parsed record if they have signed up"""
+        with self._lock:
+            self._count_read()
+            self._ensure_fresh()
+            position = None if name is None else self._index.get(name)
+            participant = None if position is None else self._records[position].copy()
+            return Snapshot(self.version, self._participants.copy(), self._punishments, participant,
+                            self._recent.copy(), self.teams.table())
+
+    def participant(self, name):
+        """A private copy of one participant's parsed record, or None"""
+        with self._lock:
+            self._count_read()
+            self._ensure_fresh()
+            position = self._index.get(name)
+            return None if position is None else self._records[position].copy()
+
+    def sync(self):
+        """Reload now if the backend was changed outside this process
+
+        Does nothing until the data has first been read.
+        """
+        with self._lock:
+            if self._participants is not None:
+                self._checked_at = 0.0
+                if self._remote_changed():
+                    self._reload()
+
+    def expire(self):
+        """Check the backend for outside changes on the next read"""
+        with self._lock:
+            self._checked_at = 0.0
+
+    def save(self, participants_df, punishments_df):
+        with self._lock:
+            if self.writer is not None:
+                self.writer.flush()
+            self.storage.save(participants_df, punishments_df)
+            # save() may have merged with remote changes, so re-read lazily
+            self._participants = self._punishments = None
+            self.feed.publish()
+
+    def stored_name(self, name):
+        """The name as first signed up, for any case or spacing of it"""
+        with self._lock:
+            self._ensure_fresh()
+            position = self._index.get(name)
+            return name if position is None else self._participants['Name'].iat[position]
+
+    def upsert_participants(self, rows):
+        with self._lock:
+            self._ensure_fresh()
+            rows = rows.assign(Name=[self.stored_name(name) for name in rows['Name']])
+            (self.writer or self.storage).upsert_participants(rows)
+            self._participants = upsert_rows(self._participants, rows, self._index)
+            self.teams.update_rows(rows)
+            if self.codec is not None:
+                for row in rows.to_dict('records'):
+                    position = self._index.get(row['Name'])
+                    if position < len(self._records):
+                        self._records[position] = self.codec.parse(row)
+                    else:
+                        self._records.append(self.codec.parse(row))
+            self.feed.publish()
+
+    def append_punishments(self, rows):
+        """Record punishments, returning {normalized name: changed facts} for the engine"""
+        with self._lock:
+            if self.engine is not None:
+                self._ensure_fresh()
+            (self.writer or self.storage).append_punishments(rows)
+            changed = {}
+            if self._punishments is not None:
+                self._punishments = append_rows(self._punishments, rows)
+                self._recent.push_frame(rows, self._day)
+                for name in rows['Name']:
+                    self.teams.punished(name)
+                if self.engine is not None:
+                    changed = self.engine.record(rows)
+            self.feed.publish()
+            return changed
+
+    def new_achievements(self, participant, changed=None):
+        """Achievement ids the participant now qualifies for but doesn't hold
+
+        `changed` limits the check to rules reading those facts; None runs them all.
+        """
+        with self._lock:
+            self._ensure_fresh()
+            return self.engine.evaluate(participant, changed)
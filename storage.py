@@ -0,0 +1,806 @@
+"""Storage backends for participant and punishment data
+
+Every backend exposes the same small interface so the app never needs to know
+where the data lives:
+
+    load()                      -> (participants_df, punishments_df)
+    save(participants, punish)  -> replace everything
+    upsert_participants(rows)   -> insert or update rows keyed by Name
+    append_punishments(rows)    -> add new punishment events
+    apply(participants, punish) -> upserts and appends written together
+    version()                   -> cheap token that changes with the data
+
+Every GitHub request made through connect_github's repository is timed and
+counted in telemetry, along with the rate limit GitHub reports back.
+
+PyGithub is only imported once a GitHub repository is used (see
+connect_github), so the app starts faster and the other backends never
+load it.
+"""
+import hashlib
+import io
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import pandas as pd
+
+import telemetry
+
+REPO_NAME = "kirkpatrick8/pubcrawl"  # GitHub repository the app keeps its data in
+PARTICIPANTS_FILE = "participants.csv"
+PUNISHMENTS_FILE = "punishments.csv"
+PUNISHMENTS_LOG_FILE = "punishments.log.jsonl"
+
+# Fold the punishment log into punishments.csv once it holds this many events
+COMPACT_EVERY = 50
+
+# GitHub answers a stale sha with 409 and a non fast-forward ref update with 422
+CONFLICT_STATUSES = (409, 422)
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.2  # seconds, doubled on every retry
+
+# HTTP settings for the GitHub client: seconds before a request gives up,
+# retries of failed requests (and of rate limits, waiting at most
+# GITHUB_MAX_RATE_WAIT seconds), with GITHUB_BACKOFF seconds doubled between
+# tries, and connections kept open for the app's threads to share
+GITHUB_TIMEOUT = 10
+GITHUB_RETRIES = 4
+GITHUB_BACKOFF = 0.5
+GITHUB_MAX_RATE_WAIT = 60
+GITHUB_POOL_SIZE = 8
+
+PARTICIPANT_COLUMNS = ['Name', 'CurrentPub', 'CompletedPubs', 'Points', 'Achievements', 'StartTime', 'Team']
+PUNISHMENT_COLUMNS = ['Time', 'Name', 'Pub', 'Punishment']
+
+
+class WriteConflict(Exception):
+    """A write still conflicted with concurrent changes after every retry"""
+
+
+def empty_participants():
+    return pd.DataFrame(columns=PARTICIPANT_COLUMNS)
+
+
+def empty_punishments():
+    return pd.DataFrame(columns=PUNISHMENT_COLUMNS)
+
+
+def blob_sha(text):
+    """Git object id of text stored as a blob, used to spot unchanged files"""
+    data = text.encode()
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def with_columns(df, columns):
+    """df with any of columns it lacks added as missing values
+
+    Files written before a column existed (Team) load with it empty.
+    """
+    missing = [column for column in columns if column not in df.columns]
+    return df.reindex(columns=list(df.columns) + missing) if missing else df
+
+
+def _text_columns_as_object(df):
+    """Let text columns that were read as all-missing floats (or never written) take strings"""
+    for column in ('CompletedPubs', 'Achievements', 'StartTime', 'Team'):
+        if column not in df.columns:
+            df[column] = None
+        if df[column].dtype.kind == 'f':
+            df[column] = df[column].astype(object)
+
+
+def upsert_rows(participants_df, rows, index=None):
+    """Return participants_df with rows inserted or updated by Name
+
+    index maps names to row positions. By default it is built from the
+    exact names in participants_df, which is then copied. Passing a
+    models.NameIndex matches names case and whitespace insensitively,
+    updates existing rows in place (keeping their stored Name) and adds any
+    appended rows to the index.
+    """
+    if index is None:
+        participants_df = participants_df.reset_index(drop=True)
+        index = {name: i for i, name in enumerate(participants_df['Name'])}
+    _text_columns_as_object(participants_df)
+    columns = [participants_df.columns.get_loc(column) for column in PARTICIPANT_COLUMNS[1:]]
+    start = len(participants_df)
+    new_rows = []
+    for row in with_columns(rows, PARTICIPANT_COLUMNS)[PARTICIPANT_COLUMNS].itertuples(index=False, name=None):
+        position = index.get(row[0])
+        if position is None:
+            index[row[0]] = start + len(new_rows)
+            new_rows.append(row)
+        elif position >= start:
+            new_rows[position - start] = row
+        else:
+            for column, value in zip(columns, row[1:]):
+                participants_df.iat[position, column] = value
+    if new_rows:
+        participants_df = pd.concat([participants_df, pd.DataFrame(new_rows, columns=PARTICIPANT_COLUMNS)],
+                                    ignore_index=True)
+    return participants_df
+
+
+def append_rows(punishments_df, rows):
+    """Return punishments_df with rows appended, keeping categorical columns categorical"""
+    rows = rows[PUNISHMENT_COLUMNS]
+    categorical = {column: dtype for column, dtype in punishments_df.dtypes.items()
+                   if isinstance(dtype, pd.CategoricalDtype)}
+    if categorical and not rows.empty:
+        grown = {column: punishments_df[column].cat.add_categories(
+                     pd.Index(rows[column].dropna().unique()).difference(dtype.categories))
+                 for column, dtype in categorical.items()}
+        punishments_df = punishments_df.assign(**grown)
+        rows = rows.astype({column: values.dtype for column, values in grown.items()})
+    return pd.concat([punishments_df, rows], ignore_index=True)
+
+
+def _participant_keys(df):
+    """Participant rows as comparable tuples, ignoring dtype differences"""
+    df = with_columns(df, PARTICIPANT_COLUMNS)[PARTICIPANT_COLUMNS]
+    normalized = df.astype(object).where(df.notna(), '')
+    for column in ('CurrentPub', 'Points'):
+        normalized[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(int)
+    return list(normalized.astype(str).itertuples(index=False, name=None))
+
+
+def _event_keys(df):
+    return list(df[PUNISHMENT_COLUMNS].astype(str).itertuples(index=False, name=None))
+
+
+def merge_participants(base_df, local_df, remote_df):
+    """Apply the rows local_df changed relative to base_df on top of remote_df
+
+    Rows are matched by Name, so two people checking in at the same time
+    both keep their update.
+    """
+    base = {key[0]: key for key in _participant_keys(base_df)}
+    changed = [i for i, key in enumerate(_participant_keys(local_df)) if base.get(key[0]) != key]
+    return upsert_rows(remote_df, local_df.iloc[changed])
+
+
+def merge_punishments(base_df, local_df, remote_df):
+    """Append the events local_df added relative to base_df to remote_df"""
+    base = Counter(_event_keys(base_df))
+    pending = Counter(_event_keys(local_df)) - base
+    pending -= Counter(_event_keys(remote_df)) - base
+    keep = []
+    for i, key in enumerate(_event_keys(local_df)):
+        if pending[key] > 0:
+            pending[key] -= 1
+            keep.append(i)
+    return append_rows(remote_df, local_df.iloc[keep])
+
+
+def log_to_text(base, rows):
+    """Serialize a punishment log: a header line, then one JSON event per line"""
+    lines = [json.dumps({'base': base})]
+    lines += [json.dumps(event) for event in rows[PUNISHMENT_COLUMNS].to_dict('records')]
+    return "\n".join(lines) + "\n"
+
+
+def text_to_log(text):
+    """Parse a punishment log into (base, events_df)
+
+    base is the number of snapshot rows the log was started against, or
+    None when the log has no header and simply follows the snapshot.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return None, empty_punishments()
+    base = json.loads(lines[0]).get('base')
+    events = [json.loads(line) for line in lines[1:]]
+    return base, pd.DataFrame(events, columns=PUNISHMENT_COLUMNS)
+
+
+def apply_log(snapshot_df, base, events_df):
+    """Combine a punishment snapshot with its log tail
+
+    If a compaction wrote the snapshot but died before resetting the log,
+    the snapshot is longer than base and the already-folded events are
+    skipped rather than counted twice.
+    """
+    if base is None:
+        base = len(snapshot_df)
+    already_folded = max(len(snapshot_df) - base, 0)
+    tail = events_df.iloc[already_folded:]
+    if tail.empty:
+        return snapshot_df
+    return pd.concat([snapshot_df, tail], ignore_index=True)
+
+
+class Storage:
+    """Base class for storage backends
+
+    Subclasses must implement load() and save(). The row-level helpers fall
+    back to a full load/save and should be overridden where the backend can
+    do better.
+    """
+
+    name = "base"
+
+    # Version the caller's copy of the data is known to match. load() sets
+    # it, a write applied directly on top of it moves it forward and a write
+    # that landed on top of someone else's change clears it.
+    synced_version = None
+
+    def load(self):
+        raise NotImplementedError
+
+    def save(self, participants_df, punishments_df):
+        raise NotImplementedError
+
+    def version(self):
+        raise NotImplementedError
+
+    def _track_write(self, parent, new):
+        in_sync = parent is not None and parent == self.synced_version
+        self.synced_version = new if in_sync else None
+
+    def upsert_participants(self, rows):
+        participants_df, punishments_df = self.load()
+        self.save(upsert_rows(participants_df, rows), punishments_df)
+
+    def append_punishments(self, rows):
+        participants_df, punishments_df = self.load()
+        self.save(participants_df, append_rows(punishments_df, rows))
+
+    def apply(self, participant_rows, punishment_rows):
+        """Write a batch of participant upserts and punishment events"""
+        if not participant_rows.empty:
+            self.upsert_participants(participant_rows)
+        if not punishment_rows.empty:
+            self.append_punishments(punishment_rows)
+
+
+class MemoryStorage(Storage):
+    """In-process storage, used for tests and local experiments"""
+
+    name = "memory"
+
+    def __init__(self, participants_df=None, punishments_df=None):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._participants = (empty_participants() if participants_df is None
+                              else with_columns(participants_df.copy(), PARTICIPANT_COLUMNS))
+        self._punishments = empty_punishments() if punishments_df is None else punishments_df.copy()
+
+    def _bump(self):
+        self._version += 1
+        self._track_write(self._version - 1, self._version)
+
+    def version(self):
+        return self._version
+
+    def load(self):
+        with self._lock:
+            self.synced_version = self._version
+            return self._participants.copy(), self._punishments.copy()
+
+    def save(self, participants_df, punishments_df):
+        with self._lock:
+            self._participants = participants_df.copy()
+            self._punishments = punishments_df.copy()
+            self._bump()
+
+    def upsert_participants(self, rows):
+        with self._lock:
+            self._participants = upsert_rows(self._participants, rows)
+            self._bump()
+
+    def append_punishments(self, rows):
+        with self._lock:
+            self._punishments = append_rows(self._punishments, rows)
+            self._bump()
+
+    def apply(self, participant_rows, punishment_rows):
+        with self._lock:
+            self._participants = upsert_rows(self._participants, participant_rows)
+            self._punishments = append_rows(self._punishments, punishment_rows)
+            self._bump()
+
+
+def connect_github(token, repo_name):
+    """Repository handle for GitHubStorage, made without a request to GitHub
+
+    The client reuses pooled connections, times requests out after
+    GITHUB_TIMEOUT seconds and retries server errors and rate limits with
+    exponential backoff. The repository is looked up lazily, so nothing goes
+    over the network until the first read.
+    """
+    from github import Auth, Github, GithubRetry
+
+    client = Github(auth=Auth.Token(token), timeout=GITHUB_TIMEOUT, pool_size=GITHUB_POOL_SIZE,
+                    retry=GithubRetry(total=GITHUB_RETRIES, backoff_factor=GITHUB_BACKOFF,
+                                      max_rate_limit_wait=GITHUB_MAX_RATE_WAIT))
+    return InstrumentedRepo(client.get_repo(repo_name, lazy=True))
+
+
+def _unwrap(value):
+    """The PyGithub object behind an InstrumentedRepo, also inside a list"""
+    if isinstance(value, InstrumentedRepo):
+        return value._target
+    if isinstance(value, list):
+        return [_unwrap(item) for item in value]
+    return value
+
+
+class InstrumentedRepo:
+    """Wraps a PyGithub object so each method call is a telemetry span
+
+    Calls are timed as github.<method> and counted in github.calls. After
+    each one the rate limit from the response headers is copied into the
+    github.rate_limit_* gauges. Returned objects that can make requests of
+    their own (such as the git ref that GitHubStorage edits) are wrapped too,
+    and unwrapped again when passed back in, since PyGithub checks the types
+    of the trees and commits it is given.
+    """
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name.startswith('_') or not callable(value):
+            return value
+
+        @wraps(value)
+        def call(*args, **kwargs):
+            try:
+                with telemetry.span(f"github.{name}"):
+                    result = value(*map(_unwrap, args), **{key: _unwrap(arg) for key, arg in kwargs.items()})
+            finally:
+                telemetry.count("github.calls")
+                self._record_rate_limit()
+            return InstrumentedRepo(result) if hasattr(result, '_requester') else result
+        return call
+
+    def _record_rate_limit(self):
+        requester = getattr(self._target, '_requester', None)
+        remaining, limit = getattr(requester, 'rate_limiting', (-1, -1))
+        if remaining >= 0:
+            telemetry.gauge("github.rate_limit_remaining", remaining)
+            telemetry.gauge("github.rate_limit_limit", limit)
+            telemetry.gauge("github.rate_limit_reset", requester.rate_limiting_resettime)
+
+
+class GitHubStorage(Storage):
+    """CSV files committed to a GitHub repository
+
+    Punishments are kept as a snapshot (punishments.csv) plus an append-only
+    JSONL log (punishments.log.jsonl). A spin only rewrites the short log;
+    every COMPACT_EVERY events the log is folded into the snapshot.
+
+    Every write is a single commit. Files whose content has not changed are
+    skipped, a lone changed file goes through the Contents API and several
+    changed files are committed together through the Git Data API.
+
+    Writes are optimistic: single files are updated against the sha they
+    were read at and multi-file commits must fast-forward the branch head
+    the data was loaded from. On a conflict the data is re-read, the
+    caller's changes are merged by participant Name and punishment event,
+    and the write is retried with exponential backoff.
+
+    A branch that doesn't exist yet is created on first load, as an orphan
+    with empty data files, so each event can have a branch of its own.
+
+    Polling is cheap: the branch ref is re-read with a conditional request
+    that costs no rate limit until someone writes, and a new head only
+    downloads and parses the files whose blob sha changed.
+    """
+
+    name = "github"
+
+    def __init__(self, repo, branch, compact_every=COMPACT_EVERY,
+                 max_retries=MAX_RETRIES, backoff=RETRY_BACKOFF):
+        self.repo = repo
+        self.branch = branch
+        self.compact_every = compact_every
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._lock = threading.RLock()
+        self._ref = None
+        self._shas = {}              # path -> blob sha last seen on the branch
+        self._tree = (None, {})      # (head sha, {path: blob sha}) last listed
+        self._parsed = {}            # path -> (blob sha, parsed content)
+        self._bases = OrderedDict()  # head sha -> frames load() returned at that head
+
+    def _retry(self, attempt):
+        """Run attempt(n) until it stops conflicting, backing off between tries"""
+        from github import GithubException
+
+        for n in range(self.max_retries):
+            try:
+                return attempt(n)
+            except GithubException as e:
+                if e.status not in CONFLICT_STATUSES:
+                    raise
+                telemetry.count("github.conflicts")
+                if n == self.max_retries - 1:
+                    raise WriteConflict(f"Gave up after {self.max_retries} conflicting writes") from e
+                time.sleep(self.backoff * 2 ** n * random.uniform(0.5, 1.0))
+
+    def _read_head(self):
+        """Sha of the branch tip
+
+        Once the ref has been fetched it is re-read with a conditional
+        request, which GitHub answers with a 304 that costs no rate limit
+        while nobody has written.
+        """
+        from github import GithubException
+
+        if self._ref is not None:
+            try:
+                if not self._ref.update():
+                    telemetry.count("github.not_modified")
+                return self._ref.object.sha
+            except GithubException as e:
+                if e.status != 404:
+                    raise
+                self._ref = None
+        try:
+            self._ref = self.repo.get_git_ref(f"heads/{self.branch}")
+        except GithubException as e:
+            if e.status != 404:
+                raise
+            self._ref = self._create_branch()
+        return self._ref.object.sha
+
+    def _create_branch(self):
+        """Start the branch as an orphan holding empty data files"""
+        from github import GithubException, InputGitTreeElement
+
+        tree = self.repo.create_git_tree([
+            InputGitTreeElement(PARTICIPANTS_FILE, '100644', 'blob', content=empty_participants().to_csv(index=False)),
+            InputGitTreeElement(PUNISHMENTS_FILE, '100644', 'blob', content=empty_punishments().to_csv(index=False)),
+        ])
+        commit = self.repo.create_git_commit(f"Start {self.branch}", tree, [])
+        try:
+            return self.repo.create_git_ref(f"refs/heads/{self.branch}", commit.sha)
+        except GithubException as e:
+            if e.status != 422:  # created by another process in the meantime
+                raise
+            return self.repo.get_git_ref(f"heads/{self.branch}")
+
+    def _blob_shas(self, head):
+        """{path: blob sha} of the files at head, one request per new head"""
+        if self._tree[0] != head:
+            tree = self.repo.get_git_tree(head)
+            self._tree = (head, {element.path: element.sha for element in tree.tree if element.type == 'blob'})
+        return self._tree[1]
+
+    def _fetch(self, path, parse, ref=None):
+        """parse(text) of path at ref (default the branch tip), None if it doesn't exist
+
+        Files are looked up in the tree at ref first, and only downloaded and
+        parsed when their blob sha differs from the copy parsed last time.
+        The cached value is shared, so callers copy before changing it.
+        """
+        head = ref or self._read_head()
+        sha = self._blob_shas(head).get(path)
+        if sha is None:
+            self._shas.pop(path, None)
+            return None
+        self._shas[path] = sha
+        cached = self._parsed.get(path)
+        if cached is not None and cached[0] == sha:
+            telemetry.count("github.blob_cache_hits")
+            return cached[1]
+        content = self.repo.get_contents(path, ref=head)
+        telemetry.count("github.bytes_read", content.size)
+        value = parse(content.decoded_content.decode())
+        self._parsed[path] = (sha, value)
+        return value
+
+    def _read(self, path, columns, ref=None):
+        df = self._fetch(path, lambda text: pd.read_csv(io.StringIO(text)), ref)
+        if df is None:
+            return pd.DataFrame(columns=columns)
+        return with_columns(df.copy(), columns)
+
+    def _read_log(self, ref=None):
+        log = self._fetch(PUNISHMENTS_LOG_FILE, text_to_log, ref)
+        if log is None:
+            return None, empty_punishments()
+        base, events_df = log
+        return base, events_df.copy()
+
+    def _read_all(self, ref):
+        participants_df = self._read(PARTICIPANTS_FILE, PARTICIPANT_COLUMNS, ref)
+        snapshot_df = self._read(PUNISHMENTS_FILE, PUNISHMENT_COLUMNS, ref)
+        return participants_df, apply_log(snapshot_df, *self._read_log(ref))
+
+    def _punishment_files(self, punishments_df):
+        """Files for a fresh snapshot with the log reset to start after it"""
+        return {
+            PUNISHMENTS_FILE: punishments_df.to_csv(index=False),
+            PUNISHMENTS_LOG_FILE: log_to_text(len(punishments_df), empty_punishments()),
+        }
+
+    def _commit(self, files, message, head=None):
+        """Write {path: text} to the branch as one commit, skipping unchanged files
+
+        Returns the new head for multi-file commits.
+
+        A single file is updated against the sha it was last read at, or
+        created if it did not exist. Several files are committed on top of
+        head, which must have been read with _read_head(), and the ref update
+        fails unless that is still the branch tip.
+        """
+        from github import InputGitTreeElement
+
+        files = {path: text for path, text in files.items() if blob_sha(text) != self._shas.get(path)}
+        if not files:
+            return head
+        telemetry.count("github.bytes_written", sum(len(text.encode()) for text in files.values()))
+        if len(files) == 1 and head is None:
+            (path, text), = files.items()
+            if path in self._shas:
+                result = self.repo.update_file(path, message, text, self._shas[path], branch=self.branch)
+            else:
+                result = self.repo.create_file(path, message, text, branch=self.branch)
+            commit = result['commit']
+            self._track_write(commit.parents[0].sha if commit.parents else None, commit.sha)
+        else:
+            if head is None:
+                head = self._read_head()
+            parent = self.repo.get_git_commit(head)
+            tree = self.repo.create_git_tree(
+                [InputGitTreeElement(path, '100644', 'blob', content=text) for path, text in files.items()],
+                parent.tree
+            )
+            commit = self.repo.create_git_commit(message, tree, [parent])
+            self._ref.edit(commit.sha)
+            self._track_write(head, commit.sha)
+            head = commit.sha
+        for path, text in files.items():
+            self._shas[path] = blob_sha(text)
+        return head
+
+    def _remember(self, head, participants_df, punishments_df):
+        """Keep the frames load() returned so later saves can be diffed against them"""
+        self._bases[head] = (participants_df.copy(), punishments_df.copy())
+        self._bases.move_to_end(head)
+        while len(self._bases) > 8:
+            self._bases.popitem(last=False)
+        participants_df.attrs['head'] = punishments_df.attrs['head'] = head
+
+    def version(self):
+        """Sha of the branch head, free while it hasn't moved (see _read_head)"""
+        with self._lock:
+            return self._read_head()
+
+    def load(self):
+        with self._lock:
+            head = self._read_head()
+            participants_df, punishments_df = self._read_all(head)
+            self._remember(head, participants_df, punishments_df)
+            self.synced_version = head
+        return participants_df, punishments_df
+
+    def save(self, participants_df, punishments_df):
+        with self._lock:
+            head = participants_df.attrs.get('head') or punishments_df.attrs.get('head')
+            if head not in self._bases:
+                head = next(reversed(self._bases), None)
+            if head is None:
+                base_participants, base_punishments = empty_participants(), empty_punishments()
+            else:
+                base_participants, base_punishments = self._bases[head]
+
+            participants_changed = _participant_keys(participants_df) != _participant_keys(base_participants)
+            punishments_changed = _event_keys(punishments_df) != _event_keys(base_punishments)
+            if not participants_changed and not punishments_changed:
+                return
+
+            def attempt(n):
+                local_participants, local_punishments = participants_df, punishments_df
+                current = self._read_head()
+                if n > 0 or current != head:
+                    remote_participants, remote_punishments = self._read_all(current)
+                    local_participants = merge_participants(base_participants, participants_df, remote_participants)
+                    local_punishments = merge_punishments(base_punishments, punishments_df, remote_punishments)
+                files = {}
+                if participants_changed:
+                    files[PARTICIPANTS_FILE] = local_participants.to_csv(index=False)
+                if punishments_changed:
+                    files.update(self._punishment_files(local_punishments))
+                new_head = self._commit(files, f"Update {', '.join(sorted(files))} - {datetime.now()}", head=current)
+                if new_head is not None and new_head != current:
+                    self._remember(new_head, local_participants, local_punishments)
+                    participants_df.attrs['head'] = punishments_df.attrs['head'] = new_head
+
+            self._retry(attempt)
+
+    def upsert_participants(self, rows):
+        def attempt(n):
+            participants_df = upsert_rows(self._read(PARTICIPANTS_FILE, PARTICIPANT_COLUMNS), rows)
+            self._commit({PARTICIPANTS_FILE: participants_df.to_csv(index=False)},
+                         f"Update participants - {datetime.now()}")
+
+        with self._lock:
+            self._retry(attempt)
+
+    def append_punishments(self, rows):
+        def attempt(n):
+            base, events_df = self._read_log()
+            events_df = append_rows(events_df, rows)
+            if PUNISHMENTS_LOG_FILE in self._shas and len(events_df) < self.compact_every:
+                self._commit({PUNISHMENTS_LOG_FILE: log_to_text(base, events_df)},
+                             f"Update punishments log - {datetime.now()}")
+            else:
+                self._compact(rows)
+
+        with self._lock:
+            self._retry(attempt)
+
+    def apply(self, participant_rows, punishment_rows):
+        """Write participant upserts and punishment events in one commit"""
+        if participant_rows.empty or punishment_rows.empty:
+            return super().apply(participant_rows, punishment_rows)
+
+        def attempt(n):
+            head = self._read_head()
+            participants_df = upsert_rows(self._read(PARTICIPANTS_FILE, PARTICIPANT_COLUMNS, head), participant_rows)
+            files = {PARTICIPANTS_FILE: participants_df.to_csv(index=False)}
+            base, events_df = self._read_log(head)
+            events_df = append_rows(events_df, punishment_rows)
+            if PUNISHMENTS_LOG_FILE in self._shas and len(events_df) < self.compact_every:
+                files[PUNISHMENTS_LOG_FILE] = log_to_text(base, events_df)
+            else:
+                snapshot_df = self._read(PUNISHMENTS_FILE, PUNISHMENT_COLUMNS, head)
+                files.update(self._punishment_files(apply_log(snapshot_df, base, events_df)))
+            self._commit(files, f"Update participants, punishments - {datetime.now()}", head=head)
+
+        with self._lock:
+            self._retry(attempt)
+
+    def compact(self):
+        """Fold the punishment log into punishments.csv"""
+        with self._lock:
+            self._retry(lambda n: self._compact())
+
+    def _compact(self, rows=None):
+        head = self._read_head()
+        snapshot_df = self._read(PUNISHMENTS_FILE, PUNISHMENT_COLUMNS, head)
+        punishments_df = apply_log(snapshot_df, *self._read_log(head))
+        if rows is not None:
+            punishments_df = append_rows(punishments_df, rows)
+        self._commit(self._punishment_files(punishments_df), f"Compact punishments - {datetime.now()}", head=head)
+
+
+class SQLiteStorage(Storage):
+    """Local SQLite database in WAL mode with row-level writes"""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS participants (
+                    Name TEXT PRIMARY KEY,
+                    CurrentPub INTEGER NOT NULL DEFAULT 0,
+                    CompletedPubs TEXT NOT NULL DEFAULT '',
+                    Points INTEGER NOT NULL DEFAULT 0,
+                    Achievements TEXT NOT NULL DEFAULT '',
+                    StartTime TEXT,
+                    Team TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            if 'Team' not in {column[1] for column in conn.execute("PRAGMA table_info(participants)")}:
+                conn.execute("ALTER TABLE participants ADD COLUMN Team TEXT NOT NULL DEFAULT ''")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS punishments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    Time TEXT,
+                    Name TEXT,
+                    Pub TEXT,
+                    Punishment TEXT
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _participant_records(rows):
+        rows = with_columns(rows, PARTICIPANT_COLUMNS)[PARTICIPANT_COLUMNS]
+        rows = rows.fillna({'CompletedPubs': '', 'Achievements': '', 'Team': ''})
+        return [
+            (r['Name'], int(r['CurrentPub']), r['CompletedPubs'], int(r['Points']),
+             r['Achievements'], None if pd.isna(r['StartTime']) else r['StartTime'], r['Team'])
+            for r in rows.to_dict('records')
+        ]
+
+    @staticmethod
+    def _punishment_records(rows):
+        return list(rows[PUNISHMENT_COLUMNS].itertuples(index=False, name=None))
+
+    def _read_version(self, conn):
+        return conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _bump(self, conn):
+        """Increment the version inside the current write transaction
+
+        Read back with a separate SELECT rather than UPDATE ... RETURNING,
+        which needs SQLite 3.35 (the devcontainer's Debian bullseye has 3.34).
+        """
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+        new = self._read_version(conn)
+        self._track_write(new - 1, new)
+
+    def version(self):
+        with self._connect() as conn:
+            return self._read_version(conn)
+
+    def load(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            version = self._read_version(conn)
+            participants_df = pd.read_sql_query(
+                f"SELECT {', '.join(PARTICIPANT_COLUMNS)} FROM participants ORDER BY rowid", conn)
+            punishments_df = pd.read_sql_query(
+                f"SELECT {', '.join(PUNISHMENT_COLUMNS)} FROM punishments ORDER BY id", conn)
+        self.synced_version = version
+        return participants_df, punishments_df
+
+    def save(self, participants_df, punishments_df):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM participants")
+            conn.execute("DELETE FROM punishments")
+            self._upsert(conn, participants_df)
+            self._insert(conn, punishments_df)
+            self._bump(conn)
+
+    def _upsert(self, conn, rows):
+        conn.executemany("""
+            INSERT INTO participants (Name, CurrentPub, CompletedPubs, Points, Achievements, StartTime, Team)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(Name) DO UPDATE SET
+                CurrentPub = excluded.CurrentPub,
+                CompletedPubs = excluded.CompletedPubs,
+                Points = excluded.Points,
+                Achievements = excluded.Achievements,
+                StartTime = excluded.StartTime,
+                Team = excluded.Team
+        """, self._participant_records(rows))
+
+    def _insert(self, conn, rows):
+        conn.executemany(
+            "INSERT INTO punishments (Time, Name, Pub, Punishment) VALUES (?, ?, ?, ?)",
+            self._punishment_records(rows)
+        )
+
+    def upsert_participants(self, rows):
+        with self._connect() as conn:
+            self._upsert(conn, rows)
+            self._bump(conn)
+
+    def append_punishments(self, rows):
+        with self._connect() as conn:
+            self._insert(conn, rows)
+            self._bump(conn)
+
+    def apply(self, participant_rows, punishment_rows):
+        with self._connect() as conn:
+            self._upsert(conn, participant_rows)
+            self._insert(conn, punishment_rows)
+            self._bump(conn)
@@ -0,0 +1,116 @@
+"""Team standings, kept up to date as participants check in and get punished
+
+A participant is in at most one team: the Team column of participants.csv,
+empty for none. TeamBoard keeps running totals per team (members, points,
+pubs completed and punishments) along with what each participant last
+added to them. A check-in swaps that one participant's share for the new
+one and a spin adds one punishment, so updates and the team table cost the
+same whether a team has 5 members or 500. Only a load counts everything.
+
+Participants are keyed by normalized name, like NameIndex, so punishments
+recorded under any spelling of a name count for their team.
+"""
+from collections import namedtuple
+
+import pandas as pd
+
+from leaderboard import count_items
+from models import normalize_name, normalize_names
+from storage import with_columns
+
+TEAM_COLUMNS = ['Team', 'Members', 'Points', 'Average Points', 'Pubs Completed', 'Punishments']
+
+# What one participant adds to their team's totals
+Share = namedtuple('Share', ['team', 'points', 'completed', 'punishments'])
+NO_SHARE = Share('', 0, 0, 0)
+
+
+class TeamTotals:
+    __slots__ = ('members', 'points', 'completed', 'punishments')
+
+    def __init__(self):
+        self.members = self.points = self.completed = self.punishments = 0
+
+    def add(self, share, sign=1):
+        self.members += sign
+        self.points += sign * share.points
+        self.completed += sign * share.completed
+        self.punishments += sign * share.punishments
+
+
+class TeamBoard:
+    """Per-team totals maintained from individual updates"""
+
+    def __init__(self):
+        self._shares = {}  # normalized name -> Share
+        self._teams = {}   # team name -> TeamTotals
+
+    def _set(self, key, share):
+        old = self._shares.get(key)
+        if old is not None and old.team:
+            totals = self._teams[old.team]
+            totals.add(old, -1)
+            if not totals.members:
+                del self._teams[old.team]
+        self._shares[key] = share
+        if share.team:
+            self._teams.setdefault(share.team, TeamTotals()).add(share)
+
+    def rebuild(self, participants_df, punishments_df):
+        """Count everything from full participant and punishment frames, once per load"""
+        keys = normalize_names(participants_df['Name'])
+        # Names repeat through the history, so count them before normalizing
+        counts = punishments_df['Name'].astype(str).value_counts()
+        punished = counts.groupby(normalize_names(counts.index.to_series()).to_numpy()).sum()
+        first = ~keys.duplicated().to_numpy()  # the first row with a name is the participant, as in NameIndex
+        shares = pd.DataFrame({
+            'team': with_columns(participants_df, ['Team'])['Team'].fillna('').astype(str).to_numpy(object),
+            'points': pd.to_numeric(participants_df['Points'], errors='coerce').fillna(0).astype(int).to_numpy(),
+            'completed': count_items(participants_df['CompletedPubs']),
+            'punishments': punished.reindex(keys, fill_value=0).to_numpy(),
+        })[first]
+        columns = [shares[field].tolist() for field in Share._fields]
+        self._shares = dict(zip(keys.to_numpy(object)[first].tolist(), map(Share._make, zip(*columns))))
+        for key, count in zip(punished.index.tolist(), punished.tolist()):
+            if key not in self._shares:  # punished under a name that never signed up
+                self._shares[key] = NO_SHARE._replace(punishments=count)
+        totals = shares[shares['team'] != ''].groupby('team').agg(
+            members=('points', 'size'), points=('points', 'sum'), completed=('completed', 'sum'),
+            punishments=('punishments', 'sum'))
+        self._teams = {}
+        for team, *counts in totals.itertuples():
+            self._teams[team] = TeamTotals()
+            (self._teams[team].members, self._teams[team].points,
+             self._teams[team].completed, self._teams[team].punishments) = map(int, counts)
+
+    def update(self, name, team, points, completed):
+        """Record a participant's current team, points and pubs completed"""
+        key = normalize_name(name)
+        punishments = self._shares.get(key, NO_SHARE).punishments
+        self._set(key, Share(team or '', int(points), int(completed), punishments))
+
+    def update_rows(self, rows):
+        """update() for every row of a participants frame"""
+        teams = rows['Team'].fillna('').astype(str) if 'Team' in rows.columns else [''] * len(rows)
+        for name, team, points, completed in zip(rows['Name'], teams, rows['Points'],
+                                                 count_items(rows['CompletedPubs'])):
+            self.update(name, team, points, completed)
+
+    def punished(self, name, count=1):
+        """Count punishments given to a participant"""
+        key = normalize_name(name)
+        share = self._shares.get(key, NO_SHARE)
+        self._set(key, share._replace(punishments=share.punishments + count))
+
+    def team_of(self, name):
+        return self._shares.get(normalize_name(name), NO_SHARE).team
+
+    def __len__(self):
+        return len(self._teams)
+
+    def table(self):
+        """Teams ranked by points, then pubs completed"""
+        rows = [(team, t.members, t.points, t.points / t.members, t.completed, t.punishments)
+                for team, t in self._teams.items()]
+        df = pd.DataFrame(rows, columns=TEAM_COLUMNS)
+        return df.sort_values(['Points', 'Pubs Completed'], ascending=False, ignore_index=True)
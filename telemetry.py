@@ -0,0 +1,156 @@
+"""Process-wide timings and counters
+
+Modules record into the shared `metrics` registry, much as they would log
+to a logger:
+
+    with telemetry.span("load_data"):
+        ...
+    telemetry.count("github.bytes_read", len(text))
+    telemetry.gauge("github.rate_limit_remaining", remaining)
+
+A span records how many times a block ran, its total and slowest time and
+how often it raised. Counters only go up; gauges hold the last value set.
+
+The registry can be read three ways: snapshot() for the admin panel in
+pubcrawl.py, prometheus() in the Prometheus text format, and, once log_to()
+has been given a path, a JSONL file with one line per span and event.
+"""
+import json
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+PROMETHEUS_PREFIX = "pubcrawl_"
+
+
+class SpanStats:
+    __slots__ = ('count', 'errors', 'total', 'max')
+
+    def __init__(self):
+        self.count = self.errors = 0
+        self.total = self.max = 0.0
+
+    def add(self, seconds, failed):
+        self.count += 1
+        self.errors += failed
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class Metrics:
+    """Thread-safe spans, counters and gauges, with an optional JSONL log"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.spans = {}
+        self.counters = Counter()
+        self.gauges = {}
+        self._log = None
+
+    def log_to(self, path):
+        """Append a JSON line per span and event to path (None stops logging)"""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+            self._log = open(path, 'a', encoding='utf-8', buffering=1) if path else None
+
+    def _write(self, record):
+        # Called with the lock held
+        if self._log is not None:
+            self._log.write(json.dumps(record, default=str) + "\n")
+
+    @contextmanager
+    def span(self, name, **fields):
+        """Time the block as name; fields are added to its log line"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            # Not BaseException: Streamlit's st.rerun() and st.stop() are BaseExceptions
+            failed = True
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.spans.setdefault(name, SpanStats()).add(seconds, failed)
+                self._write({'ts': time.time(), 'type': 'span', 'name': name, 'seconds': round(seconds, 6),
+                             'ok': not failed, **fields})
+
+    def timed(self, name):
+        """Decorator running the function in a span"""
+        def decorate(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def event(self, name, **fields):
+        """Count an occurrence of name and log it with fields"""
+        with self._lock:
+            self.counters[name] += 1
+            self._write({'ts': time.time(), 'type': 'event', 'name': name, **fields})
+
+    def snapshot(self):
+        """{'spans': {name: {count, errors, total, max}}, 'counters': {...}, 'gauges': {...}}"""
+        with self._lock:
+            return {
+                'spans': {name: {slot: getattr(stats, slot) for slot in SpanStats.__slots__}
+                          for name, stats in self.spans.items()},
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+            }
+
+    def prometheus(self):
+        """Everything in the Prometheus text exposition format"""
+        data = self.snapshot()
+        lines = []
+        if data['spans']:
+            metric = PROMETHEUS_PREFIX + "span_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for name, stats in sorted(data['spans'].items()):
+                label = f'{{span="{name}"}}'
+                lines.append(f"{metric}_count{label} {stats['count']}")
+                lines.append(f"{metric}_sum{label} {stats['total']:.6f}")
+            metric = PROMETHEUS_PREFIX + "span_errors_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f'{metric}{{span="{name}"}} {stats["errors"]}'
+                         for name, stats in sorted(data['spans'].items()))
+        for name, value in sorted(data['counters'].items()):
+            metric = _metric_name(name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in sorted(data['gauges'].items()):
+            metric = _metric_name(name)
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+
+def _metric_name(name):
+    return PROMETHEUS_PREFIX + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+metrics = Metrics()
+span = metrics.span
+timed = metrics.timed
+count = metrics.count
+gauge = metrics.gauge
+event = metrics.event
@@ -0,0 +1,117 @@
+"""Incremental achievement checks against the whole-frame ones"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from achievements import PUB_FACTS, PUB_POINTS, AchievementEngine
+from events import load_events
+from storage import PUNISHMENT_COLUMNS
+
+
+@pytest.fixture(scope='module')
+def event():
+    return load_events()['belfast']
+
+
+def unawarded(participant):
+    clone = participant.copy()
+    clone.awarded, clone.achievements = (), 0
+    return clone
+
+
+def qualifying(engine, participant):
+    """Every achievement the participant's current facts satisfy, held or not"""
+    return set(engine.evaluate(unawarded(participant)))
+
+
+def crawl(event, seed, steps=150, people=6):
+    """Random check-ins and spins, yielding (participants, punishments_df, participant, changed) after each"""
+    rng = np.random.default_rng(seed)
+    hours_ago = [1, 2, 10, 1, 30, 2]
+    participants = [event.codec.new(f'P{i}', (datetime.now() - timedelta(hours=hours_ago[i % 6])).isoformat())
+                    for i in range(people)]
+    punishments = []
+    last = event.pub_count
+    for step in range(steps):
+        participant = participants[rng.integers(people)]
+        if rng.random() < 0.5 and participant.completed_count < last:
+            left = [i for i in range(last) if not participant.has_completed(i)]
+            # mostly in route order, sometimes skipping ahead
+            participant.complete_pub(left[0] if rng.random() < 0.8 else int(rng.choice(left)))
+            yield participants, None, participant, set(PUB_FACTS)
+        else:
+            pub = event.pub_names[min(participant.current_pub, last - 1)]
+            row = {'Time': f'12:{step % 60:02d}:00', 'Name': participant.name.lower(), 'Pub': pub,
+                   'Punishment': event.punishments[rng.integers(len(event.punishments))]}
+            punishments.append(row)
+            yield participants, pd.DataFrame([row], columns=PUNISHMENT_COLUMNS), participant, None
+
+
+def frames(event, participants, punishments):
+    return event.codec.to_frame(participants), pd.DataFrame(punishments, columns=PUNISHMENT_COLUMNS)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_incremental_checks_match_evaluate_all(event, seed):
+    engine = AchievementEngine(event.achievements, event.pub_names, event.punishments)
+    engine.rebuild(pd.DataFrame(columns=PUNISHMENT_COLUMNS))
+    history = []
+    for step, (participants, rows, participant, changed) in enumerate(crawl(event, seed)):
+        if rows is not None:
+            history.extend(rows.to_dict('records'))
+            changed = engine.record(rows)[participant.name.casefold()]
+        earned = engine.evaluate(participant, changed)
+        # Only rules reading a changed fact are run, but nothing is missed
+        assert set(earned) == set(engine.evaluate(participant))
+        for ach_id in earned:
+            participant.award(event.codec.achievement_index[ach_id], event.achievements[ach_id]['points'])
+        if step % 10:
+            continue
+        participants_df, punishments_df = frames(event, participants, history)
+        table = engine.evaluate_all(participants_df, punishments_df)
+        for i, p in enumerate(participants):
+            assert qualifying(engine, p) == set(table.columns[table.iloc[i].to_numpy()])
+
+
+def test_rebuild_matches_recording_one_at_a_time(event):
+    recorded = AchievementEngine(event.achievements, event.pub_names, event.punishments)
+    history = []
+    for participants, rows, _, _ in crawl(event, 3):
+        if rows is not None:
+            recorded.record(rows)
+            history.extend(rows.to_dict('records'))
+    rebuilt = AchievementEngine(event.achievements, event.pub_names, event.punishments)
+    rebuilt.rebuild(pd.DataFrame(history, columns=PUNISHMENT_COLUMNS))
+    for p in participants:
+        a, b = recorded.counters(p.name), rebuilt.counters(p.name)
+        assert (a is None) == (b is None)
+        if a is not None:
+            assert (a.total, a.by_type, a.by_pub) == (b.total, b.by_type, b.by_pub)
+
+
+def test_rescore_awards_what_evaluate_all_finds(event):
+    engine = AchievementEngine(event.achievements, event.pub_names, event.punishments)
+    history = []
+    for participants, rows, _, _ in crawl(event, 4):
+        if rows is not None:
+            history.extend(rows.to_dict('records'))
+    participants_df, punishments_df = frames(event, participants, history)
+    engine.rebuild(punishments_df)
+    stripped = participants_df.assign(Achievements='', Points=0)
+    rescored = engine.rescore(stripped, punishments_df)
+    table = engine.evaluate_all(participants_df, punishments_df)
+    for i, p in enumerate(participants):
+        held = set(filter(None, rescored['Achievements'].iat[i].split(',')))
+        assert held == qualifying(engine, p) == set(table.columns[table.iloc[i].to_numpy()])
+        assert rescored['CurrentPub'].iat[i] == (p.route[-1] + 1 if p.route else 0)
+        assert rescored['Points'].iat[i] == (PUB_POINTS * p.completed_count
+                                             + sum(event.achievements[a]['points'] for a in held))
+
+
+def test_rescore_rejects_unknown_pubs(event):
+    engine = AchievementEngine(event.achievements, event.pub_names, event.punishments)
+    participants_df = event.codec.to_frame([event.codec.new('Al', None)]).assign(CompletedPubs='Nowhere')
+    with pytest.raises(ValueError, match="Unknown pub 'Nowhere'"):
+        engine.rescore(participants_df, pd.DataFrame(columns=PUNISHMENT_COLUMNS))
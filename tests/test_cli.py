@@ -0,0 +1,37 @@
+"""pubcrawl_cli imports into a SQLite store"""
+import os
+
+import pytest
+
+import pubcrawl_cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(tmp_path, *args):
+    pubcrawl_cli.main(['--event', 'belfast', '--backend', 'sqlite', '--sqlite-path', str(tmp_path / "pubcrawl.db"),
+                       *args])
+
+
+def test_reimport_changes_nothing(tmp_path, capsys):
+    files = ['import', '--participants', os.path.join(ROOT, "participants.csv"),
+             '--punishments', os.path.join(ROOT, "punishments.csv")]
+    run(tmp_path, *files)
+    capsys.readouterr()
+    run(tmp_path, *files)
+    assert "0 participants added, 0 updated, 0 punishments added" in capsys.readouterr().out
+
+
+def test_jsonl_counts_given_as_text(tmp_path, capsys):
+    run(tmp_path, 'import', '--participants', os.path.join(ROOT, "participants.csv"))
+    path = tmp_path / "matt.jsonl"
+    path.write_text('{"Name": "Matt", "Points": "5"}\n', encoding='utf-8')
+    run(tmp_path, 'import', '--participants', str(path))
+    assert "0 participants added" in capsys.readouterr().out.splitlines()[-2]
+
+
+def test_unknown_pub_exits_with_a_message(tmp_path):
+    path = tmp_path / "punishments.csv"
+    path.write_text("Time,Name,Pub,Punishment\n2024-11-23T20:00:00,Matt,Nowhere,Touch your Toes\n", encoding='utf-8')
+    with pytest.raises(SystemExit, match="Unknown pub 'Nowhere'"):
+        run(tmp_path, 'import', '--punishments', str(path))
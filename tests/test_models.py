@@ -0,0 +1,83 @@
+"""Participant records and the codec to and from participants.csv rows"""
+import pandas as pd
+import pytest
+
+from events import load_events
+from models import NameIndex, ParticipantCodec, normalize_name, normalize_names
+from storage import PARTICIPANT_COLUMNS
+
+
+@pytest.fixture(scope='module')
+def codec():
+    return load_events()['belfast'].codec
+
+
+def row(codec, **values):
+    base = {'Name': 'Al', 'CurrentPub': 0, 'CompletedPubs': '', 'Points': 0,
+            'Achievements': '', 'StartTime': '2024-11-23T12:00:00', 'Team': ''}
+    base.update(values)
+    return base
+
+
+def test_row_round_trips_visit_and_award_order(codec):
+    pubs, ids = codec.pub_names, codec.achievement_ids
+    original = row(codec, CurrentPub=1, CompletedPubs=f'{pubs[2]},{pubs[0]}', Points=350,
+                   Achievements=f'{ids[3]},{ids[0]}', Team='Reds')
+    participant = codec.parse(original)
+    assert participant.route == (2, 0)
+    assert participant.completed_count == 2 and not participant.in_order
+    assert participant.has_achievement(3) and participant.has_achievement(0)
+    assert codec.to_row(participant) == original
+
+
+def test_parse_frame_fills_missing_columns(codec):
+    df = pd.DataFrame([row(codec, Name='Al'), row(codec, Name='Bo', StartTime=None)]).drop(columns='Team')
+    first, second = codec.parse_frame(df)
+    assert (first.name, first.team) == ('Al', '')
+    assert second.start_time is None
+    out = codec.to_frame([first, second])
+    assert list(out.columns) == PARTICIPANT_COLUMNS
+    assert out['Name'].tolist() == ['Al', 'Bo']
+
+
+def test_completing_and_awarding_track_the_row(codec):
+    participant = codec.new('Al', '2024-11-23T12:00:00')
+    participant.complete_pub(0)
+    participant.complete_pub(1)
+    assert participant.in_order and participant.current_pub == 2
+    assert participant.award(0, 50) and not participant.award(0, 50)
+    out = codec.to_row(participant)
+    assert out['CompletedPubs'] == ','.join(codec.pub_names[:2])
+    assert out['Achievements'] == codec.achievement_ids[0] and out['Points'] == 50
+    assert codec.parse(out).completed == participant.completed
+
+
+def test_copy_is_independent(codec):
+    participant = codec.new('Al', None)
+    clone = participant.copy()
+    clone.complete_pub(0)
+    assert participant.completed_count == 0 and clone.completed_count == 1
+
+
+def test_unknown_pub_raises_value_error():
+    codec = ParticipantCodec(['A', 'B'], ['first_pub'])
+    with pytest.raises(ValueError, match="Unknown pub 'C'"):
+        codec.parse({'Name': 'Al', 'CurrentPub': 0, 'CompletedPubs': 'A,C', 'Points': 0,
+                     'Achievements': '', 'StartTime': None})
+
+
+def test_names_match_whatever_the_case_and_spacing():
+    assert normalize_name('  Mary   O\'Neill ') == normalize_name("MARY o'neill")
+    names = pd.Series(['  Mary   Ann', 'BOB'])
+    assert normalize_names(names).tolist() == [normalize_name(n) for n in names]
+
+
+def test_name_index_first_row_wins():
+    index = NameIndex(['Al', 'Bo', ' al ', 'AL'])
+    assert len(index) == 2
+    assert index.get('al') == 0 and index.get('  aL') == 0
+    assert index.get('bo') == 1
+    assert 'BO' in index and 'Cy' not in index
+    assert index.get('Cy') is None and index.get('Cy', -1) == -1
+    index['cy'] = 4
+    assert index.get(' CY ') == 4
@@ -0,0 +1,66 @@
+"""Punishments as a snapshot plus an append-only log"""
+import io
+
+import pandas as pd
+
+from fake_repo import FakeRepo
+from storage import (COMPACT_EVERY, PARTICIPANTS_FILE, PUNISHMENT_COLUMNS, PUNISHMENTS_FILE, PUNISHMENTS_LOG_FILE,
+                     GitHubStorage, apply_log, empty_participants, empty_punishments, log_to_text, text_to_log)
+
+
+def punishment(name, second=0):
+    return pd.DataFrame([{'Time': f'2024-11-23T20:00:{second:02d}', 'Name': name, 'Pub': 'The Points',
+                          'Punishment': 'Touch your Toes'}], columns=PUNISHMENT_COLUMNS)
+
+
+def new_repo(log=True):
+    files = {PARTICIPANTS_FILE: empty_participants().to_csv(index=False),
+             PUNISHMENTS_FILE: empty_punishments().to_csv(index=False)}
+    if log:
+        files[PUNISHMENTS_LOG_FILE] = log_to_text(0, empty_punishments())
+    return FakeRepo(files)
+
+
+def snapshot(repo):
+    return pd.read_csv(io.StringIO(repo.files()[PUNISHMENTS_FILE]))
+
+
+def test_log_round_trip():
+    events_df = pd.concat([punishment('Al', 1), punishment('Bea', 2)], ignore_index=True)
+    base, parsed = text_to_log(log_to_text(7, events_df))
+    assert base == 7
+    pd.testing.assert_frame_equal(parsed, events_df)
+
+
+def test_apply_log_skips_events_already_folded():
+    # A compaction that wrote the snapshot but not the reset log
+    snapshot_df = pd.concat([punishment('Al', 1), punishment('Bea', 2)], ignore_index=True)
+    events_df = pd.concat([punishment('Bea', 2), punishment('Cal', 3)], ignore_index=True)
+    assert list(apply_log(snapshot_df, 1, events_df)['Name']) == ['Al', 'Bea', 'Cal']
+
+
+def test_log_compacts_at_compact_every():
+    repo = new_repo()
+    storage = GitHubStorage(repo, "main", backoff=0)
+    for i in range(COMPACT_EVERY - 1):
+        storage.append_punishments(punishment('Mark', i % 60))
+    assert len(snapshot(repo)) == 0
+    assert len(text_to_log(repo.files()[PUNISHMENTS_LOG_FILE])[1]) == COMPACT_EVERY - 1
+
+    storage.append_punishments(punishment('Al'))
+    base, events_df = text_to_log(repo.files()[PUNISHMENTS_LOG_FILE])
+    assert (base, len(events_df)) == (COMPACT_EVERY, 0)
+    snapshot_df = snapshot(repo)
+    assert len(snapshot_df) == COMPACT_EVERY and snapshot_df['Name'].iat[-1] == 'Al'
+    assert len(GitHubStorage(repo, "main").load()[1]) == COMPACT_EVERY
+
+
+def test_first_append_without_a_log_compacts():
+    repo = new_repo(log=False)
+    storage = GitHubStorage(repo, "main", backoff=0)
+    storage.load()
+    storage.append_punishments(punishment('Al'))
+
+    base, events_df = text_to_log(repo.files()[PUNISHMENTS_LOG_FILE])
+    assert (base, len(events_df)) == (1, 0)
+    assert list(GitHubStorage(repo, "main").load()[1]['Name']) == ['Al']
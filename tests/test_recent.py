@@ -0,0 +1,70 @@
+"""Punishment times and the recent punishments buffer"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from recent import PunishmentEvent, RecentPunishments
+from schema import punishment_times
+
+DAY = pd.Timestamp('2024-11-23')
+START = datetime(2024, 11, 23, 20, 0)
+
+
+def test_bare_times_roll_over_midnight():
+    times = punishment_times(['22:00:00', '23:59:30', '00:00:10', '01:30:00', '23:58:00', '02:00:00'], DAY)
+    assert times.tolist() == [
+        pd.Timestamp('2024-11-23 22:00:00'), pd.Timestamp('2024-11-23 23:59:30'),
+        pd.Timestamp('2024-11-24 00:00:10'), pd.Timestamp('2024-11-24 01:30:00'),
+        pd.Timestamp('2024-11-23 23:58:00'),  # a late row from before midnight
+        pd.Timestamp('2024-11-24 02:00:00'),
+    ]
+
+
+def test_full_and_unreadable_times():
+    times = punishment_times(['2024-11-23T21:00:00', '21:30:00', 'soon', None], DAY)
+    assert times.iloc[0] == pd.Timestamp('2024-11-23 21:00:00')
+    assert times.iloc[1] == pd.Timestamp('2024-11-23 21:30:00')
+    assert times.iloc[2:].isna().all()
+
+
+def event(minutes, name='Al', pub='A'):
+    return PunishmentEvent(START + timedelta(minutes=minutes), name, pub, 'Sing')
+
+
+def test_events_are_kept_in_time_order_newest_first():
+    recent = RecentPunishments(10)
+    for minutes in (5, 1, 9, 3, 9, 0):
+        recent.push(event(minutes))
+    assert [e.time.minute for e in recent] == [0, 1, 3, 5, 9, 9]
+    assert [e.time.minute for e in recent.last(3)] == [9, 9, 5]
+    assert [e.time.minute for e in recent.since(START + timedelta(minutes=3))] == [3, 5, 9, 9]
+    assert [e.time.minute for e in recent.between(START + timedelta(minutes=1), START + timedelta(minutes=9))] \
+        == [1, 3, 5]
+
+
+def test_a_full_buffer_keeps_the_newest():
+    recent = RecentPunishments(3)
+    for minutes in (1, 2, 3, 4):
+        recent.push(event(minutes))
+    recent.push(event(0))       # older than everything held: dropped
+    recent.push(event(2, 'Bo'))  # pushes out the oldest
+    assert [(e.time.minute, e.name) for e in recent] == [(2, 'Bo'), (3, 'Al'), (4, 'Al')]
+    assert len(recent) == 3
+
+
+def test_per_pub_and_copy():
+    recent = RecentPunishments()
+    for minutes, pub in ((0, 'A'), (1, 'B'), (2, 'A'), (30, 'A')):
+        recent.push(event(minutes, pub=pub))
+    assert recent.per_pub(START, START + timedelta(minutes=10)) == {'A': 2, 'B': 1}
+    clone = recent.copy()
+    clone.push(event(40))
+    assert len(recent) == 4 and len(clone) == 5
+
+
+def test_from_frame_reads_the_tail_across_midnight():
+    rows = pd.DataFrame({'Time': ['23:50:00', '23:55:00', '00:05:00', 'soon'],
+                         'Name': ['Al', 'Bo', 'Cy', 'Di'], 'Pub': 'A', 'Punishment': 'Sing'})
+    recent = RecentPunishments.from_frame(rows, DAY, capacity=3)
+    assert [e.name for e in recent.last(5)] == ['Cy', 'Bo']
+    assert recent.last(1)[0].time == datetime(2024, 11, 24, 0, 5)
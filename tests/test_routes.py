@@ -0,0 +1,48 @@
+"""Walking routes over the belfast event's pubs"""
+import numpy as np
+import pytest
+
+from events import load_events
+from routes import RoutePlanner, nearest_neighbor, path_length
+
+
+@pytest.fixture(scope='module')
+def event():
+    return load_events()['belfast']
+
+
+@pytest.fixture
+def planner(event):
+    return RoutePlanner(event.latitudes, event.longitudes)
+
+
+def test_plan_visits_every_pub_once_no_longer_than_nearest_neighbour(planner):
+    route = planner.plan()
+    assert sorted(route.stops) == list(range(len(planner.dist)))
+    assert route.stops[0] == 0
+    greedy = nearest_neighbor(list(range(len(planner.dist))), planner.dist)
+    assert route.distance <= path_length(greedy, planner.dist) + 1e-6
+
+
+def test_plan_on_random_points_beats_nearest_neighbour():
+    rng = np.random.default_rng(0)
+    planner = RoutePlanner(54.59 + rng.random(60) / 50, -5.93 + rng.random(60) / 50)
+    route = planner.plan()
+    assert sorted(route.stops) == list(range(60))
+    assert route.distance <= path_length(nearest_neighbor(list(range(60)), planner.dist), planner.dist) + 1e-6
+
+
+def test_start_outside_venues_is_left_out_of_stops(planner):
+    route = planner.plan([3, 4, 5], start=0)
+    assert route.start == 0 and sorted(route.stops) == [3, 4, 5]
+    assert route.path[0] == 0
+
+
+def test_reroute_starts_at_the_pub_to_complete_next(event, planner):
+    participant = event.codec.new("Al", "2024-11-23T12:00:00")
+    assert planner.reroute(participant).stops[0] == 0
+    for pub in range(4):
+        participant.complete_pub(pub)
+        route = planner.reroute(participant)
+        assert route.stops[0] == participant.current_pub
+        assert sorted(route.stops) == list(range(pub + 1, event.pub_count))
@@ -0,0 +1,67 @@
+"""Typed tables and columnar snapshots"""
+import pandas as pd
+import pytest
+
+from schema import (load_columnar, save_columnar, text_participants, text_punishments,
+                    typed_crawl)
+
+PARTICIPANTS = pd.DataFrame({
+    'Name': ['Al', 'Bo', 'Cy'],
+    'CurrentPub': ['2', '0', '1'],
+    'CompletedPubs': ['A,B', '', 'A'],
+    'Points': ['300', '0', '100'],
+    'Achievements': ['first_pub', '', 'first_pub'],
+    'StartTime': ['2024-11-23T12:00:00', '2024-11-23T12:05:30.250000', None],
+    'Team': ['Reds', '', 'Reds'],
+})
+PUNISHMENTS = pd.DataFrame({
+    'Time': ['12:10:00', '23:59:00', '00:01:00'],
+    'Name': ['Al', 'Cy', 'Al'],
+    'Pub': ['A', 'A', 'B'],
+    'Punishment': ['Sing', 'Dance', 'Sing'],
+})
+
+
+@pytest.fixture(params=['crawl.npz', 'crawl.parquet'])
+def path(request, tmp_path):
+    if request.param.endswith('.parquet'):
+        pytest.importorskip('pyarrow')
+    return str(tmp_path / request.param)
+
+
+def test_snapshot_round_trips_values_and_dtypes(path):
+    participants, punishments = typed_crawl(PARTICIPANTS, PUNISHMENTS)
+    save_columnar(path, participants, punishments)
+    loaded_participants, loaded_punishments = load_columnar(path)
+    pd.testing.assert_frame_equal(loaded_participants, participants, check_categorical=False)
+    pd.testing.assert_frame_equal(loaded_punishments, punishments, check_categorical=False)
+    for column in ('Name', 'Pub', 'Punishment'):
+        assert isinstance(loaded_punishments[column].dtype, pd.CategoricalDtype)
+    assert isinstance(loaded_participants['Name'].dtype, pd.CategoricalDtype)
+
+
+def test_snapshot_gives_back_the_csv_text(tmp_path):
+    path = str(tmp_path / 'crawl.npz')
+    save_columnar(path, *typed_crawl(PARTICIPANTS, PUNISHMENTS))
+    participants, punishments = load_columnar(path)
+    text = text_participants(participants)
+    assert text['Name'].tolist() == PARTICIPANTS['Name'].tolist()
+    assert text['StartTime'].tolist() == ['2024-11-23T12:00:00', '2024-11-23T12:05:30.250000', '']
+    assert text['Points'].tolist() == [300, 0, 100]
+    assert text_punishments(punishments)['Time'].tolist() == PUNISHMENTS['Time'].tolist()
+
+
+def test_snapshot_from_before_a_column_was_added(tmp_path):
+    path = str(tmp_path / 'crawl.npz')
+    participants, punishments = typed_crawl(PARTICIPANTS, PUNISHMENTS)
+    save_columnar(path, participants.drop(columns='Team'), punishments)
+    assert load_columnar(path)[0]['Team'].tolist() == ['', '', '']
+
+
+def test_empty_tables_round_trip(tmp_path):
+    path = str(tmp_path / 'crawl.npz')
+    participants, punishments = typed_crawl(PARTICIPANTS.iloc[:0], PUNISHMENTS.iloc[:0])
+    save_columnar(path, participants, punishments)
+    loaded_participants, loaded_punishments = load_columnar(path)
+    assert loaded_participants.empty and loaded_punishments.empty
+    assert list(loaded_punishments.columns) == list(punishments.columns)
@@ -0,0 +1,106 @@
+"""GitHubStorage writes racing each other on one FakeRepo"""
+import pandas as pd
+import pytest
+
+import telemetry
+from fake_repo import FakeRepo
+from storage import (PARTICIPANT_COLUMNS, PARTICIPANTS_FILE, PUNISHMENT_COLUMNS, PUNISHMENTS_FILE, PUNISHMENTS_LOG_FILE,
+                     GitHubStorage, empty_participants, empty_punishments, log_to_text, upsert_rows)
+
+
+class RacingRepo(FakeRepo):
+    """FakeRepo that runs race() once, just before the next write lands"""
+
+    race = None
+
+    def _before_write(self):
+        race, self.race = self.race, None
+        if race is not None:
+            race()
+
+    def update_file(self, *args, **kwargs):
+        self._before_write()
+        return super().update_file(*args, **kwargs)
+
+    def create_git_commit(self, *args, **kwargs):
+        self._before_write()
+        return super().create_git_commit(*args, **kwargs)
+
+
+def participant(name, points=0):
+    return pd.DataFrame([{'Name': name, 'CurrentPub': 0, 'CompletedPubs': '', 'Points': points,
+                          'Achievements': '', 'StartTime': '2024-11-23T12:00:00', 'Team': ''}],
+                        columns=PARTICIPANT_COLUMNS)
+
+
+def punishment(name, second=0):
+    return pd.DataFrame([{'Time': f'2024-11-23T20:00:{second:02d}', 'Name': name, 'Pub': 'The Points',
+                          'Punishment': 'Touch your Toes'}], columns=PUNISHMENT_COLUMNS)
+
+
+def conflicts():
+    return telemetry.metrics.snapshot()['counters'].get('github.conflicts', 0)
+
+
+@pytest.fixture
+def repo():
+    participants = upsert_rows(empty_participants(), participant('Mark'))
+    return RacingRepo({
+        PARTICIPANTS_FILE: participants.to_csv(index=False),
+        PUNISHMENTS_FILE: empty_punishments().to_csv(index=False),
+        PUNISHMENTS_LOG_FILE: log_to_text(0, empty_punishments()),
+    })
+
+
+def storages(repo, n=2, **kwargs):
+    return [GitHubStorage(repo, "main", backoff=0, **kwargs) for _ in range(n)]
+
+
+def test_concurrent_upserts_keep_both(repo):
+    a, b = storages(repo)
+    a.load(), b.load()
+    before = conflicts()
+    repo.race = lambda: b.upsert_participants(participant('Bea', 100))
+    a.upsert_participants(participant('Al', 200))
+
+    participants_df, _ = GitHubStorage(repo, "main").load()
+    assert sorted(participants_df['Name']) == ['Al', 'Bea', 'Mark']
+    assert conflicts() == before + 1
+
+
+def test_stale_save_merges_by_name(repo):
+    a, b = storages(repo)
+    a.load()
+    participants_df, punishments_df = b.load()
+    a.upsert_participants(participant('Al', 200))
+
+    # b saves from the data it loaded before Al signed up
+    participants_df = upsert_rows(participants_df, participant('Mark', 300))
+    b.save(upsert_rows(participants_df, participant('Bea', 100)), punishments_df)
+
+    participants_df, _ = GitHubStorage(repo, "main").load()
+    points = dict(zip(participants_df['Name'], participants_df['Points']))
+    assert points == {'Mark': 300, 'Al': 200, 'Bea': 100}
+
+
+def test_concurrent_appends_keep_each_event_once(repo):
+    a, b = storages(repo)
+    a.load(), b.load()
+    before = conflicts()
+    repo.race = lambda: b.append_punishments(punishment('Bea', 1))
+    a.append_punishments(punishment('Al', 2))
+
+    _, punishments_df = GitHubStorage(repo, "main").load()
+    assert sorted(punishments_df['Name']) == ['Al', 'Bea']
+    assert conflicts() == before + 1
+
+
+def test_concurrent_saves_merge_punishments(repo):
+    a, b = storages(repo)
+    participants_df, punishments_df = a.load()
+    b.load()
+    b.append_punishments(punishment('Bea', 1))
+    a.save(participants_df, pd.concat([punishments_df, punishment('Al', 2)], ignore_index=True))
+
+    _, punishments_df = GitHubStorage(repo, "main").load()
+    assert sorted(punishments_df['Name']) == ['Al', 'Bea']
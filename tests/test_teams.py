@@ -0,0 +1,69 @@
+"""Team standings kept up to date one change at a time"""
+import numpy as np
+import pandas as pd
+
+from storage import PARTICIPANT_COLUMNS, PUNISHMENT_COLUMNS, upsert_rows
+from models import NameIndex
+from teams import TEAM_COLUMNS, TeamBoard
+
+PUBS = ['A', 'B', 'C', 'D']
+
+
+def participant(name, team, completed, points):
+    return {'Name': name, 'CurrentPub': completed, 'CompletedPubs': ','.join(PUBS[:completed]),
+            'Points': points, 'Achievements': '', 'StartTime': '2024-11-23T12:00:00', 'Team': team}
+
+
+def rebuilt(participants_df, punishments_df):
+    board = TeamBoard()
+    board.rebuild(participants_df, punishments_df)
+    return board.table()
+
+
+def test_updates_match_a_rebuild():
+    rng = np.random.default_rng(0)
+    names = ['Al', 'Bo', 'Cy', 'Di', 'Ed', 'Flo']
+    teams = ['', 'Reds', 'Blues', 'Greens']
+    participants = pd.DataFrame(columns=PARTICIPANT_COLUMNS)
+    punishments = pd.DataFrame(columns=PUNISHMENT_COLUMNS)
+    board = TeamBoard()
+    board.rebuild(participants, punishments)
+    for step in range(80):
+        name = names[rng.integers(len(names))]
+        if rng.random() < 0.6:
+            row = pd.DataFrame([participant(name, teams[rng.integers(len(teams))],
+                                            int(rng.integers(len(PUBS) + 1)), int(rng.integers(1000)))])
+            participants = upsert_rows(participants, row, NameIndex(participants['Name']))
+            board.update_rows(row)
+        else:
+            # any spelling of the name counts for their team, even before they sign up
+            spelled = f' {name.upper()} ' if rng.random() < 0.5 else name
+            punishments = pd.concat([punishments, pd.DataFrame(
+                [{'Time': f'12:{step % 60:02d}:00', 'Name': spelled, 'Pub': 'A', 'Punishment': 'Sing'}])],
+                ignore_index=True)
+            board.punished(spelled)
+        pd.testing.assert_frame_equal(board.table(), rebuilt(participants, punishments), check_dtype=False)
+
+
+def test_table_ranks_by_points_then_pubs():
+    participants = pd.DataFrame([participant('Al', 'Reds', 2, 300), participant('Bo', 'Reds', 1, 100),
+                                 participant('Cy', 'Blues', 4, 400), participant('Di', 'Greens', 3, 400),
+                                 participant('Ed', '', 4, 900)])
+    punishments = pd.DataFrame([{'Time': '12:00:00', 'Name': 'al', 'Pub': 'A', 'Punishment': 'Sing'}])
+    table = rebuilt(participants, punishments)
+    assert list(table.columns) == TEAM_COLUMNS
+    assert table['Team'].tolist() == ['Blues', 'Greens', 'Reds']
+    reds = table.iloc[2]
+    assert (reds['Members'], reds['Points'], reds['Average Points'], reds['Pubs Completed'],
+            reds['Punishments']) == (2, 400, 200, 3, 1)
+
+
+def test_leaving_a_team_drops_it_from_the_table():
+    board = TeamBoard()
+    board.rebuild(pd.DataFrame([participant('Al', 'Reds', 1, 100)]), pd.DataFrame(columns=PUNISHMENT_COLUMNS))
+    board.punished('AL')
+    assert board.team_of(' al ') == 'Reds' and len(board) == 1
+    board.update('Al', '', 100, 1)
+    assert len(board) == 0 and board.table().empty
+    board.update('al', 'Blues', 200, 2)
+    assert board.table().iloc[0].tolist() == ['Blues', 1, 200, 200.0, 2, 1]
@@ -0,0 +1,46 @@
+"""WriteBehind journal recovery"""
+import json
+
+import pandas as pd
+import pytest
+
+from storage import PUNISHMENT_COLUMNS, MemoryStorage
+from writer import WriteBehind
+
+
+def punishment_row(name, second):
+    return {'Time': f'2024-11-23T20:00:{second:02d}', 'Name': name, 'Pub': 'The Points',
+            'Punishment': 'Touch your Toes'}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    path = tmp_path / "pubcrawl.journal.jsonl"
+    entries = [{'op': 'punishment', 'row': punishment_row('Al', 1)},
+               {'op': 'punishment', 'row': punishment_row('Bea', 2)}]
+    torn = json.dumps({'op': 'punishment', 'row': punishment_row('Cal', 3)})[:30]
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries) + torn, encoding='utf-8')
+    return path
+
+
+def test_torn_journal_replays_complete_lines(journal):
+    storage = MemoryStorage()
+    writer = WriteBehind(storage, str(journal), flush_interval=3600)
+    try:
+        assert writer.pending == 2
+        # The journal is rewritten without the torn line
+        lines = journal.read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line)['row']['Name'] for line in lines] == ['Al', 'Bea']
+    finally:
+        writer.close()
+    assert list(storage.load()[1]['Name']) == ['Al', 'Bea']
+
+
+def test_replay_skips_events_already_stored(journal):
+    storage = MemoryStorage(punishments_df=pd.DataFrame([punishment_row('Al', 1)], columns=PUNISHMENT_COLUMNS))
+    writer = WriteBehind(storage, str(journal), flush_interval=3600)
+    try:
+        assert writer.pending == 1
+    finally:
+        writer.close()
+    assert list(storage.load()[1]['Name']) == ['Al', 'Bea']
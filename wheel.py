@@ -0,0 +1,124 @@
+"""Punishment wheel: outcome picked on the server, animation run in the browser
+
+The server chooses the slot as soon as the wheel is spun, with its own
+(optionally seeded) random.Random, so the punishment can be recorded
+straight away. The browser only animates: the wheel is a custom component
+that turns to the angle it is sent and reports the spin id back once the
+wheel has stopped. Nothing on the server waits for the animation.
+
+frontend/wheel holds the component's sources. build_component renders them
+once per list of punishments, with the slices and labels baked into the
+page, under frontend/build, and the stylesheet and script get
+content-hashed names. Streamlit serves component files other than the page
+itself as Cache-Control: public, so browsers keep them and each rerun only
+sends the spin.
+"""
+import hashlib
+import html
+import os
+import random
+import tempfile
+import uuid
+from collections import namedtuple
+from string import Template
+
+import streamlit.components.v1 as components
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "wheel")
+BUILD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "build")
+TURNS = 5             # full turns before the wheel settles
+SPIN_SECONDS = 4
+LANDING_MARGIN = 0.3  # keep the pointer this fraction of a slice away from the edges
+
+COLORS = ["#FF4B4B", "#4CAF50", "#2196F3", "#FFC107", "#9C27B0", "#FF9800",
+          "#E91E63", "#00BCD4", "#8BC34A", "#FF5722", "#3F51B5", "#009688"]
+
+# id: identifies the spin to the browser; angle: where the wheel stops, in
+# degrees clockwise from its starting position
+Spin = namedtuple('Spin', ['id', 'index', 'punishment', 'angle'])
+
+
+def _read(name):
+    with open(os.path.join(FRONTEND_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def _write(directory, name, text):
+    """Write a build file atomically, so a concurrent build never serves half a file"""
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, os.path.join(directory, name))
+
+
+def _hashed(name, text):
+    """wheel.css -> wheel.<content hash>.css"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]}{ext}"
+
+
+def render_page(punishments):
+    """{file name: contents} for a wheel with the given punishments"""
+    size = 360 / len(punishments)
+    gradient = "conic-gradient({})".format(", ".join(
+        f"{COLORS[i % len(COLORS)]} {i * size:g}deg {(i + 1) * size:g}deg" for i in range(len(punishments))))
+    labels = "\n".join(
+        f'    <div class="wheel-text" title="{html.escape(p)}" style="transform: rotate({(i + 0.5) * size - 90:g}deg)">'
+        f'{html.escape(p)}</div>'
+        for i, p in enumerate(punishments))
+
+    css, js = _read("wheel.css"), _read("wheel.js")
+    css_name, js_name = _hashed("wheel.css", css), _hashed("wheel.js", js)
+    page = Template(_read("index.html")).substitute(
+        css=css_name, js=js_name, gradient=gradient, labels=labels, turns=TURNS, seconds=SPIN_SECONDS)
+    return {css_name: css, js_name: js, "index.html": page}
+
+
+def build_component(punishments, build_root=BUILD_DIR):
+    """Declare a component for this wheel, writing its files if needed
+
+    The build directory and component name carry a digest of the rendered
+    files, so events with different punishments (or a changed source file)
+    never share a build.
+    """
+    files = render_page(punishments)
+    digest = hashlib.sha256("".join(files[name] for name in sorted(files)).encode('utf-8')).hexdigest()[:12]
+    directory = os.path.join(build_root, f"wheel-{digest}")
+    if not os.path.exists(os.path.join(directory, "index.html")):
+        os.makedirs(directory, exist_ok=True)
+        # index.html last: its presence means the build is complete
+        for name in sorted(files, key=lambda name: name == "index.html"):
+            _write(directory, name, files[name])
+    return components.declare_component(f"punishment_wheel_{digest}", path=directory)
+
+
+class Wheel:
+    """Chooses spins for one list of punishments and draws them"""
+
+    def __init__(self, punishments, seed=None):
+        self.punishments = tuple(punishments)
+        self.rng = random.Random(seed)
+        self.component = build_component(self.punishments)
+
+    def spin(self):
+        index = self.rng.randrange(len(self.punishments))
+        return Spin(uuid.uuid4().hex, index, self.punishments[index], self.angle(index))
+
+    def angle(self, index):
+        """Rotation that brings slice index under the pointer at the top"""
+        size = 360 / len(self.punishments)
+        offset = self.rng.uniform(LANDING_MARGIN, 1 - LANDING_MARGIN) * size
+        return (360 - (index * size + offset)) % 360
+
+    def render(self, spin=None, landed=False, key=None):
+        """Draw the wheel, animating to spin if it hasn't been shown yet
+
+        Only the spin is sent; the slices are part of the built page.
+        Returns the id of the last spin the browser finished animating.
+        """
+        return self.component(
+            spin={'id': spin.id, 'angle': spin.angle} if spin else None,
+            landed=landed,
+            key=key,
+            default=None,
+        )
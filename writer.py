@@ -0,0 +1,193 @@
+"""Write-behind queue that batches saves from every session
+
+Sessions hand their mutations to a WriteBehind and return straight away.
+Each mutation is appended to a local JSONL journal (and fsynced) before it
+is acknowledged, then a background thread coalesces everything queued and
+writes it to the storage backend with a single apply() call every
+flush_interval seconds, or sooner once max_batch mutations are waiting.
+
+If the process dies, the journal is replayed on the next start. Events the
+backend already has are dropped at that point, so a crash between a
+successful flush and the journal rewrite does not record them twice.
+close() is registered with atexit and flushes whatever is left.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from storage import PARTICIPANT_COLUMNS, PUNISHMENT_COLUMNS, merge_punishments, upsert_rows
+
+FLUSH_INTERVAL = 5  # seconds
+MAX_BATCH = 20      # queued mutations that trigger an early flush
+RETRY_DELAY = 10    # seconds to wait after a failed flush
+
+logger = logging.getLogger(__name__)
+
+
+def _records(rows, columns):
+    """JSON-safe row dicts, with missing values as None"""
+    return json.loads(rows[columns].to_json(orient='records'))
+
+
+class WriteBehind:
+    """Background writer with a durable journal in front of a storage backend"""
+
+    def __init__(self, storage, journal_path, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH):
+        self.storage = storage
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._participants = OrderedDict()  # Name -> latest queued row
+        self._punishments = []
+        self._in_flight = ([], [])          # batch currently being written
+        self._closed = False
+        self._recover()
+        self._thread = threading.Thread(target=self._run, name="pubcrawl-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def pending(self):
+        """Number of queued mutations not yet written"""
+        with self._cond:
+            return len(self._participants) + len(self._punishments)
+
+    # Journal
+
+    def _journal(self, entries):
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite_journal(self):
+        """Replace the journal with just the mutations still queued"""
+        entries = [{'op': 'participant', 'row': row} for row in self._participants.values()]
+        entries += [{'op': 'punishment', 'row': row} for row in self._punishments]
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _recover(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash mid-write
+                self._queue(entry['op'], entry['row'])
+        if self._punishments:
+            _, stored = self.storage.load()
+            queued = pd.DataFrame(self._punishments, columns=PUNISHMENT_COLUMNS)
+            unsaved = merge_punishments(stored.iloc[0:0], queued, stored).iloc[len(stored):]
+            self._punishments = _records(unsaved, PUNISHMENT_COLUMNS)
+        self._rewrite_journal()
+        if self.pending:
+            logger.info("Recovered %d queued writes from %s", self.pending, self.journal_path)
+
+    # Queue
+
+    def _queue(self, op, row):
+        if op == 'participant':
+            self._participants[row['Name']] = row
+            self._participants.move_to_end(row['Name'])
+        else:
+            self._punishments.append(row)
+
+    def _submit(self, op, rows, columns):
+        records = _records(rows, columns)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehind is closed")
+            self._journal([{'op': op, 'row': row} for row in records])
+            for row in records:
+                self._queue(op, row)
+            if len(self._participants) + len(self._punishments) >= self.max_batch:
+                self._cond.notify()
+
+    def upsert_participants(self, rows):
+        self._submit('participant', rows, PARTICIPANT_COLUMNS)
+
+    def append_punishments(self, rows):
+        self._submit('punishment', rows, PUNISHMENT_COLUMNS)
+
+    def overlay(self, participants_df, punishments_df):
+        """Apply queued and in-flight mutations on top of freshly loaded data"""
+        with self._cond:
+            participants = self._in_flight[0] + list(self._participants.values())
+            punishments = self._in_flight[1] + self._punishments
+        if participants:
+            participants_df = upsert_rows(participants_df, pd.DataFrame(participants, columns=PARTICIPANT_COLUMNS))
+        if punishments:
+            queued = pd.DataFrame(punishments, columns=PUNISHMENT_COLUMNS)
+            punishments_df = merge_punishments(queued.iloc[0:0], queued, punishments_df)
+        return participants_df, punishments_df
+
+    # Flushing
+
+    def flush(self):
+        """Write everything queued to the backend in one apply() call"""
+        with self._flush_lock:
+            with self._cond:
+                if not self._participants and not self._punishments:
+                    return
+                batch = (list(self._participants.values()), self._punishments)
+                self._participants, self._punishments = OrderedDict(), []
+                self._in_flight = batch
+            try:
+                self.storage.apply(pd.DataFrame(batch[0], columns=PARTICIPANT_COLUMNS),
+                                   pd.DataFrame(batch[1], columns=PUNISHMENT_COLUMNS))
+            except Exception:
+                with self._cond:
+                    # Put the batch back in front of anything queued meanwhile
+                    newer = self._participants
+                    self._participants = OrderedDict((row['Name'], row) for row in batch[0])
+                    self._participants.update(newer)
+                    self._punishments = batch[1] + self._punishments
+                    self._in_flight = ([], [])
+                raise
+            with self._cond:
+                self._in_flight = ([], [])
+                self._rewrite_journal()
+
+    def _run(self):
+        delay = self.flush_interval
+        while True:
+            with self._cond:
+                if not self._closed and self.pending < self.max_batch:
+                    self._cond.wait(delay)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                delay = self.flush_interval
+            except Exception:
+                logger.exception("Background flush failed, retrying in %ss", RETRY_DELAY)
+                delay = RETRY_DELAY
+
+    def close(self):
+        """Stop the background thread and flush what is left"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final flush failed, %d writes kept in %s", self.pending, self.journal_path)